@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'corsheaders',
     'drf_spectacular',
@@ -100,7 +101,11 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
         'rest_framework.permissions.AllowAny',
         'rest_framework.permissions.IsAdminUser',
-    ]
+    ],
+    # Выгрузки рейтинга и ведомости читают всю таблицу студентов - ограничиваем частоту (ScopedRateThrottle)
+    'DEFAULT_THROTTLE_RATES': {
+        'export': '60/hour',
+    },
 }
 
 ROOT_URLCONF = 'backend.urls'
@@ -200,6 +205,9 @@ AUTH_USER_MODEL = 'users.User'
 
 SCORING_CONFIG_PATH = os.path.join(BASE_DIR, 'jsons/scoring_json/' ,'scoring_config.json')
 
+# Каталог для готовых файлов выгрузок рейтинга (CSV/XLSX), по одному на версию данных рейтинга
+EXPORT_CACHE_DIR = os.getenv('EXPORT_CACHE_DIR', os.path.join(BASE_DIR, 'export_cache'))
+
 SUPABASE_URL = os.getenv('SUPABASE_URL')
 SUPABASE_KEY = os.getenv('SUPABASE_KEY')
 SUPABASE_SERVICE_KEY = os.getenv('SUPABASE_SERVICE_KEY')
@@ -1,5 +1,10 @@
 from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
 
 
 class MainConfig(AppConfig):
     name = 'main'
+
+    def ready(self):
+        # Регистрирует фоновые задачи из модулей tasks.py всех приложений (см. main.tasks)
+        autodiscover_modules('tasks')
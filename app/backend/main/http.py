@@ -0,0 +1,82 @@
+import gzip
+import hashlib
+import json
+
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+
+
+def serialize_json(data) -> tuple[bytes, bytes]:
+    """
+    Сериализует данные в json и сразу сжимает gzip - для хранения готового ответа в кэше.
+
+    Возвращает:
+        tuple[bytes, bytes]: (json, json в gzip)
+    """
+    body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+    return body, gzip.compress(body, compresslevel=6)
+
+def make_etag(*parts) -> str:
+    """
+    Строит значение ETag (без кавычек) из версий данных и прочих частей, от которых зависит ответ.
+    """
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha1(raw).hexdigest()[:32]
+
+def is_not_modified(request, etag: str) -> bool:
+    """
+    Проверяет, совпадает ли If-None-Match запроса с ETag (в том числе со сжатым вариантом '-gzip').
+    """
+    if_none_match = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+    return '*' in if_none_match or f'"{etag}"' in if_none_match or f'"{etag}-gzip"' in if_none_match
+
+def not_modified_response(request, etag: str, cache_control: str = "private, no-cache") -> HttpResponseNotModified:
+    """
+    Ответ 304 Not Modified с тем же ETag, что был бы у полного ответа на этот запрос.
+    """
+    use_gzip = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+    return HttpResponseNotModified(headers={
+        "ETag": f'"{etag}-gzip"' if use_gzip else f'"{etag}"',
+        "Cache-Control": cache_control,
+        "Vary": "Accept-Encoding, Cookie",
+    })
+
+def set_etag(response, etag: str, cache_control: str = "private, no-cache"):
+    """
+    Добавляет к обычному (несжатому) ответу ETag и заголовки кэширования.
+    """
+    response["ETag"] = f'"{etag}"'
+    response["Cache-Control"] = cache_control
+    response["Vary"] = "Accept-Encoding, Cookie"
+    return response
+
+def precompressed_json_response(request, body: bytes, gzip_body: bytes, etag: str | None = None,
+                                cache_control: str = "private, no-cache") -> HttpResponse:
+    """
+    Отдаёт заранее сериализованный json, сжатый gzip, если клиент его принимает.
+
+    Если передан etag (без кавычек), ответ получает строгий ETag (у сжатой версии - с суффиксом
+    '-gzip', так как это другое представление), а запрос с совпадающим If-None-Match
+    получает 304 Not Modified без тела.
+
+    Параметры:
+        request (HttpRequest): Текущий запрос.
+        body (bytes): Готовый json.
+        gzip_body (bytes): Тот же json, сжатый gzip.
+        etag (str | None): Значение для ETag.
+        cache_control (str): Значение заголовка Cache-Control.
+    """
+    use_gzip = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+    headers = {
+        "Cache-Control": cache_control,
+        "Vary": "Accept-Encoding, Cookie",
+    }
+
+    if etag is not None:
+        if is_not_modified(request, etag):
+            return not_modified_response(request, etag, cache_control)
+        headers["ETag"] = f'"{etag}-gzip"' if use_gzip else f'"{etag}"'
+
+    if use_gzip:
+        return HttpResponse(gzip_body, content_type='application/json', headers={**headers, "Content-Encoding": "gzip"})
+    return HttpResponse(body, content_type='application/json', headers=headers)
@@ -0,0 +1,39 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from main.tasks import DEFAULT_LEASE_SECONDS, JOB_DONE, JOB_FAILED, run_worker
+
+class Command(BaseCommand):
+    help = (
+        'Обработчик фоновой очереди: выполняет задачи, поставленные обработчиками запросов '
+        '(пересборка ведомости после подтверждения документов и т.п.), с повторными попытками'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4, help='Количество потоков')
+        parser.add_argument('--lease', type=int, default=DEFAULT_LEASE_SECONDS, help='Срок обработки задачи в секундах')
+        parser.add_argument('--poll', type=float, default=1, help='Пауза между опросами пустой очереди в секундах')
+        parser.add_argument('--once', action='store_true', help='Выполнить готовые задачи и завершиться')
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        # Остановка по Ctrl+C или docker stop: текущие задачи дорабатываются, новые не берутся
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stop.set())
+
+        def report(job, result):
+            if result == JOB_DONE:
+                self.stdout.write(f'{job.name} #{job.id}: выполнена')
+            elif result == JOB_FAILED:
+                self.stdout.write(self.style.ERROR(f'{job.name} #{job.id}: ошибка, попытки исчерпаны'))
+            else:
+                self.stdout.write(self.style.WARNING(f'{job.name} #{job.id}: ошибка, попытка {job.attempts}, будет повторена'))
+
+        self.stdout.write(f"Обработчик очереди запущен, потоков: {options['threads']}")
+        run_worker(
+            threads=options['threads'], lease_seconds=options['lease'], poll_interval=options['poll'],
+            stop=stop, once=options['once'], on_result=report,
+        )
+        self.stdout.write(self.style.SUCCESS('Обработчик очереди остановлен'))
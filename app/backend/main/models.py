@@ -1,3 +1,93 @@
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+
+class DataVersion(models.Model):
+    """
+    Именованный счётчик версии данных.
+
+    Значение увеличивается при каждом изменении соответствующих данных (например, 'rating' -
+    при подтверждении документа или правке студента в админке). Кэши, собранные из этих данных,
+    хранятся под ключом с номером версии, поэтому после увеличения счётчика устаревшие записи
+    перестают использоваться во всех процессах сразу - счётчик общий, так как лежит в БД.
+    """
+    name = models.CharField("Название", max_length=50, unique=True)
+    value = models.PositiveBigIntegerField("Версия", default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Версия данных"
+        verbose_name_plural = "Версии данных"
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+    @classmethod
+    def get(cls, name: str) -> int:
+        """
+        Возвращает текущую версию данных (0, если данные ещё не менялись).
+        """
+        return cls.objects.filter(name=name).values_list('value', flat=True).first() or 0
+
+    @classmethod
+    def get_many(cls, *names: str) -> dict:
+        """
+        Возвращает версии нескольких данных одним запросом: {название: версия}.
+        """
+        values = dict(cls.objects.filter(name__in=names).values_list('name', 'value'))
+        return {name: values.get(name, 0) for name in names}
+
+    @classmethod
+    def bump(cls, *names: str) -> None:
+        """
+        Увеличивает версии указанных данных на стороне БД (F()), без гонок между процессами.
+
+        При вызове внутри транзакции новая версия становится видна другим процессам
+        одновременно с самими изменениями - после фиксации транзакции.
+        """
+        for name in names:
+            if not cls.objects.filter(name=name).update(value=models.F('value') + 1):
+                cls.objects.get_or_create(name=name)
+                cls.objects.filter(name=name).update(value=models.F('value') + 1)
+
+
+class Job(models.Model):
+    """
+    Задача фоновой очереди (см. main.tasks).
+
+    Задачи ставятся обработчиками запросов (enqueue) в той же транзакции, что и изменения данных,
+    и выполняются командой run_tasks. Выполненные задачи удаляются, задачи, исчерпавшие попытки,
+    остаются со статусом 'failed' и текстом последней ошибки.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Ожидает'),
+        ('running', 'Выполняется'),
+        ('failed', 'Ошибка'),
+    ]
+
+    name = models.CharField("Задача", max_length=100)
+    payload = models.JSONField("Параметры", default=dict, blank=True)
+    # Ключ идемпотентности: пока задача с ключом ожидает выполнения, такие же задачи не ставятся
+    key = models.CharField("Ключ", max_length=200, null=True, blank=True)
+    status = models.CharField("Статус", max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField("Попыток", default=0)
+    max_attempts = models.PositiveIntegerField("Наибольшее количество попыток", default=5)
+    run_after = models.DateTimeField("Выполнить не раньше", default=timezone.now)
+    locked_until = models.DateTimeField("Выполняется до", null=True, blank=True)
+    last_error = models.TextField("Последняя ошибка", blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Фоновая задача"
+        verbose_name_plural = "Фоновые задачи"
+        indexes = [
+            models.Index(fields=['run_after', 'id'], condition=models.Q(status='pending'), name='job_pending_queue_idx'),
+            models.Index(fields=['locked_until'], condition=models.Q(status='running'), name='job_running_lease_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['key'], condition=models.Q(status='pending'), name='job_pending_key_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.id} ({self.status})"
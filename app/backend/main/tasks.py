@@ -0,0 +1,223 @@
+import random
+import threading
+import traceback
+from datetime import timedelta
+
+from django.db import DatabaseError, IntegrityError, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+# Срок, на который задача закрепляется за обработчиком; по его истечении задачу может взять другой обработчик
+DEFAULT_LEASE_SECONDS = 5 * 60
+
+# Наибольшая пауза перед повторной попыткой (пауза удваивается с каждой неудачной попыткой)
+MAX_RETRY_DELAY = 60 * 60
+
+# Результат выполнения задачи (run_job)
+JOB_DONE = 'done'
+JOB_RETRY = 'retry'
+JOB_FAILED = 'failed'
+
+
+class Task:
+    """
+    Зарегистрированная фоновая задача: обработчик и правила повторных попыток.
+
+    Атрибуты:
+        name (str): Имя задачи, под которым она ставится в очередь.
+        func (Callable): Обработчик, вызывается с параметрами задачи (payload) как именованными аргументами.
+        max_attempts (int): Наибольшее количество попыток.
+        retry_delay (float): Пауза перед второй попыткой в секундах, далее удваивается.
+    """
+
+    def __init__(self, name, func, max_attempts, retry_delay):
+        self.name = name
+        self.func = func
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+    def backoff(self, attempts: int) -> float:
+        """
+        Пауза перед следующей попыткой после attempts неудачных: экспоненциальная, со случайной
+        добавкой до 25 %, чтобы повторы одновременно упавших задач не совпадали по времени.
+        """
+        delay = min(self.retry_delay * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+        return delay * random.uniform(1, 1.25)
+
+
+TASKS: dict[str, Task] = {}
+
+
+def task(name: str, max_attempts: int = 5, retry_delay: float = 10):
+    """
+    Декоратор, регистрирующий функцию как фоновую задачу.
+
+    Модули tasks.py приложений импортируются при запуске (MainConfig.ready), поэтому задачи,
+    объявленные в них, доступны и обработчикам запросов, и команде run_tasks.
+    Обработчик может быть вызван повторно (после ошибки или истечения срока обработки),
+    поэтому он должен быть идемпотентным - читать актуальные данные, а не полагаться на параметры.
+
+    Пример:
+        @task('students.refresh_rating_caches', max_attempts=3)
+        def refresh_rating_caches():
+            ...
+    """
+    def register(func):
+        TASKS[name] = Task(name, func, max_attempts, retry_delay)
+        return func
+    return register
+
+def enqueue(name: str, payload: dict | None = None, key: str | None = None, delay: float = 0) -> None:
+    """
+    Ставит задачу в очередь и сразу возвращает управление.
+
+    Строка задачи вставляется в текущей транзакции, поэтому задача появляется в очереди
+    только вместе с изменениями, ради которых она поставлена, а при откате исчезает вместе с ними.
+    Если указан ключ и задача с тем же ключом уже ожидает выполнения, новая не ставится
+    (частичный уникальный индекс job_pending_key_unique), так что серия одинаковых задач
+    схлопывается в одну. Вставка выполняется запросом INSERT ... ON CONFLICT DO NOTHING
+    (bulk_create с ignore_conflicts): конфликт ключа не вызывает ошибку, не прерывает транзакцию
+    вызывающего и не требует точки сохранения. Вставка с ключом, который в этот момент вставляет
+    другая незафиксированная транзакция, ждёт её завершения, поэтому задачи с общим ключом лучше
+    ставить вне длинных транзакций (например, в transaction.on_commit).
+    Задача, которая уже выполняется, не мешает поставить следующую.
+
+    Параметры:
+        name (str): Имя зарегистрированной задачи.
+        payload (dict | None): Параметры обработчика (сериализуются в json).
+        key (str | None): Ключ идемпотентности.
+        delay (float): Через сколько секунд задачу можно выполнять.
+
+    Исключения:
+        ValueError: Задача с таким именем не зарегистрирована.
+    """
+    spec = TASKS.get(name)
+    if spec is None:
+        raise ValueError(f"Неизвестная фоновая задача: {name}")
+    Job.objects.bulk_create([
+        Job(
+            name=name, payload=payload or {}, key=key, max_attempts=spec.max_attempts,
+            run_after=timezone.now() + timedelta(seconds=delay),
+        ),
+    ], ignore_conflicts=True)
+
+def claim_jobs(count: int = 1, lease_seconds: int = DEFAULT_LEASE_SECONDS) -> list[Job]:
+    """
+    Выдаёт обработчику следующие задачи очереди.
+
+    Задачи выбираются запросом SELECT ... FOR UPDATE SKIP LOCKED: строки, которые в этот момент
+    забирает другой обработчик, пропускаются, а не ожидаются. Кроме готовых к выполнению задач
+    забираются и задачи, срок обработки которых истёк (обработчик упал, не завершив задачу).
+    Выбранным задачам в той же транзакции проставляются статус 'running', срок обработки
+    и увеличивается счётчик попыток.
+
+    Возвращает:
+        list[Job]: Задачи в порядке очереди.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(Q(status='pending', run_after__lte=now) | Q(status='running', locked_until__lt=now))
+            .order_by('run_after', 'id')
+            .values_list('id', flat=True)[:count]
+        )
+        if not ids:
+            return []
+        Job.objects.filter(id__in=ids).update(
+            status='running', locked_until=now + timedelta(seconds=lease_seconds), attempts=F('attempts') + 1,
+        )
+        return list(Job.objects.filter(id__in=ids).order_by('run_after', 'id'))
+
+def run_job(job: Job) -> str:
+    """
+    Выполняет выданную задачу и записывает результат.
+
+    Выполненная задача удаляется. После ошибки задача возвращается в очередь с паузой
+    (Task.backoff), а исчерпав попытки - остаётся со статусом 'failed' и текстом ошибки.
+    Результат записывается только если задачу за это время не забрал другой обработчик
+    (условие по статусу и номеру попытки).
+
+    Возвращает:
+        str: JOB_DONE, JOB_RETRY или JOB_FAILED.
+    """
+    mine = Job.objects.filter(id=job.id, status='running', attempts=job.attempts)
+    spec = TASKS.get(job.name)
+    if spec is None:
+        mine.update(status='failed', locked_until=None, last_error=f"Неизвестная фоновая задача: {job.name}")
+        return JOB_FAILED
+    if job.attempts > job.max_attempts:
+        mine.update(status='failed', locked_until=None, last_error=job.last_error or "Обработчик не завершил задачу")
+        return JOB_FAILED
+
+    try:
+        spec.func(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+    else:
+        mine.delete()
+        return JOB_DONE
+
+    if job.attempts >= job.max_attempts:
+        mine.update(status='failed', locked_until=None, last_error=error)
+        return JOB_FAILED
+    try:
+        with transaction.atomic():
+            mine.update(
+                status='pending', locked_until=None, last_error=error,
+                run_after=timezone.now() + timedelta(seconds=spec.backoff(job.attempts)),
+            )
+    except IntegrityError:
+        # Пока задача выполнялась, поставлена такая же с тем же ключом - повтор выполнит она
+        mine.delete()
+    return JOB_RETRY
+
+def run_worker(threads: int = 1, lease_seconds: int = DEFAULT_LEASE_SECONDS, poll_interval: float = 1,
+               stop: threading.Event | None = None, once: bool = False, on_result=None) -> None:
+    """
+    Выполняет задачи очереди в нескольких потоках, пока не установлен stop.
+
+    Каждый поток забирает задачи по одной (claim_jobs), поэтому долгая задача не задерживает
+    остальные. Когда готовых задач нет, поток ждёт poll_interval секунд. Для нескольких
+    процессов достаточно запустить несколько команд run_tasks - задачи между ними
+    распределяются блокировками SKIP LOCKED.
+
+    Параметры:
+        threads (int): Количество потоков.
+        lease_seconds (int): Срок обработки задачи (см. claim_jobs).
+        poll_interval (float): Пауза между опросами пустой очереди в секундах.
+        stop (threading.Event | None): Событие остановки.
+        once (bool): Завершиться, когда готовых задач не останется.
+        on_result (Callable[[Job, str], None] | None): Вызывается после каждой задачи с её результатом.
+    """
+    stop = stop or threading.Event()
+
+    def work():
+        try:
+            while not stop.is_set():
+                try:
+                    jobs = claim_jobs(1, lease_seconds)
+                    for job in jobs:
+                        result = run_job(job)
+                        if on_result:
+                            on_result(job, result)
+                except DatabaseError:
+                    # Соединение с БД потеряно - переподключимся на следующем круге, задачу вернёт истечение срока
+                    connections.close_all()
+                    jobs = None
+                if not jobs:
+                    if once and jobs is not None:
+                        return
+                    stop.wait(poll_interval)
+        finally:
+            # У каждого потока своё соединение с БД
+            connections.close_all()
+
+    workers = [threading.Thread(target=work, name=f'run_tasks-{i}', daemon=True) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        while worker.is_alive():
+            worker.join(poll_interval)
@@ -1,3 +1,133 @@
+from datetime import timedelta
+
 from django.test import TestCase
+from django.utils import timezone
+
+from .models import Job
+from .tasks import JOB_DONE, JOB_FAILED, JOB_RETRY, MAX_RETRY_DELAY, TASKS, claim_jobs, enqueue, run_job, task
+
+TEST_OK = 'main.test_ok'
+TEST_FAILING = 'main.test_failing'
+
+_calls = []
+
+
+@task(TEST_OK)
+def ok_task(n=0):
+    _calls.append(n)
+
+@task(TEST_FAILING, max_attempts=2, retry_delay=10)
+def failing_task():
+    raise RuntimeError('Сбой задачи')
+
+
+class EnqueueTests(TestCase):
+    """
+    Постановка задач: ключ идемпотентности схлопывает ожидающие задачи, но не мешает следующей.
+    """
+
+    def test_pending_key_is_deduplicated(self):
+        enqueue(TEST_OK, {'n': 1}, key='same')
+        enqueue(TEST_OK, {'n': 2}, key='same')
+        self.assertEqual(list(Job.objects.values_list('payload', flat=True)), [{'n': 1}])
+
+    def test_jobs_without_key_are_not_deduplicated(self):
+        enqueue(TEST_OK)
+        enqueue(TEST_OK)
+        self.assertEqual(Job.objects.count(), 2)
+
+    def test_running_job_does_not_block_next_one(self):
+        enqueue(TEST_OK, key='same')
+        claim_jobs()
+        enqueue(TEST_OK, key='same')
+        self.assertEqual(sorted(Job.objects.values_list('status', flat=True)), ['pending', 'running'])
+
+    def test_unknown_task_is_rejected(self):
+        with self.assertRaises(ValueError):
+            enqueue('main.missing')
+
+
+class ClaimJobsTests(TestCase):
+    """
+    Выдача задач: только готовые, каждая одному обработчику, с истёкшим сроком - повторно.
+    """
+
+    def test_delayed_job_is_not_claimed(self):
+        enqueue(TEST_OK, delay=60)
+        self.assertEqual(claim_jobs(), [])
+
+    def test_claimed_job_is_leased_once(self):
+        enqueue(TEST_OK)
+        [job] = claim_jobs(lease_seconds=60)
+        self.assertEqual((job.status, job.attempts), ('running', 1))
+        self.assertGreater(job.locked_until, timezone.now())
+        self.assertEqual(claim_jobs(), [])
+
+    def test_expired_lease_is_claimed_again(self):
+        enqueue(TEST_OK)
+        [job] = claim_jobs()
+        Job.objects.filter(pk=job.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        [again] = claim_jobs()
+        self.assertEqual((again.pk, again.attempts), (job.pk, 2))
+
+    def test_jobs_are_claimed_in_queue_order(self):
+        for n in range(3):
+            enqueue(TEST_OK, {'n': n})
+        self.assertEqual([job.payload['n'] for job in claim_jobs(count=2)], [0, 1])
+
+
+class RunJobTests(TestCase):
+    """
+    Выполнение задач: успешная удаляется, упавшая повторяется с паузой, исчерпавшая попытки остаётся с ошибкой.
+    """
+
+    def setUp(self):
+        _calls.clear()
+
+    def test_done_job_is_deleted(self):
+        enqueue(TEST_OK, {'n': 7})
+        [job] = claim_jobs()
+        self.assertEqual(run_job(job), JOB_DONE)
+        self.assertEqual(_calls, [7])
+        self.assertFalse(Job.objects.exists())
+
+    def test_failed_job_is_retried_with_backoff_then_fails(self):
+        enqueue(TEST_FAILING)
+        [job] = claim_jobs()
+        started = timezone.now()
+        self.assertEqual(run_job(job), JOB_RETRY)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'pending')
+        self.assertIn('Сбой задачи', job.last_error)
+        self.assertGreaterEqual(job.run_after, started + timedelta(seconds=10))
+        self.assertLessEqual(job.run_after, timezone.now() + timedelta(seconds=12.5))
+        self.assertEqual(claim_jobs(), [])
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        [job] = claim_jobs()
+        self.assertEqual(run_job(job), JOB_FAILED)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+        self.assertEqual(claim_jobs(), [])
+
+    def test_retry_yields_to_job_with_same_key(self):
+        enqueue(TEST_FAILING, key='same')
+        [job] = claim_jobs()
+        enqueue(TEST_FAILING, key='same')
+        self.assertEqual(run_job(job), JOB_RETRY)
+        self.assertEqual(list(Job.objects.values_list('status', 'attempts')), [('pending', 0)])
+
+    def test_result_of_reclaimed_job_is_not_recorded(self):
+        enqueue(TEST_OK)
+        [stale] = claim_jobs()
+        Job.objects.filter(pk=stale.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        [current] = claim_jobs()
+        self.assertEqual(run_job(stale), JOB_DONE)
+        self.assertTrue(Job.objects.filter(pk=current.pk, status='running').exists())
 
-# Create your tests here.
+    def test_backoff_doubles_up_to_limit(self):
+        spec = TASKS[TEST_FAILING]
+        self.assertTrue(10 <= spec.backoff(1) <= 12.5)
+        self.assertTrue(20 <= spec.backoff(2) <= 25)
+        self.assertLessEqual(spec.backoff(30), MAX_RETRY_DELAY * 1.25)
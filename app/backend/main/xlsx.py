@@ -0,0 +1,140 @@
+import io
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+# Символы, недопустимые в XML 1.0 (управляющие, кроме табуляции и переводов строк)
+_ILLEGAL_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+    '</Relationships>'
+)
+# Два стиля ячеек: 0 - обычный, 1 - жирный (заголовок)
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font><font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Файлоподобный объект без перемотки: накапливает записанные байты до следующего drain().
+
+    zipfile, не сумев выполнить seek, пишет архив последовательно (с дескрипторами данных),
+    поэтому готовые части архива можно отдавать клиенту сразу.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def _cell(value, style: int = 0) -> str:
+    style_attr = f' s="{style}"' if style else ''
+    if value is None:
+        return f'<c{style_attr}/>'
+    if isinstance(value, bool):
+        return f'<c t="b"{style_attr}><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c{style_attr}><v>{value}</v></c>'
+    text = escape(_ILLEGAL_XML_CHARS.sub('', str(value)))
+    return f'<c t="inlineStr"{style_attr}><is><t xml:space="preserve">{text}</t></is></c>'
+
+def _row(values, style: int = 0) -> str:
+    return '<row>' + ''.join(_cell(value, style) for value in values) + '</row>'
+
+def stream_xlsx(header, rows, sheet_name: str = 'Лист1', chunk_size: int = 1000):
+    """
+    Потоково формирует XLSX-файл с одним листом, отдавая архив частями.
+
+    Строки листа записываются в zip-поток по мере поступления пачками по chunk_size,
+    книга целиком в памяти не строится. Строки хранятся как inline-строки
+    (без таблицы sharedStrings), числа - как числа. Заголовок выделяется жирным.
+
+    Параметры:
+        header (Sequence[str]): Названия столбцов.
+        rows (Iterable[Sequence]): Строки значений (str, int, float, bool или None).
+        sheet_name (str): Название листа (не длиннее 31 символа).
+        chunk_size (int): Количество строк между отдачами очередной части архива.
+
+    Возвращает (генератор):
+        bytes: Очередная часть файла.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        archive.writestr('_rels/.rels', _ROOT_RELS)
+        archive.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS)
+        archive.writestr('xl/styles.xml', _STYLES)
+        archive.writestr('xl/workbook.xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name="{escape(sheet_name[:31])}" sheetId="1" r:id="rId1"/></sheets>'
+            '</workbook>'
+        ))
+        yield sink.drain()
+
+        # Размер листа заранее неизвестен, поэтому сразу разрешаем zip64
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                + _row(header, style=1)
+            ).encode('utf-8'))
+
+            batch = []
+            for values in rows:
+                batch.append(_row(values))
+                if len(batch) >= chunk_size:
+                    sheet.write(''.join(batch).encode('utf-8'))
+                    batch = []
+                    data = sink.drain()
+                    if data:
+                        yield data
+            sheet.write((''.join(batch) + '</sheetData></worksheet>').encode('utf-8'))
+
+    yield sink.drain()
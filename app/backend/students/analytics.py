@@ -0,0 +1,150 @@
+from django.db.models import Aggregate, Avg, Count, F, FloatField, Func, IntegerField, Max, Min, StdDev, Value
+
+from .ranks import METRIC_FIELDS
+from .rating import rating_queryset
+
+# Разрез аналитики → (поле ключа, поле подписи); для всего университета разреза нет
+ANALYTICS_GROUPINGS = {
+    'university': None,
+    'faculty': ('faculty_id', 'faculty__short_name'),
+    'department': ('department_id', 'department__short_name'),
+    'course': ('group__course', 'group__course'),
+    'group': ('group_id', 'group__name'),
+}
+
+# Перцентили, которые считаются для каждого разреза
+PERCENTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+DEFAULT_BINS = 10
+MAX_BINS = 50
+
+
+class PercentileCont(Aggregate):
+    """
+    Непрерывный перцентиль PostgreSQL: percentile_cont(доля) WITHIN GROUP (ORDER BY выражение).
+    """
+    function = 'PERCENTILE_CONT'
+    template = '%(function)s(%(fraction)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+    output_field = FloatField()
+
+    def __init__(self, expression, fraction: float, **extra):
+        super().__init__(expression, fraction=float(fraction), **extra)
+
+class WidthBucket(Func):
+    """
+    Номер интервала гистограммы PostgreSQL: width_bucket(значение, нижняя граница, верхняя граница, интервалов).
+    """
+    function = 'WIDTH_BUCKET'
+    output_field = IntegerField()
+
+
+def _int_param(query_params, name):
+    value = query_params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"Параметр {name} должен быть целым числом")
+
+def parse_analytics_params(query_params) -> dict:
+    """
+    Проверяет и нормализует параметры запроса аналитики.
+
+    Параметры запроса:
+        metric (str): 'total' (по умолчанию) или категория.
+        by (str): Разрез - 'university' (по умолчанию), 'faculty', 'department', 'course', 'group'.
+        bins (int): Количество интервалов гистограммы (по умолчанию 10, не больше 50).
+        faculty, course, group (int): Фильтры, как в рейтинге.
+
+    Исключения:
+        ValueError: При неизвестном показателе или разрезе и некорректных числах.
+    """
+    metric = query_params.get('metric') or 'total'
+    if metric not in METRIC_FIELDS:
+        raise ValueError(f"Неизвестный показатель: {metric}")
+
+    by = query_params.get('by') or 'university'
+    if by not in ANALYTICS_GROUPINGS:
+        raise ValueError(f"Неизвестный разрез: {by}")
+
+    bins = _int_param(query_params, 'bins') or DEFAULT_BINS
+
+    return {
+        'metric': metric,
+        'by': by,
+        'bins': max(1, min(bins, MAX_BINS)),
+        'faculty': _int_param(query_params, 'faculty'),
+        'course': _int_param(query_params, 'course'),
+        'group': _int_param(query_params, 'group'),
+    }
+
+def score_distribution(params: dict) -> dict:
+    """
+    Считает распределение баллов по разрезам на стороне БД - двумя агрегирующими запросами.
+
+    Первый запрос для каждого разреза возвращает количество студентов, среднее, минимум, максимум,
+    стандартное отклонение и перцентили (percentile_cont). Второй - гистограмму: количество
+    студентов в каждом интервале width_bucket. Интервалы общие для всех разрезов (от минимального
+    до максимального балла среди выбранных студентов), чтобы гистограммы можно было сравнивать.
+
+    Возвращает:
+        dict: {"metric", "by", "bins": {"lower", "upper", "width", "count"}, "results": [
+                  {"key", "label", "count", "mean", "min", "max", "stddev", "percentiles": {"p50": ...}, "histogram": [...]}
+              ]}
+    """
+    field = METRIC_FIELDS[params['metric']]
+    grouping = ANALYTICS_GROUPINGS[params['by']]
+    students = rating_queryset(params)
+
+    if grouping:
+        key_field, label_field = grouping
+        # Студенты вне разреза (например, без группы при разрезе по группам) не учитываются
+        students = students.filter(**{f'{key_field}__isnull': False})
+        group_fields = {'key': F(key_field), 'label': F(label_field)}
+    else:
+        group_fields = {'key': Value(None, output_field=IntegerField()), 'label': Value("Университет")}
+
+    stats = list(
+        students.order_by().annotate(**group_fields).values('key', 'label').annotate(
+            count=Count('id'),
+            mean=Avg(field),
+            min=Min(field),
+            max=Max(field),
+            stddev=StdDev(field),
+            **{f'p{round(p * 100)}': PercentileCont(field, p) for p in PERCENTILES},
+        ).order_by('label')
+    )
+
+    bins = params['bins']
+    lower = min((row['min'] for row in stats), default=0)
+    # Верхняя граница width_bucket не включается, поэтому максимальный балл сдвигаем на 1
+    upper = max((row['max'] for row in stats), default=0) + 1
+
+    histograms = {row['key']: [0] * bins for row in stats}
+    buckets = students.order_by().annotate(**group_fields).annotate(
+        bucket=WidthBucket(field, Value(lower), Value(upper), Value(bins)),
+    ).values('key', 'bucket').annotate(n=Count('id'))
+    for row in buckets:
+        histograms[row['key']][row['bucket'] - 1] = row['n']
+
+    results = []
+    for row in stats:
+        results.append({
+            "key": row['key'],
+            "label": str(row['label']) if params['by'] != 'course' else f"{row['label']} курс",
+            "count": row['count'],
+            "mean": round(row['mean'], 2),
+            "min": row['min'],
+            "max": row['max'],
+            "stddev": round(row['stddev'], 2),
+            "percentiles": {f'p{round(p * 100)}': row[f'p{round(p * 100)}'] for p in PERCENTILES},
+            "histogram": histograms[row['key']],
+        })
+
+    return {
+        "metric": params['metric'],
+        "by": params['by'],
+        "bins": {"lower": lower, "upper": upper, "width": (upper - lower) / bins, "count": bins},
+        "results": results,
+    }
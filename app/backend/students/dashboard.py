@@ -0,0 +1,258 @@
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import Count, Q
+from django.db.models.functions import Upper
+from django.utils import timezone
+
+from university_structure.models import Group
+from .models import Document, Student
+from .rollups import UNIVERSITY_KEY, rollup_stats
+from .rating import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, MAX_SEARCH_LENGTH, decode_cursor, encode_cursor, search_filter
+from .scoring import get_choice_labels
+from .serializers import DashboardStudentSerializer, PendingDocumentSerializer
+
+# Статус документов в разделе проверки по умолчанию; 'all' - документы в любом статусе
+DEFAULT_DOCUMENT_STATUS = 'pending'
+
+# Сколько лучших студентов показывается в статистике кабинета
+DASHBOARD_TOP = 5
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def staff_scope(user, staff) -> tuple[str | None, object]:
+    """
+    Определяет зону видимости сотрудника и queryset подведомственных студентов.
+
+    Ректорат видит весь университет, деканат - свой факультет, кафедра - свою кафедру.
+
+    Возвращает:
+        tuple: (scope - 'university', 'faculty', 'department' или None, queryset студентов)
+    """
+    students = Student.objects.all()
+    if user.is_rectorate:
+        return 'university', students
+    if user.is_dean:
+        return 'faculty', students.filter(faculty=staff.faculty)
+    if user.is_dept_staff:
+        return 'department', students.filter(department=staff.department)
+    return None, students
+
+def scope_groups(scope, staff):
+    """
+    Возвращает queryset групп в зоне видимости сотрудника.
+    """
+    if scope == 'faculty':
+        return Group.objects.filter(department__faculty=staff.faculty)
+    if scope == 'department':
+        return Group.objects.filter(department=staff.department)
+    return Group.objects.all()
+
+def scope_rollup(scope, staff, group=None) -> tuple[str, int | None]:
+    """
+    Возвращает строку сводки баллов (разрез, ключ) для зоны видимости сотрудника или её группы.
+
+    Для группы вне зоны видимости ключ равен None - статистика по ней не выдаётся.
+    """
+    if group is not None:
+        in_scope = scope in (None, 'university') or scope_groups(scope, staff).filter(id=group).exists()
+        return 'group', group if in_scope else None
+    if scope == 'faculty':
+        return 'faculty', staff.faculty_id
+    if scope == 'department':
+        return 'department', staff.department_id
+    return 'university', UNIVERSITY_KEY
+
+def _int_param(query_params, name):
+    value = query_params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"Параметр {name} должен быть целым числом")
+
+def _date_param(query_params, name):
+    value = query_params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Параметр {name} должен быть датой в формате ГГГГ-ММ-ДД")
+
+def parse_dashboard_params(query_params) -> dict:
+    """
+    Проверяет и нормализует параметры запросов разделов кабинета сотрудника.
+
+    Параметры запроса:
+        group (int): id группы.
+        q (str): Поиск по ФИО, номеру зачётки или названию группы (раздел студентов).
+        category (str): Категория документа.
+        status (str): Статус документа ('pending' по умолчанию, 'all' - любой).
+        date_from, date_to (str): Границы даты загрузки документа включительно (ГГГГ-ММ-ДД).
+        page_size (int): Размер страницы (по умолчанию 50, не больше 200).
+        cursor (str): Курсор следующей страницы из предыдущего ответа.
+
+    Исключения:
+        ValueError: При неизвестной категории или статусе и некорректных числах, датах или курсоре.
+    """
+    category = query_params.get('category') or None
+    if category is not None and category not in get_choice_labels('categories'):
+        raise ValueError(f"Неизвестная категория: {category}")
+
+    status = query_params.get('status') or DEFAULT_DOCUMENT_STATUS
+    if status != 'all' and status not in get_choice_labels('metadata.statuses'):
+        raise ValueError(f"Неизвестный статус: {status}")
+
+    page_size = _int_param(query_params, 'page_size') or DEFAULT_PAGE_SIZE
+    cursor = query_params.get('cursor')
+
+    return {
+        'group': _int_param(query_params, 'group'),
+        'q': (query_params.get('q') or '').strip()[:MAX_SEARCH_LENGTH] or None,
+        'category': category,
+        'status': status,
+        'date_from': _date_param(query_params, 'date_from'),
+        'date_to': _date_param(query_params, 'date_to'),
+        'page_size': max(1, min(page_size, MAX_PAGE_SIZE)),
+        'cursor': decode_cursor(cursor) if cursor else None,
+    }
+
+def _scoped_students(students, params: dict):
+    """
+    Студенты зоны видимости с фильтрами по группе и поисковой строке (как в рейтинге).
+    """
+    if params.get('group') is not None:
+        students = students.filter(group_id=params['group'])
+    if params.get('q'):
+        students = students.alias(
+            search_name=Upper('full_name'),
+            search_record_book=Upper('record_book'),
+        ).filter(search_filter(params['q']))
+    return students
+
+def _scoped_documents(students, params: dict):
+    """
+    Документы студентов зоны видимости с фильтрами по группе, категории, статусу и дате загрузки.
+    """
+    documents = Document.objects.filter(student__in=students)
+    if params.get('group') is not None:
+        documents = documents.filter(student__group_id=params['group'])
+    if params.get('category'):
+        documents = documents.filter(category=params['category'])
+    if params.get('status', DEFAULT_DOCUMENT_STATUS) != 'all':
+        documents = documents.filter(status=params.get('status', DEFAULT_DOCUMENT_STATUS))
+
+    tz = timezone.get_current_timezone()
+    if params.get('date_from'):
+        documents = documents.filter(uploaded_at__gte=datetime.combine(params['date_from'], datetime.min.time(), tz))
+    if params.get('date_to'):
+        next_day = params['date_to'] + timedelta(days=1)
+        documents = documents.filter(uploaded_at__lt=datetime.combine(next_day, datetime.min.time(), tz))
+    return documents
+
+def dashboard_counts(scope, staff, students) -> dict:
+    """
+    Счётчики для заголовков разделов кабинета: студенты (из сводки баллов), документы на проверке и группы.
+    """
+    return {
+        "students": rollup_stats(*scope_rollup(scope, staff))['total_students'],
+        "pending_documents": Document.objects.filter(student__in=students, status='pending').count(),
+        "groups": scope_groups(scope, staff).count(),
+    }
+
+def dashboard_stats(scope, staff, students, params: dict) -> dict:
+    """
+    Статистика раздела кабинета по студентам зоны видимости (с учётом фильтра по группе).
+
+    Количество, средний балл и суммы по категориям читаются из сводки баллов (ScoreRollup)
+    без агрегата по студентам. Лучшие студенты и минимальный балл выбираются по индексу
+    общего балла (ORDER BY ... LIMIT), число документов на проверке - отдельным запросом.
+    """
+    stats = rollup_stats(*scope_rollup(scope, staff, params.get('group')))
+    students = _scoped_students(students, {'group': params.get('group')})
+    top = list(students.order_by('-total_score', 'id').values('id', 'user_id', 'full_name', 'total_score')[:DASHBOARD_TOP])
+    min_score = students.order_by('total_score').values_list('total_score', flat=True).first()
+
+    return {
+        "total_students": stats['total_students'],
+        "avg_score": stats['avg_score'],
+        "max_score": top[0]['total_score'] if top else 0,
+        "min_score": min_score or 0,
+        "category_totals": stats['category_totals'],
+        "pending_documents": _scoped_documents(students, {'status': 'pending'}).count(),
+        "top": top,
+    }
+
+def dashboard_students_page(students, params: dict) -> dict:
+    """
+    Страница раздела студентов кабинета, упорядоченная по общему баллу (keyset-пагинация, как в рейтинге).
+
+    Возвращает:
+        dict: {"results": [...], "next_cursor": str | None}
+    """
+    students = DashboardStudentSerializer.setup_eager_loading(_scoped_students(students, params))
+
+    if params.get('cursor'):
+        value, last_id = params['cursor']
+        students = students.filter(Q(total_score__lt=value) | Q(total_score=value, id__gt=last_id))
+
+    page_size = params['page_size']
+    students = list(students.order_by('-total_score', 'id')[:page_size + 1])
+
+    next_cursor = None
+    if len(students) > page_size:
+        students = students[:page_size]
+        next_cursor = encode_cursor(students[-1].total_score, students[-1].id)
+
+    return {
+        "results": DashboardStudentSerializer(students, many=True).data,
+        "next_cursor": next_cursor,
+    }
+
+def dashboard_documents_page(students, params: dict) -> dict:
+    """
+    Страница раздела документов кабинета: сначала новые, keyset-пагинация по (uploaded_at, id).
+
+    Момент загрузки хранится в курсоре целым числом микросекунд, поэтому
+    позиция восстанавливается без потери точности.
+
+    Возвращает:
+        dict: {"results": [...], "next_cursor": str | None}
+    """
+    documents = PendingDocumentSerializer.setup_eager_loading(_scoped_documents(students, params))
+
+    if params.get('cursor'):
+        value, last_id = params['cursor']
+        uploaded_at = _EPOCH + timedelta(microseconds=value)
+        documents = documents.filter(Q(uploaded_at__lt=uploaded_at) | Q(uploaded_at=uploaded_at, id__lt=last_id))
+
+    page_size = params['page_size']
+    documents = list(documents.order_by('-uploaded_at', '-id')[:page_size + 1])
+
+    next_cursor = None
+    if len(documents) > page_size:
+        documents = documents[:page_size]
+        last = documents[-1]
+        next_cursor = encode_cursor((last.uploaded_at - _EPOCH) // timedelta(microseconds=1), last.id)
+
+    return {
+        "results": PendingDocumentSerializer(documents, many=True).data,
+        "next_cursor": next_cursor,
+    }
+
+def dashboard_groups(scope, staff) -> list[dict]:
+    """
+    Группы зоны видимости сотрудника с количеством студентов и документов на проверке - одним запросом.
+    """
+    return list(
+        scope_groups(scope, staff).annotate(
+            students_count=Count('students', distinct=True),
+            pending_documents=Count(
+                'students__student_documents',
+                filter=Q(students__student_documents__status='pending'),
+                distinct=True,
+            ),
+        ).values('id', 'name', 'course', 'students_count', 'pending_documents').order_by('course', 'name')
+    )
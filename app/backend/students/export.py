@@ -0,0 +1,234 @@
+import csv
+import hashlib
+import json
+import os
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import Count, F, Q, Value, Window
+from django.db.models.functions import Coalesce, DenseRank
+
+from main.models import DataVersion
+from main.xlsx import stream_xlsx
+from .ranks import dense_rank, partition_scores
+from .rating import (
+    RATING_DATA, RATING_SORT_FIELDS, order_by_keys, rank_partition, rank_scope, rating_ordering, rating_queryset,
+)
+from .scoring import get_choices_from_config
+
+# Размер пачки строк, которую сервер БД отдаёт за одно обращение к курсору
+EXPORT_CHUNK_SIZE = 2000
+
+# Поля строки выгрузки - те же, что у StudentRatingSerializer, плюс место в рейтинге
+EXPORT_FIELDS = [
+    'rank',
+    'id',
+    'user_id',
+    'full_name',
+    'group',
+    'course',
+    'faculty',
+    'total_score',
+    'academic_score',
+    'research_score',
+    'sport_score',
+    'social_score',
+    'cultural_score',
+]
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json',
+}
+
+SPREADSHEET_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def iter_rating_rows(params: dict, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """
+    Построчно возвращает весь рейтинг (без пагинации) в виде словарей.
+
+    Строки читаются серверным курсором (QuerySet.iterator) пачками по chunk_size, подписи
+    группы и факультета вычисляются в том же запросе, а место в рейтинге - по набору баллов
+    разреза (partition_scores), без запроса на каждую строку. Модели и сериализаторы
+    DRF не создаются, поэтому потребление памяти не зависит от количества студентов.
+    Учитываются фильтры и сортировка из parse_rating_params, курсор, page_size и as_of игнорируются.
+    """
+    field = RATING_SORT_FIELDS[params['sort']]
+
+    scope = rank_scope(params)
+    scores = partition_scores(scope, rank_partition(params, scope))[params['sort']] if scope else None
+
+    rows = rating_queryset(params).order_by(*order_by_keys(rating_ordering(params, field))).values(
+        'id', 'user_id', 'full_name',
+        'total_score', 'academic_score', 'research_score', 'sport_score', 'social_score', 'cultural_score',
+        group_name=Coalesce(F('group__name'), Value("Без группы")),
+        group_course=Coalesce(F('group__course'), Value(0)),
+        faculty_name=Coalesce(F('faculty__short_name'), Value("—")),
+    )
+
+    for row in rows.iterator(chunk_size=chunk_size):
+        row['group'] = row.pop('group_name')
+        row['course'] = row.pop('group_course')
+        row['faculty'] = row.pop('faculty_name')
+        row['rank'] = dense_rank(scores, row[field]) if scores is not None else None
+        yield {name: row[name] for name in EXPORT_FIELDS}
+
+def _batched_lines(rows, chunk_size: int):
+    """
+    Кодирует строки в json и группирует их, чтобы не отдавать серверу по одной короткой строке.
+    """
+    batch = []
+    for row in rows:
+        batch.append(json.dumps(row, ensure_ascii=False))
+        if len(batch) >= chunk_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def stream_ndjson(rows, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """
+    Потоково кодирует строки в NDJSON: один json-объект на строку.
+    """
+    for batch in _batched_lines(rows, chunk_size):
+        yield ('\n'.join(batch) + '\n').encode('utf-8')
+
+def stream_json_array(rows, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """
+    Потоково кодирует строки в один json-массив, не собирая его в памяти.
+    """
+    yield b'['
+    separator = ''
+    for batch in _batched_lines(rows, chunk_size):
+        yield (separator + ','.join(batch)).encode('utf-8')
+        separator = ','
+    yield b']'
+
+def stream_rating_export(params: dict, export_format: str, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """
+    Возвращает генератор байтов выгрузки рейтинга в указанном формате (ключ EXPORT_FORMATS).
+    """
+    rows = iter_rating_rows(params, chunk_size)
+    if export_format == 'ndjson':
+        return stream_ndjson(rows, chunk_size)
+    return stream_json_array(rows, chunk_size)
+
+def scholarship_header() -> list[str]:
+    """
+    Возвращает заголовки столбцов стипендиальной ведомости (названия категорий - из scoring_config.json).
+    """
+    categories = get_choices_from_config('categories')
+    return [
+        "Факультет", "Курс", "Место", "ФИО", "Группа", "Зачётная книжка", "Общий балл",
+        *(label for _, label in categories),
+        *(f"{label}: подтверждённых документов" for _, label in categories),
+        "Подтверждённых документов",
+    ]
+
+def iter_scholarship_rows(params: dict, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """
+    Построчно возвращает стипендиальную ведомость: рейтинг по каждому факультету и курсу.
+
+    Вся ведомость - один упорядоченный SQL-запрос: место (DENSE_RANK по показателю params['sort']
+    внутри факультета и курса), баллы по всем категориям и количество подтверждённых документов
+    (всего и по категориям) вычисляются в БД. Строки читаются серверным курсором, порядок -
+    факультет, курс, место. Фильтры faculty/course/group из parse_rating_params учитываются.
+
+    Возвращает (генератор):
+        tuple: Значения строки в порядке scholarship_header().
+    """
+    field = RATING_SORT_FIELDS[params['sort']]
+    categories = [key for key, _ in get_choices_from_config('categories')]
+    score_fields = [f'{category}_score' for category in categories]
+    approved = Q(student_documents__status='approved')
+
+    rows = rating_queryset(params).annotate(
+        place=Window(DenseRank(), partition_by=[F('faculty_id'), F('group__course')], order_by=F(field).desc()),
+        approved_documents=Count('student_documents', filter=approved),
+        **{
+            f'approved_{category}': Count('student_documents', filter=approved & Q(student_documents__category=category))
+            for category in categories
+        },
+    ).order_by('faculty__short_name', 'faculty_id', 'group__course', f'-{field}', 'id').values_list(
+        'faculty__short_name', 'group__course', 'place', 'full_name', 'group__name', 'record_book', 'total_score',
+        *score_fields,
+        *(f'approved_{category}' for category in categories),
+        'approved_documents',
+    )
+
+    for faculty, course, *rest in rows.iterator(chunk_size=chunk_size):
+        yield (faculty or "—", course or "—", *rest)
+
+class _Echo:
+    """
+    Псевдобуфер для csv.writer: вместо записи возвращает строку (см. документацию Django о потоковом CSV).
+    """
+    def write(self, value):
+        return value
+
+def stream_csv(header, rows, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """
+    Потоково кодирует строки в CSV для Excel: UTF-8 с BOM и разделитель «;», как ожидает русская локаль.
+    """
+    writer = csv.writer(_Echo(), delimiter=';')
+    yield ('\ufeff' + writer.writerow(header)).encode('utf-8')
+
+    batch = []
+    for values in rows:
+        batch.append(writer.writerow(values))
+        if len(batch) >= chunk_size:
+            yield ''.join(batch).encode('utf-8')
+            batch = []
+    if batch:
+        yield ''.join(batch).encode('utf-8')
+
+def stream_scholarship_export(params: dict, export_format: str, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """
+    Возвращает генератор байтов стипендиальной ведомости в формате 'csv' или 'xlsx'.
+    """
+    rows = iter_scholarship_rows(params, chunk_size)
+    if export_format == 'xlsx':
+        return stream_xlsx(scholarship_header(), rows, sheet_name="Рейтинг", chunk_size=chunk_size)
+    return stream_csv(scholarship_header(), rows, chunk_size)
+
+def export_cache_path(name: str, params: dict, extension: str) -> Path:
+    """
+    Возвращает путь файла выгрузки в кэше для текущей версии данных рейтинга и набора параметров.
+
+    После подтверждения документа или правки студента версия меняется (DataVersion 'rating'),
+    и выгрузка формируется заново под новым именем файла.
+    """
+    params_key = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+    version = DataVersion.get(RATING_DATA)
+    return Path(settings.EXPORT_CACHE_DIR) / f"{name}-{params_key}-v{version}.{extension}"
+
+def cache_export(path: Path, chunks):
+    """
+    Отдаёт части выгрузки дальше, одновременно записывая их в файл кэша.
+
+    Файл пишется во временный и переименовывается только после успешного завершения,
+    поэтому прерванная загрузка не оставляет в кэше обрезанный файл. После записи
+    удаляются файлы той же выгрузки для более старых версий данных.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.part")
+    try:
+        with open(tmp_path, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+                yield chunk
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+    stem, version = path.stem.rsplit('-v', 1)
+    for stale in path.parent.glob(f"{stem}-v*{path.suffix}"):
+        stale_version = stale.stem.rsplit('-v', 1)[1]
+        if stale_version.isdigit() and int(stale_version) < int(version):
+            stale.unlink(missing_ok=True)
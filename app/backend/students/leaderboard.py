@@ -0,0 +1,123 @@
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+
+from .models import Student
+from .ranks import METRIC_FIELDS
+
+# Категории, по которым строятся лидерборды (все показатели рейтинга, кроме общего)
+LEADERBOARD_CATEGORIES = [metric for metric in METRIC_FIELDS if metric != 'total']
+
+# Разбиение лидербордов → поле студента, по которому делится список
+LEADERBOARD_PARTITIONS = {
+    'faculty': 'faculty_id',
+    'course': 'group__course',
+}
+
+DEFAULT_LEADERBOARD_TOP = 10
+MAX_LEADERBOARD_TOP = 100
+
+
+def parse_leaderboard_params(query_params) -> dict:
+    """
+    Проверяет и нормализует параметры запроса лидербордов.
+
+    Параметры запроса:
+        top (int): Сколько лучших студентов вернуть в каждой категории (по умолчанию 10, не больше 100).
+        partition (str): 'faculty' или 'course' - отдельный список для каждого факультета/курса.
+        category (str): Одна категория вместо всех.
+
+    Исключения:
+        ValueError: При неизвестном разбиении или категории и некорректном top.
+    """
+    top = query_params.get('top')
+    try:
+        top = int(top) if top not in (None, '') else DEFAULT_LEADERBOARD_TOP
+    except ValueError:
+        raise ValueError("Параметр top должен быть целым числом")
+
+    partition = query_params.get('partition') or None
+    if partition is not None and partition not in LEADERBOARD_PARTITIONS:
+        raise ValueError(f"Неизвестное разбиение: {partition}")
+
+    category = query_params.get('category') or None
+    if category is not None and category not in LEADERBOARD_CATEGORIES:
+        raise ValueError(f"Неизвестная категория: {category}")
+
+    return {
+        'top': max(1, min(top, MAX_LEADERBOARD_TOP)),
+        'partition': partition,
+        'categories': [category] if category else LEADERBOARD_CATEGORIES,
+    }
+
+def leaderboards(params: dict) -> dict:
+    """
+    Возвращает топ-K студентов по каждой категории одним SQL-запросом.
+
+    Для каждой категории вычисляется ROW_NUMBER() OVER (PARTITION BY факультет/курс
+    ORDER BY баллы DESC, id), и из БД выбираются только студенты, попавшие в топ хотя бы
+    одной категории. Студенты без баллов в категории в её список не попадают.
+
+    Возвращает:
+        dict: {"partition": ..., "top": K, "results": {категория: [{"key", "label", "students": [...]}]}}
+
+    Пример:
+        {"partition": "faculty", "top": 3, "results": {"sport": [
+            {"key": 2, "label": "ИТФ", "students": [{"place": 1, "id": 7, "full_name": "...", "score": 20, ...}]}
+        ]}}
+    """
+    top = params['top']
+    categories = params['categories']
+    partition = params['partition']
+    partition_field = LEADERBOARD_PARTITIONS.get(partition)
+
+    windows = {
+        f'{category}_place': Window(
+            RowNumber(),
+            partition_by=[F(partition_field)] if partition_field else None,
+            order_by=[F(METRIC_FIELDS[category]).desc(), F('id').asc()],
+        )
+        for category in categories
+    }
+    in_top = Q()
+    for category in categories:
+        in_top |= Q(**{f'{category}_place__lte': top, f'{METRIC_FIELDS[category]}__gt': 0})
+
+    students = Student.objects.select_related('group', 'faculty')
+    if partition_field:
+        # Студенты без факультета/группы не относятся ни к одному списку
+        students = students.filter(**{f'{partition_field}__isnull': False})
+    students = students.annotate(**windows).filter(in_top)
+
+    groups = {category: {} for category in categories}
+    for student in students:
+        if partition == 'faculty':
+            key, label = student.faculty_id, student.faculty.short_name
+        elif partition == 'course':
+            key, label = student.group.course, f"{student.group.course} курс"
+        else:
+            key, label = None, "Университет"
+
+        for category in categories:
+            place = getattr(student, f'{category}_place')
+            score = getattr(student, METRIC_FIELDS[category])
+            if place > top or not score:
+                continue
+            group = groups[category].setdefault(key, {"key": key, "label": label, "students": []})
+            group["students"].append({
+                "place": place,
+                "id": student.id,
+                "full_name": student.full_name,
+                "group": student.group.name if student.group else "Без группы",
+                "course": student.group.course if student.group else 0,
+                "faculty": student.faculty.short_name if student.faculty else "—",
+                "score": score,
+            })
+
+    results = {}
+    for category in categories:
+        ordered = sorted(groups[category].values(), key=lambda g: g["label"] if partition == 'faculty' else (g["key"] or 0))
+        for group in ordered:
+            group["students"].sort(key=lambda s: s["place"])
+        results[category] = ordered
+
+    return {"partition": partition, "top": top, "results": results}
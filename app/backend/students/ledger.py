@@ -0,0 +1,100 @@
+from django.db import transaction
+from django.db.models import Q, Sum
+
+from main.models import DataVersion
+from .models import ScoreEvent, Student
+from .ranks import METRIC_FIELDS
+from .rating import RATING_DATA
+from .rollups import rebuild_rollups
+from .services import touch_students
+from .tasks import rating_changed
+
+# Категории баллов (показатели рейтинга без общего)
+CATEGORIES = [metric for metric in METRIC_FIELDS if metric != 'total']
+
+
+def ledger_scores(student_ids=None) -> dict:
+    """
+    Сворачивает журнал баллов одним агрегирующим запросом: GROUP BY студент с SUM ... FILTER по категориям.
+
+    Запрос читает журнал одним проходом и может выполняться PostgreSQL параллельно
+    (Parallel Seq Scan + Partial HashAggregate).
+
+    Параметры:
+        student_ids (Iterable[int] | None): Свернуть журнал только этих студентов (None - всех).
+
+    Возвращает:
+        dict: {student_id: {категория: сумма}} для студентов, у которых есть события.
+    """
+    events = ScoreEvent.objects.order_by()
+    if student_ids is not None:
+        events = events.filter(student_id__in=student_ids)
+    rows = events.values('student_id').annotate(**{
+        category: Sum('delta', filter=Q(category=category)) for category in CATEGORIES
+    })
+    return {row['student_id']: {category: row[category] or 0 for category in CATEGORIES} for row in rows}
+
+def _score_drift(rows, totals) -> list[dict]:
+    """
+    Сравнивает баллы студентов (student_id, *баллы по CATEGORIES) со свёрткой журнала.
+    """
+    drift = []
+    for student_id, *scores in rows:
+        expected = totals.get(student_id, dict.fromkeys(CATEGORIES, 0))
+        drift.extend(
+            {"student_id": student_id, "category": category, "stored": stored, "ledger": expected[category]}
+            for category, stored in zip(CATEGORIES, scores) if stored != expected[category]
+        )
+    return drift
+
+def rebuild_scores(dry_run: bool = False, chunk_size: int = 5000) -> list[dict]:
+    """
+    Пересобирает баллы студентов (Student.*_score) из журнала баллов.
+
+    Сначала расхождения ищутся без блокировок - по свёртке всего журнала. Затем студенты
+    с расхождениями пачками блокируются (SELECT ... FOR UPDATE), и для них заново сворачивается
+    журнал и читаются баллы. apply_score_events пишет события и изменяет строку студента в одной
+    транзакции, поэтому, пока строка заблокирована, новые события этого студента не фиксируются:
+    записанные баллы совпадают со свёрткой, а начисления, ожидающие блокировку, прибавляются к ним после.
+    После исправления в том же запуске пересобирается сводка баллов, увеличивается версия
+    данных рейтинга (по ней пересчитываются места) и ставятся фоновые задачи (rating_changed).
+
+    Параметры:
+        dry_run (bool): Только найти расхождения, ничего не записывая.
+        chunk_size (int): Размер пачки студентов.
+
+    Возвращает:
+        list[dict]: Расхождения - {"student_id", "category", "stored", "ledger"}.
+    """
+    fields = [METRIC_FIELDS[category] for category in CATEGORIES]
+    drift = _score_drift(
+        Student.objects.values_list('id', *fields).iterator(chunk_size=chunk_size), ledger_scores(),
+    )
+    if dry_run:
+        return drift
+
+    student_ids = sorted({item['student_id'] for item in drift})
+    fixed = []
+    for start in range(0, len(student_ids), chunk_size):
+        chunk = student_ids[start:start + chunk_size]
+        with transaction.atomic():
+            rows = list(
+                Student.objects.select_for_update().filter(id__in=chunk).order_by('id').values_list('id', *fields)
+            )
+            totals = ledger_scores(chunk)
+            chunk_drift = _score_drift(rows, totals)
+            to_update = [
+                Student(id=student_id, **{
+                    METRIC_FIELDS[category]: totals.get(student_id, {}).get(category, 0) for category in CATEGORIES
+                })
+                for student_id in {item['student_id'] for item in chunk_drift}
+            ]
+            Student.objects.bulk_update(to_update, fields)
+            touch_students(student.id for student in to_update)
+        fixed.extend(chunk_drift)
+
+    if fixed:
+        rebuild_rollups()
+        DataVersion.bump(RATING_DATA)
+        rating_changed()
+    return fixed
@@ -0,0 +1,66 @@
+import resource
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from students.export import EXPORT_FORMATS, stream_rating_export
+from students.models import Student
+from students.rating import parse_rating_params, rating_queryset
+from students.serializers import StudentRatingSerializer
+
+class Command(BaseCommand):
+    help = (
+        'Замер пикового потребления памяти потоковой выгрузкой рейтинга. '
+        'Синтетические студенты создаются в транзакции, которая затем откатывается'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, nargs='+', default=[10000, 200000], help='Количества синтетических студентов')
+        parser.add_argument('--output', choices=list(EXPORT_FORMATS), default='ndjson', help='Формат выгрузки')
+        parser.add_argument('--compare', action='store_true', help='Также замерить выгрузку через StudentRatingSerializer целиком')
+
+    def handle(self, *args, **options):
+        params = parse_rating_params({})
+
+        # Замеры по возрастанию: ru_maxrss монотонен, поэтому рост пика виден только так
+        for count in sorted(options['students']):
+            with transaction.atomic():
+                self._create_students(count)
+                self._measure(f'{count} студентов, поток {options["output"]}',
+                              lambda: sum(len(chunk) for chunk in stream_rating_export(params, options['output'])))
+                if options['compare']:
+                    self._measure(f'{count} студентов, сериализатор',
+                                  lambda: len(repr(StudentRatingSerializer(rating_queryset(params), many=True).data)))
+                transaction.set_rollback(True)
+
+    def _create_students(self, count):
+        """
+        Вставляет студентов одним INSERT ... SELECT generate_series, не создавая объекты в Python.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {Student._meta.db_table}
+                    (full_name, phone, academic_score, research_score, sport_score, social_score, cultural_score, created_at)
+                SELECT 'Бенчмарк ' || n, '-', n %% 97, n %% 89, n %% 83, n %% 79, n %% 73, now()
+                FROM generate_series(1, %s) AS n
+                """,
+                [count],
+            )
+
+    def _measure(self, label, run):
+        tracemalloc.start()
+        started = time.perf_counter()
+        size = run()
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # ru_maxrss в Linux - в килобайтах
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        self.stdout.write(
+            f'{label}: {size / 1024 / 1024:.1f} МБ за {elapsed:.1f} с, '
+            f'пик аллокаций Python {peak / 1024 / 1024:.1f} МБ, пиковый RSS процесса {max_rss:.0f} МБ'
+        )
@@ -0,0 +1,89 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from students.leaderboard import LEADERBOARD_CATEGORIES
+from students.moderation import MAX_BULK_REVIEW, review_document, review_documents
+from students.models import Document, Student
+from students.ranks import METRIC_FIELDS
+from students.rollups import rebuild_rollups, student_rows, update_rollups
+
+class Command(BaseCommand):
+    help = (
+        'Замер пропускной способности модерации: подтверждение документов по одному (как через '
+        '/structure/api/v1/document/<id>/review/) и пачками (как через /structure/api/v1/documents/review/). '
+        'Создаёт и затем удаляет синтетические данные, в конце пересобирает сводку баллов - '
+        'запускать на тестовом стенде'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--documents', type=int, default=1000, help='Количество документов в каждом замере')
+        parser.add_argument('--students', type=int, default=20, help='Между сколькими студентами распределяются документы')
+        parser.add_argument('--batch', type=int, default=MAX_BULK_REVIEW, help='Размер пачки массовой проверки')
+
+    def handle(self, *args, **options):
+        # Замер идёт на закоммиченных данных, как в работе API: в одной длинной транзакции
+        # многократно обновляемые строки сводки баллов накапливают версии и искажают результат
+        user = get_user_model().objects.create(username=f'bench-review-{time.time_ns()}')
+        students = Student.objects.bulk_create([
+            Student(full_name=f'Бенчмарк модерации {i}', phone='-') for i in range(options['students'])
+        ])
+        update_rollups(added=student_rows([student.id for student in students]))
+
+        try:
+            single = self._create_documents(students, options['documents'])
+            bulk = self._create_documents(students, options['documents'])
+
+            single_rate = self._measure('по одному', single, lambda ids: [review_document(i, user, 'approve') for i in ids], 1)
+            bulk_rate = self._measure('пачками', bulk, lambda ids: review_documents(ids, user, 'approve'), options['batch'])
+            self._check(students, single + bulk)
+            self.stdout.write(f'Ускорение массовой проверки: {bulk_rate / single_rate:.1f}x')
+        finally:
+            Student.objects.filter(id__in=[student.id for student in students]).delete()
+            user.delete()
+            rebuild_rollups()
+
+    def _create_documents(self, students, count) -> list[Document]:
+        return Document.objects.bulk_create([
+            Document(
+                student=random.choice(students), category=random.choice(LEADERBOARD_CATEGORIES),
+                achievement=f'Диплом олимпиады {i}', score=random.randint(1, 10),
+            )
+            for i in range(count)
+        ])
+
+    def _measure(self, label, documents, review, batch) -> float:
+        ids = [document.id for document in documents]
+        queries = 0
+
+        def count_queries(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        with connection.execute_wrapper(count_queries):
+            for start in range(0, len(ids), batch):
+                review(ids[start:start + batch])
+        elapsed = time.perf_counter() - started
+        rate = len(ids) / elapsed
+        self.stdout.write(
+            f'{label}: {len(ids)} документов за {elapsed:.2f} с - {rate:.0f} в секунду, '
+            f'{queries / len(ids):.1f} запросов на документ'
+        )
+        return rate
+
+    def _check(self, students, documents):
+        """
+        Сверяет баллы студентов с суммой баллов подтверждённых документов.
+        """
+        expected = {student.id: dict.fromkeys(LEADERBOARD_CATEGORIES, 0) for student in students}
+        for document in documents:
+            expected[document.student_id][document.category] += document.score
+        for student in Student.objects.filter(id__in=expected):
+            scores = {category: getattr(student, METRIC_FIELDS[category]) for category in LEADERBOARD_CATEGORIES}
+            if scores != expected[student.id]:
+                raise CommandError(f'Баллы студента {student.id} разошлись: {scores} вместо {expected[student.id]}')
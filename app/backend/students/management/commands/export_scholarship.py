@@ -0,0 +1,40 @@
+import shutil
+
+from django.core.management.base import BaseCommand, CommandError
+
+from students.export import SPREADSHEET_FORMATS, cache_export, export_cache_path, stream_scholarship_export
+from students.rating import parse_rating_params
+
+class Command(BaseCommand):
+    help = 'Выгрузка стипендиальной ведомости (рейтинг по факультетам и курсам) в CSV или XLSX'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', choices=list(SPREADSHEET_FORMATS), default='csv', help='Формат файла')
+        parser.add_argument('--file', help='Путь к файлу (по умолчанию scholarship.<формат>)')
+        parser.add_argument('--sort', default='total', help='Показатель, по которому определяется место')
+        parser.add_argument('--faculty', help='id факультета')
+        parser.add_argument('--course', help='Курс')
+
+    def handle(self, *args, **options):
+        try:
+            params = parse_rating_params({key: options[key] for key in ('sort', 'faculty', 'course')})
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        params = {key: params[key] for key in ('sort', 'faculty', 'course', 'group')}
+        export_format = options['output']
+        target = options['file'] or f'scholarship.{export_format}'
+        cached = export_cache_path('scholarship', params, export_format)
+
+        try:
+            shutil.copyfile(cached, target)
+        except FileNotFoundError:
+            pass
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Ведомость не изменилась, скопирована из кэша: {target}'))
+            return
+
+        with open(target, 'wb') as f:
+            for chunk in cache_export(cached, stream_scholarship_export(params, export_format)):
+                f.write(chunk)
+        self.stdout.write(self.style.SUCCESS(f'Ведомость сохранена: {target}'))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from students.rollups import rebuild_rollups
+
+class Command(BaseCommand):
+    help = 'Полная пересборка сводки и распределения баллов по университету, факультетам, кафедрам, курсам и группам'
+
+    def handle(self, *args, **options):
+        total = rebuild_rollups()
+        self.stdout.write(self.style.SUCCESS(f'Сводка баллов пересобрана, строк: {total}'))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from students.ledger import rebuild_scores
+
+# Сколько расхождений выводится подробно
+SHOW_DRIFT = 20
+
+class Command(BaseCommand):
+    help = (
+        'Пересборка баллов студентов из журнала баллов: находит расхождения между баллами '
+        'студентов и свёрткой журнала и исправляет их вместе со сводкой баллов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Только показать расхождения, ничего не записывая')
+
+    def handle(self, *args, **options):
+        drift = rebuild_scores(dry_run=options['dry_run'])
+        for item in drift[:SHOW_DRIFT]:
+            self.stdout.write(
+                f"Студент {item['student_id']}, {item['category']}: в профиле {item['stored']}, по журналу {item['ledger']}"
+            )
+        if len(drift) > SHOW_DRIFT:
+            self.stdout.write(f'... и ещё {len(drift) - SHOW_DRIFT}')
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Баллы студентов совпадают с журналом баллов'))
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'Расхождений: {len(drift)} (dry-run, ничего не записано)'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Исправлено расхождений: {len(drift)}'))
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from students.models import Document, ScoringConfigVersion
+from students.scoring import diff_rules
+from students.services import changed_documents_filter, rescore_documents
+
+class Command(BaseCommand):
+    help = 'Инкрементальный пересчёт баллов после изменения scoring_config.json (только изменившиеся правила)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Количество документов в одной пачке')
+        parser.add_argument('--dry-run', action='store_true', help='Только посчитать изменения, ничего не записывать')
+
+    def handle(self, *args, **options):
+        current = ScoringConfigVersion.objects.get(version=ScoringConfigVersion.register_current())
+        self.stdout.write(f'Текущая версия правил: {current.version[:12]}')
+
+        old_versions = (
+            Document.objects.exclude(score_version=current.version)
+            .values_list('score_version', flat=True).distinct().order_by()
+        )
+        known = {v.version: v for v in ScoringConfigVersion.objects.filter(version__in=list(old_versions))}
+
+        total = changed = 0
+        for version in old_versions:
+            documents = Document.objects.filter(score_version=version)
+
+            if version in known:
+                changed_keys = diff_rules(known[version].rules, current.rules)
+                self.stdout.write(f'Версия {version[:12]}: изменилось правил - {len(changed_keys)}')
+                if not changed_keys:
+                    continue
+                documents = documents.filter(changed_documents_filter(changed_keys))
+            else:
+                # Для документов без сохранённой версии правил сравнить нечего - пересчитываем их целиком
+                self.stdout.write(f'Версия {version[:12] or "<не указана>"}: правила неизвестны, полный пересчёт')
+
+            version_total = version_changed = 0
+            for version_total, version_changed in rescore_documents(documents, current.version, options['chunk_size'], options['dry_run']):
+                pass
+            total += version_total
+            changed += version_changed
+
+        prefix = 'Dry run: ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(f'{prefix}Затронуто документов: {total}, баллы изменились у {changed}'))
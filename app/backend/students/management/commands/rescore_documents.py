@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from students.models import Document, ScoringConfigVersion
+from students.services import rescore_documents
+
+class Command(BaseCommand):
+    help = 'Пересчёт баллов всех документов по текущему scoring_config.json (пакетно, без Document.save())'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Количество документов в одной пачке')
+        parser.add_argument('--dry-run', action='store_true', help='Только посчитать изменения, ничего не записывать')
+
+    def handle(self, *args, **options):
+        version = ScoringConfigVersion.register_current() or ''
+        total = changed = 0
+
+        for total, changed in rescore_documents(Document.objects.all(), version, options['chunk_size'], options['dry_run']):
+            self.stdout.write(f'Обработано {total} документов, изменено {changed}')
+
+        prefix = 'Dry run: ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(f'{prefix}Пересчитано документов: {total}, баллы изменились у {changed}'))
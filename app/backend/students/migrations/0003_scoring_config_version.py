@@ -0,0 +1,32 @@
+# Generated by Django 6.0.2 on 2026-10-16 20:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoringConfigVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.CharField(max_length=64, unique=True, verbose_name='Версия')),
+                ('rules', models.JSONField(verbose_name='Правила')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Версия правил начисления',
+                'verbose_name_plural': 'Версии правил начисления',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='score_version',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64, verbose_name='Версия правил начисления'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-16 20:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0003_scoring_config_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='document',
+            name='sub_type',
+            field=models.CharField(choices=[('grades', 'Успеваемость'), ('olympiad', 'Олимпиада / Конкурс'), ('education', 'Доп. обр. программа'), ('contest', 'Научный конкурс'), ('publication', 'Публикация'), ('conference', 'Доклад на конференции'), ('contest', 'Конкурс / Фестиваль'), ('msmk', 'Мастер спорта межд. класса'), ('team_russia', 'Член сборной России'), ('competition', 'Спортивное соревнование'), ('promotion', 'Популяризация спорта'), ('elder', 'Староста'), ('union', 'Профсоюз / Студсовет'), ('volunteer', 'Волонтерская деятельность'), ('career', 'Профориентация / Лагеря')], default='other', max_length=50, verbose_name='Подтип'),
+        ),
+    ]
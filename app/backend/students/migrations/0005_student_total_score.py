@@ -0,0 +1,34 @@
+# Generated by Django 6.0.2 on 2026-10-16 20:38
+
+import django.db.models.expressions
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0004_deterministic_sub_type_choices'),
+        ('university_structure', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='total_score',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('academic_score'), '+', models.F('research_score')), '+', models.F('sport_score')), '+', models.F('social_score')), '+', models.F('cultural_score')), output_field=models.PositiveIntegerField(), verbose_name='Общий балл'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['-total_score', 'id'], name='student_total_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['faculty', '-total_score'], name='student_faculty_total_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['group', '-total_score'], name='student_group_total_idx'),
+        ),
+    ]
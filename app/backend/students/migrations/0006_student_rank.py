@@ -0,0 +1,29 @@
+# Generated by Django 6.0.2 on 2026-10-16 20:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0005_student_total_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentRank',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('university', 'Университет'), ('faculty', 'Факультет'), ('course', 'Курс'), ('group', 'Группа')], max_length=20, verbose_name='Область')),
+                ('metric', models.CharField(choices=[('total', 'Общий рейтинг'), ('academic', 'Учебная'), ('research', 'Научно-исследовательская'), ('sport', 'Спортивная'), ('social', 'Общественная'), ('cultural', 'Культурно-творческая')], max_length=20, verbose_name='Показатель')),
+                ('rank', models.PositiveIntegerField(verbose_name='Место')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ranks', to='students.student')),
+            ],
+            options={
+                'verbose_name': 'Место в рейтинге',
+                'verbose_name_plural': 'Места в рейтинге',
+                'constraints': [models.UniqueConstraint(fields=('student', 'scope', 'metric'), name='student_rank_unique')],
+            },
+        ),
+    ]
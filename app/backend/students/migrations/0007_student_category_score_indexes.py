@@ -0,0 +1,36 @@
+# Generated by Django 6.0.2 on 2026-10-16 20:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0006_student_rank'),
+        ('university_structure', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['-academic_score', 'id'], name='student_academic_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['-research_score', 'id'], name='student_research_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['-sport_score', 'id'], name='student_sport_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['-social_score', 'id'], name='student_social_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['-cultural_score', 'id'], name='student_cultural_score_idx'),
+        ),
+    ]
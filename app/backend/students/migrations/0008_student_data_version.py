@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-16 20:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0007_student_category_score_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='data_version',
+            field=models.PositiveBigIntegerField(default=0, editable=False, verbose_name='Версия данных'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 6.0.2 on 2026-10-16 21:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_document_department(apps, schema_editor):
+    """
+    Проставляет существующим документам кафедру их студента.
+    """
+    Document = apps.get_model('students', 'Document')
+    Student = apps.get_model('students', 'Student')
+    Document.objects.update(department_id=models.Subquery(
+        Student.objects.filter(pk=models.OuterRef('student_id')).values('department_id')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0009_student_search_trigram_indexes'),
+        ('university_structure', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='claimed_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='claimed_documents', to=settings.AUTH_USER_MODEL, verbose_name='Взято на проверку'),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='claimed_until',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Взято на проверку до'),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='department',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='documents', to='university_structure.department', verbose_name='Кафедра'),
+        ),
+        migrations.RunPython(fill_document_department, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['department', 'uploaded_at', 'id'], include=('claimed_until',), name='document_pending_queue_idx'),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 6.0.2 on 2026-10-16 21:03
+
+from django.db import migrations, models
+
+SCORE_FIELDS = ['academic_score', 'research_score', 'sport_score', 'social_score', 'cultural_score']
+
+
+def fill_score_rollup(apps, schema_editor):
+    """
+    Заполняет сводку по текущим студентам (то же, что students.rollups.rebuild_rollups).
+    """
+    Student = apps.get_model('students', 'Student')
+    ScoreRollup = apps.get_model('students', 'ScoreRollup')
+
+    total = sum((models.F(field) for field in SCORE_FIELDS[1:]), models.F(SCORE_FIELDS[0]))
+    aggregates = {
+        'students_count': models.Count('id'),
+        'total_sum': models.Sum(total),
+        **{field.replace('_score', '_sum'): models.Sum(field) for field in SCORE_FIELDS},
+    }
+    partitions = {
+        'university': None,
+        'faculty': 'faculty_id',
+        'department': 'department_id',
+        'course': 'group__course',
+        'group': 'group_id',
+    }
+    rollups = []
+    for scope, field in partitions.items():
+        if field:
+            rows = Student.objects.filter(**{f'{field}__isnull': False}).order_by().values(field).annotate(**aggregates)
+        else:
+            rows = [Student.objects.aggregate(**aggregates)]
+        for row in rows:
+            if row['students_count']:
+                rollups.append(ScoreRollup(
+                    scope=scope, key=row[field] if field else 0,
+                    **{name: row[name] or 0 for name in aggregates},
+                ))
+    ScoreRollup.objects.bulk_create(rollups)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0010_document_moderation_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('university', 'Университет'), ('faculty', 'Факультет'), ('department', 'Кафедра'), ('course', 'Курс'), ('group', 'Группа')], max_length=20, verbose_name='Разрез')),
+                ('key', models.PositiveIntegerField(verbose_name='Ключ')),
+                ('students_count', models.IntegerField(default=0, verbose_name='Студентов')),
+                ('total_sum', models.BigIntegerField(default=0, verbose_name='Сумма общих баллов')),
+                ('academic_sum', models.BigIntegerField(default=0, verbose_name='Сумма учебных баллов')),
+                ('research_sum', models.BigIntegerField(default=0, verbose_name='Сумма научных баллов')),
+                ('sport_sum', models.BigIntegerField(default=0, verbose_name='Сумма спортивных баллов')),
+                ('social_sum', models.BigIntegerField(default=0, verbose_name='Сумма общественных баллов')),
+                ('cultural_sum', models.BigIntegerField(default=0, verbose_name='Сумма культурных баллов')),
+            ],
+            options={
+                'verbose_name': 'Сводка баллов',
+                'verbose_name_plural': 'Сводки баллов',
+                'constraints': [models.UniqueConstraint(fields=('scope', 'key'), name='score_rollup_unique')],
+            },
+        ),
+        migrations.RunPython(fill_score_rollup, migrations.RunPython.noop),
+    ]
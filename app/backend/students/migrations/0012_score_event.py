@@ -0,0 +1,76 @@
+# Generated by Django 6.0.2 on 2026-10-16 21:20
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from collections import defaultdict
+
+from django.db import migrations, models
+
+CATEGORIES = ['academic', 'research', 'sport', 'social', 'cultural']
+
+
+def fill_score_ledger(apps, schema_editor):
+    """
+    Открывает журнал баллов для существующих данных.
+
+    Каждый подтверждённый документ даёт событие 'approved' (время - загрузка документа).
+    Если баллы студента расходятся с суммой его подтверждённых документов (ручные правки,
+    удалённые документы), разница записывается событием 'adjusted' на момент создания
+    студента - после этого свёртка журнала совпадает с текущими баллами.
+    """
+    Student = apps.get_model('students', 'Student')
+    Document = apps.get_model('students', 'Document')
+    ScoreEvent = apps.get_model('students', 'ScoreEvent')
+
+    events = []
+    credited = defaultdict(int)
+    approved = Document.objects.filter(status='approved', score__gt=0).values_list('id', 'student_id', 'category', 'score', 'uploaded_at')
+    for document_id, student_id, category, score, uploaded_at in approved.iterator():
+        events.append(ScoreEvent(
+            student_id=student_id, document_id=document_id, category=category,
+            delta=score, kind='approved', created_at=uploaded_at,
+        ))
+        credited[(student_id, category)] += score
+
+    fields = [f'{category}_score' for category in CATEGORIES]
+    for student_id, created_at, *scores in Student.objects.values_list('id', 'created_at', *fields).iterator():
+        for category, score in zip(CATEGORIES, scores):
+            balance = score - credited[(student_id, category)]
+            if balance:
+                events.append(ScoreEvent(
+                    student_id=student_id, category=category,
+                    delta=balance, kind='adjusted', created_at=created_at,
+                ))
+
+    ScoreEvent.objects.bulk_create(events, batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0011_score_rollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(choices=[('academic', 'Учебная'), ('research', 'Научно-исследовательская'), ('cultural', 'Культурно-творческая'), ('sport', 'Спортивная'), ('social', 'Общественная')], max_length=50, verbose_name='Категория')),
+                ('delta', models.IntegerField(verbose_name='Изменение баллов')),
+                ('kind', models.CharField(choices=[('approved', 'Документ подтверждён'), ('revoked', 'Подтверждение отменено'), ('rescored', 'Баллы документа пересчитаны'), ('adjusted', 'Ручная правка')], max_length=20, verbose_name='Событие')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Время')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('document', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='score_events', to='students.document', verbose_name='Документ')),
+                ('student', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='score_events', to='students.student')),
+            ],
+            options={
+                'verbose_name': 'Событие журнала баллов',
+                'verbose_name_plural': 'Журнал баллов',
+                'indexes': [models.Index(fields=['student', 'created_at'], name='score_event_student_idx'), models.Index(fields=['created_at'], include=('student', 'category', 'delta'), name='score_event_created_idx')],
+            },
+        ),
+        migrations.RunPython(fill_score_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 6.0.2 on 2026-10-16 21:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0012_score_event'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='StudentRank',
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 6.0.2 on 2026-10-16 23:10
+
+from django.db import migrations, models
+
+METRIC_FIELDS = {
+    'total': 'total_score',
+    'academic': 'academic_score',
+    'research': 'research_score',
+    'sport': 'sport_score',
+    'social': 'social_score',
+    'cultural': 'cultural_score',
+}
+
+
+def fill_score_count(apps, schema_editor):
+    """
+    Заполняет распределение баллов по текущим студентам (то же, что students.ranks.rebuild_score_counts).
+    """
+    Student = apps.get_model('students', 'Student')
+    ScoreCount = apps.get_model('students', 'ScoreCount')
+
+    partitions = {
+        'university': None,
+        'faculty': 'faculty_id',
+        'course': 'group__course',
+        'group': 'group_id',
+    }
+    counts = []
+    for scope, partition in partitions.items():
+        for metric, field in METRIC_FIELDS.items():
+            students = Student.objects.filter(**{f'{partition}__isnull': False}) if partition else Student.objects.all()
+            rows = students.order_by().values(*filter(None, (partition, field))).annotate(students_count=models.Count('id'))
+            counts.extend(
+                ScoreCount(
+                    scope=scope, key=row[partition] if partition else 0,
+                    metric=metric, score=row[field], students_count=row['students_count'],
+                )
+                for row in rows
+            )
+    ScoreCount.objects.bulk_create(counts)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0013_delete_studentrank'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('university', 'Университет'), ('faculty', 'Факультет'), ('course', 'Курс'), ('group', 'Группа')], max_length=20, verbose_name='Область')),
+                ('key', models.PositiveIntegerField(verbose_name='Ключ')),
+                ('metric', models.CharField(choices=[('total', 'Общий рейтинг'), ('academic', 'Учебная'), ('research', 'Научно-исследовательская'), ('sport', 'Спортивная'), ('social', 'Общественная'), ('cultural', 'Культурно-творческая')], max_length=20, verbose_name='Показатель')),
+                ('score', models.IntegerField(verbose_name='Баллы')),
+                ('students_count', models.IntegerField(default=0, verbose_name='Студентов')),
+            ],
+            options={
+                'verbose_name': 'Распределение баллов',
+                'verbose_name_plural': 'Распределения баллов',
+                'constraints': [models.UniqueConstraint(fields=('scope', 'key', 'metric', 'score'), name='score_count_unique')],
+            },
+        ),
+        migrations.RunPython(fill_score_count, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,10 @@
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db import models, transaction
+from django.db.models.functions import Upper
 from django.conf import settings
 from django.utils import timezone
 from university_structure.models import Group, Faculty, Department
-from .scoring import calculate_achievement_score, get_choices_from_config
+from .scoring import calculate_achievement_score, get_choices_from_config, scoring_rules
 
 class Student(models.Model):
     """
@@ -28,35 +30,173 @@ class Student(models.Model):
     social_score = models.PositiveIntegerField(default=0)
     cultural_score = models.PositiveIntegerField(default=0)
     
-    created_at = models.DateTimeField(auto_now_add=True)
-
-    @property
-    def total_score(self) -> int:
-        """
-        Вычисляемое свойство: общий рейтинг студента.
-
-        Суммирует все виды баллов студента: академические, научные, спортивные,
-        социальные и культурные.
+    # Общий рейтинг студента: сумма баллов по всем направлениям.
+    # Хранимый генерируемый столбец - значение всегда вычисляется самой БД при любом изменении баллов,
+    # поэтому по нему можно сортировать, фильтровать и строить индексы.
+    total_score = models.GeneratedField(
+        verbose_name="Общий балл",
+        expression=(
+            models.F('academic_score') +
+            models.F('research_score') +
+            models.F('sport_score') +
+            models.F('social_score') +
+            models.F('cultural_score')
+        ),
+        output_field=models.PositiveIntegerField(),
+        db_persist=True,
+    )
+    
+    # Увеличивается при любом изменении данных профиля (баллы, документы, правки в админке);
+    # используется для ETag профиля (см. students.services.touch_students)
+    data_version = models.PositiveBigIntegerField("Версия данных", default=0, editable=False)
 
-        Возвращает общее количество баллов студента.
-        """
-        return (
-            self.academic_score +
-            self.research_score +
-            self.sport_score +
-            self.social_score +
-            self.cultural_score
-        )
+    created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         verbose_name = "Профиль студента"
         verbose_name_plural = "Профили студентов"
+        indexes = [
+            models.Index(fields=['-total_score', 'id'], name='student_total_score_idx'),
+            models.Index(fields=['faculty', '-total_score'], name='student_faculty_total_idx'),
+            models.Index(fields=['group', '-total_score'], name='student_group_total_idx'),
+            # Лидерборды по категориям (students.leaderboard)
+            models.Index(fields=['-academic_score', 'id'], name='student_academic_score_idx'),
+            models.Index(fields=['-research_score', 'id'], name='student_research_score_idx'),
+            models.Index(fields=['-sport_score', 'id'], name='student_sport_score_idx'),
+            models.Index(fields=['-social_score', 'id'], name='student_social_score_idx'),
+            models.Index(fields=['-cultural_score', 'id'], name='student_cultural_score_idx'),
+            # Поиск по подстроке и нечёткий поиск (pg_trgm) в рейтинге (students.rating.search_filter)
+            GinIndex(OpClass(Upper('full_name'), name='gin_trgm_ops'), name='student_full_name_trgm_idx'),
+            GinIndex(OpClass(Upper('record_book'), name='gin_trgm_ops'), name='student_record_book_trgm_idx'),
+        ]
 
     def __str__(self):
         group_name = self.group.name if self.group else "Без группы"
         return f"{self.full_name} ({group_name})"
 
 
+class ScoreRollup(models.Model):
+    """
+    Сводные показатели студентов в разрезе: количество студентов и суммы баллов.
+
+    Поддерживается инкрементально в той же транзакции, что и изменение баллов или состава
+    студентов (см. students.rollups), поэтому статистика кабинета сотрудника (количество,
+    средний балл, суммы по категориям) читается одной строкой, а не агрегатом по всем студентам.
+    Полностью пересобирается командой rebuild_rollups.
+    """
+    SCOPE_CHOICES = [
+        ('university', 'Университет'),
+        ('faculty', 'Факультет'),
+        ('department', 'Кафедра'),
+        ('course', 'Курс'),
+        ('group', 'Группа'),
+    ]
+
+    scope = models.CharField("Разрез", max_length=20, choices=SCOPE_CHOICES)
+    # id факультета, кафедры или группы, номер курса; для университета - 0
+    key = models.PositiveIntegerField("Ключ")
+    students_count = models.IntegerField("Студентов", default=0)
+    total_sum = models.BigIntegerField("Сумма общих баллов", default=0)
+    academic_sum = models.BigIntegerField("Сумма учебных баллов", default=0)
+    research_sum = models.BigIntegerField("Сумма научных баллов", default=0)
+    sport_sum = models.BigIntegerField("Сумма спортивных баллов", default=0)
+    social_sum = models.BigIntegerField("Сумма общественных баллов", default=0)
+    cultural_sum = models.BigIntegerField("Сумма культурных баллов", default=0)
+
+    class Meta:
+        verbose_name = "Сводка баллов"
+        verbose_name_plural = "Сводки баллов"
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'key'], name='score_rollup_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.scope}/{self.key}: {self.students_count}"
+
+
+class ScoreCount(models.Model):
+    """
+    Распределение баллов в области рейтинга: сколько студентов разреза имеют данное значение показателя.
+
+    Поддерживается инкрементально в той же транзакции, что и изменение баллов или состава
+    студентов (см. students.ranks.update_score_counts). Плотное место студента - 1 + количество
+    строк разреза со значением больше его баллов; строки с нулём студентов не считаются.
+    Значений баллов немного (они ограничены диапазоном баллов, а не числом студентов), поэтому
+    место читается диапазоном по уникальному индексу, а подтверждение документа меняет
+    не больше двух строк на показатель и область. Полностью пересобирается командой rebuild_rollups.
+    """
+    SCOPE_CHOICES = [
+        ('university', 'Университет'),
+        ('faculty', 'Факультет'),
+        ('course', 'Курс'),
+        ('group', 'Группа'),
+    ]
+    METRIC_CHOICES = [
+        ('total', 'Общий рейтинг'),
+        ('academic', 'Учебная'),
+        ('research', 'Научно-исследовательская'),
+        ('sport', 'Спортивная'),
+        ('social', 'Общественная'),
+        ('cultural', 'Культурно-творческая'),
+    ]
+
+    scope = models.CharField("Область", max_length=20, choices=SCOPE_CHOICES)
+    # id факультета или группы, номер курса; для университета - 0
+    key = models.PositiveIntegerField("Ключ")
+    metric = models.CharField("Показатель", max_length=20, choices=METRIC_CHOICES)
+    score = models.IntegerField("Баллы")
+    students_count = models.IntegerField("Студентов", default=0)
+
+    class Meta:
+        verbose_name = "Распределение баллов"
+        verbose_name_plural = "Распределения баллов"
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'key', 'metric', 'score'], name='score_count_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.scope}/{self.key}/{self.metric}={self.score}: {self.students_count}"
+
+
+class ScoringConfigVersion(models.Model):
+    """
+    Снимок scoring_config.json, по которому были посчитаны баллы документов.
+
+    Версия - sha256 содержимого файла (см. ScoringRules.version). Хранение самих правил
+    позволяет при изменении конфига сравнить старое и новое дерево правил и пересчитать
+    только те документы, чьи ключи (category, sub_type, level, result) действительно изменились.
+    """
+    version = models.CharField("Версия", max_length=64, unique=True)
+    rules = models.JSONField("Правила")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    _registered = set()
+
+    @classmethod
+    def register_current(cls) -> str | None:
+        """
+        Сохраняет снимок текущей версии правил (один раз на процесс) и возвращает её идентификатор.
+
+        Версия запоминается только после фиксации транзакции, в которой записан снимок:
+        если транзакция откатится (например, пачка пересчёта или импорт), снимок будет
+        записан заново при следующем вызове.
+        """
+        scoring_rules.refresh()
+        version = scoring_rules.version
+        if version and version not in cls._registered:
+            cls.objects.get_or_create(version=version, defaults={'rules': scoring_rules.rules})
+            transaction.on_commit(lambda: cls._registered.add(version))
+        return version
+
+    class Meta:
+        verbose_name = "Версия правил начисления"
+        verbose_name_plural = "Версии правил начисления"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.version[:12]} ({self.created_at:%d.%m.%Y %H:%M})"
+
+
 class Document(models.Model):
     """
     Модель документа студента для подтверждения достижений.
@@ -87,8 +227,16 @@ class Document(models.Model):
     file_url = models.URLField(max_length=500, null=True, blank=True)
 
     score = models.PositiveIntegerField("Баллы", default=0)
+    score_version = models.CharField("Версия правил начисления", max_length=64, blank=True, default='', db_index=True)
     status = models.CharField(max_length=20, choices=get_choices_from_config('metadata.statuses'), default='pending')
     rejection_reason = models.TextField("Причина отказа", blank=True, null=True)
+
+    # Кафедра студента, продублированная в документе, чтобы очередь модерации кафедры
+    # выбиралась по одному частичному индексу без соединения со студентами
+    department = models.ForeignKey(Department, on_delete=models.SET_NULL, null=True, blank=True, related_name='documents', verbose_name='Кафедра')
+    # Аренда документа модератором (students.moderation): пока срок не истёк, документ не выдаётся другим
+    claimed_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='claimed_documents', verbose_name='Взято на проверку')
+    claimed_until = models.DateTimeField("Взято на проверку до", null=True, blank=True)
     
     def __str__(self) -> str:
         """
@@ -109,7 +257,9 @@ class Document(models.Model):
 
         Перед сохранением автоматически пересчитывает количество баллов
         на основе категории, подтипа, уровня и результата с использованием
-        внешней функции calculate_achievement_score.
+        внешней функции calculate_achievement_score и запоминает версию правил,
+        по которой был получен балл (score_version). Новому документу проставляется
+        кафедра студента (department).
 
         Параметры:
             *args: Позиционные аргументы, передаваемые в родительский метод.
@@ -118,6 +268,9 @@ class Document(models.Model):
         self.score = calculate_achievement_score(
             self.category, self.sub_type, self.level, self.result
         )
+        self.score_version = ScoringConfigVersion.register_current() or ''
+        if self._state.adding and self.department_id is None:
+            self.department_id = self.student.department_id
         super().save(*args, **kwargs)
 
     class Meta:
@@ -128,4 +281,51 @@ class Document(models.Model):
         """
         verbose_name = "Документ"
         verbose_name_plural = "Документы"
-        ordering = ['-uploaded_at']
\ No newline at end of file
+        ordering = ['-uploaded_at']
+        indexes = [
+            # Очередь модерации кафедры (students.moderation): только документы на проверке
+            models.Index(
+                fields=['department', 'uploaded_at', 'id'],
+                include=['claimed_until'],
+                condition=models.Q(status='pending'),
+                name='document_pending_queue_idx',
+            ),
+        ]
+
+class ScoreEvent(models.Model):
+    """
+    Запись журнала баллов: изменение баллов студента по одной категории.
+
+    Журнал только дополняется - каждое начисление и списание пишется отдельной записью
+    в той же транзакции, что и изменение баллов (см. students.services.apply_score_events).
+    Поля Student.*_score - свёртка журнала: их можно пересобрать из него одним агрегирующим
+    запросом (students.ledger.rebuild_scores) и посчитать по нему рейтинг на любую дату.
+    """
+    KIND_CHOICES = [
+        ('approved', 'Документ подтверждён'),
+        ('revoked', 'Подтверждение отменено'),
+        ('rescored', 'Баллы документа пересчитаны'),
+        ('adjusted', 'Ручная правка'),
+    ]
+
+    # Отдельный индекс внешнего ключа не нужен - его заменяет индекс (student, created_at)
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='score_events', db_index=False)
+    document = models.ForeignKey(Document, on_delete=models.SET_NULL, null=True, blank=True, related_name='score_events', verbose_name='Документ')
+    category = models.CharField("Категория", max_length=50, choices=get_choices_from_config('categories'))
+    delta = models.IntegerField("Изменение баллов")
+    kind = models.CharField("Событие", max_length=20, choices=KIND_CHOICES)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name='Автор')
+    created_at = models.DateTimeField("Время", default=timezone.now)
+
+    class Meta:
+        verbose_name = "Событие журнала баллов"
+        verbose_name_plural = "Журнал баллов"
+        indexes = [
+            # История баллов студента
+            models.Index(fields=['student', 'created_at'], name='score_event_student_idx'),
+            # Рейтинг на дату (students.rating.annotate_scores_as_of): диапазон по времени без чтения таблицы
+            models.Index(fields=['created_at'], include=['student', 'category', 'delta'], name='score_event_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student_id}: {self.category} {self.delta:+d} ({self.kind})"
@@ -0,0 +1,265 @@
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Document, ScoreEvent
+from .services import apply_score_events, documents_changed
+
+# Срок аренды документов модератором по умолчанию и наибольший допустимый срок
+DEFAULT_LEASE_SECONDS = 15 * 60
+MAX_LEASE_SECONDS = 2 * 60 * 60
+
+DEFAULT_CLAIM_COUNT = 10
+MAX_CLAIM_COUNT = 50
+
+
+def _int_value(data, name, default):
+    value = data.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Параметр {name} должен быть целым числом")
+
+def parse_claim_params(data) -> dict:
+    """
+    Проверяет и нормализует параметры запроса аренды документов.
+
+    Параметры:
+        count (int): Сколько документов взять (по умолчанию 10, не больше 50).
+        lease_seconds (int): Срок аренды в секундах (по умолчанию 15 минут, не больше 2 часов).
+
+    Исключения:
+        ValueError: При некорректных числах.
+    """
+    count = _int_value(data, 'count', DEFAULT_CLAIM_COUNT)
+    lease_seconds = _int_value(data, 'lease_seconds', DEFAULT_LEASE_SECONDS)
+    return {
+        'count': max(1, min(count, MAX_CLAIM_COUNT)),
+        'lease_seconds': max(1, min(lease_seconds, MAX_LEASE_SECONDS)),
+    }
+
+def available_to(user, now=None) -> Q:
+    """
+    Условие на документы, которые может проверять пользователь: не арендованные,
+    с истёкшей арендой или арендованные им самим.
+    """
+    now = now or timezone.now()
+    return Q(claimed_until__isnull=True) | Q(claimed_until__lt=now) | Q(claimed_by=user)
+
+def claim_documents(user, department_id, count: int, lease_seconds: int) -> tuple[list[int], datetime]:
+    """
+    Выдаёт модератору следующие документы очереди кафедры и продлевает аренду уже выданных ему.
+
+    Документы выбираются в порядке загрузки запросом SELECT ... FOR UPDATE SKIP LOCKED
+    по частичному индексу document_pending_queue_idx: строки, которые в этот момент
+    выдаются другому модератору, пропускаются, а не ожидаются. Выбранным документам
+    в той же транзакции проставляются модератор и срок аренды, поэтому два модератора
+    никогда не получат один и тот же документ, пока аренда не истекла.
+
+    Параметры:
+        user (User): Модератор.
+        department_id (int): Кафедра, очередь которой разбирается.
+        count (int): Сколько документов выдать (уже арендованные модератором выдаются повторно).
+        lease_seconds (int): Срок аренды в секундах.
+
+    Возвращает:
+        tuple: (id выданных документов в порядке очереди, срок аренды)
+    """
+    now = timezone.now()
+    claimed_until = now + timedelta(seconds=lease_seconds)
+    with transaction.atomic():
+        ids = list(
+            Document.objects.select_for_update(skip_locked=True)
+            .filter(available_to(user, now), status='pending', department_id=department_id)
+            .order_by('uploaded_at', 'id')
+            .values_list('id', flat=True)[:count]
+        )
+        if ids:
+            Document.objects.filter(id__in=ids).update(claimed_by=user, claimed_until=claimed_until)
+    return ids, claimed_until
+
+def release_documents(user, ids=None) -> int:
+    """
+    Возвращает арендованные пользователем документы в очередь (все или только ids).
+
+    Возвращает:
+        int: Количество освобождённых документов.
+    """
+    documents = Document.objects.filter(claimed_by=user)
+    if ids is not None:
+        documents = documents.filter(id__in=ids)
+    return documents.update(claimed_by=None, claimed_until=None)
+
+# Действие проверки → (итоговый статус, {исходный статус: знак изменения баллов студента})
+REVIEW_TRANSITIONS = {
+    'approve': ('approved', {'pending': 1, 'rejected': 1}),
+    'reject': ('rejected', {'pending': 0, 'approved': -1}),
+}
+
+
+def _score_event(document_id, student_id, category, delta, user) -> ScoreEvent:
+    """
+    Событие журнала баллов для проверки документа: начисление ('approved') или списание ('revoked').
+    """
+    return ScoreEvent(
+        student_id=student_id, document_id=document_id, category=category,
+        delta=delta, kind='approved' if delta > 0 else 'revoked', created_by=user,
+    )
+
+
+class ReviewConflict(Exception):
+    """
+    Документ нельзя проверить: он арендован другим модератором или его статус не допускает действия.
+    """
+
+def review_document(document_id, user, action: str, reason: str | None = None) -> str | None:
+    """
+    Подтверждает или отклоняет документ одной транзакцией без потерянных обновлений.
+
+    Переход статуса выполняется условным UPDATE ... WHERE status = <исходный> (и документ не
+    арендован другим модератором), поэтому из нескольких одновременных проверок одного документа
+    срабатывает ровно одна. Баллы студенту начисляются (или списываются при отклонении
+    подтверждённого документа) в той же транзакции через apply_score_events - событием журнала
+    баллов и инкрементом F() только нужного поля, без чтения и перезаписи строки студента. В той же
+    транзакции обновляются сводка и распределение баллов (строки блокируются в одном порядке)
+    и ставятся фоновые задачи с ключами идемпотентности: версии данных рейтинга и документов
+    увеличивает обработчик очереди (см. students.tasks.data_changed).
+
+    Параметры:
+        document_id (int): id документа.
+        user (User): Модератор.
+        action (str): 'approve' или 'reject' (ключ REVIEW_TRANSITIONS).
+        reason (str | None): Причина отклонения.
+
+    Возвращает:
+        str | None: Статус документа до проверки или None, если документ уже был в итоговом статусе.
+
+    Исключения:
+        Document.DoesNotExist: Документа нет.
+        ReviewConflict: Документ арендован другим модератором или находится в неподходящем статусе.
+    """
+    target, sources = REVIEW_TRANSITIONS[action]
+    now = timezone.now()
+    values = {
+        'status': target,
+        'rejection_reason': reason if target == 'rejected' else None,
+        'verified_by': user,
+        'claimed_by': None,
+        'claimed_until': None,
+    }
+
+    with transaction.atomic():
+        for source, sign in sources.items():
+            documents = Document.objects.filter(available_to(user, now), id=document_id, status=source)
+            if not documents.update(**values):
+                continue
+            # Строка документа заблокирована нашим UPDATE до конца транзакции, баллы читаются актуальные
+            student_id, category, score = Document.objects.filter(id=document_id).values_list(
+                'student_id', 'category', 'score',
+            ).get()
+            if sign:
+                apply_score_events([_score_event(document_id, student_id, category, sign * score, user)])
+            documents_changed([student_id])
+            return source
+
+    state = Document.objects.filter(id=document_id).values('status', 'claimed_by_id', 'claimed_until').get()
+    if state['claimed_by_id'] not in (None, user.id) and state['claimed_until'] and state['claimed_until'] >= now:
+        raise ReviewConflict("Документ проверяет другой модератор")
+    if state['status'] == target:
+        return None
+    raise ReviewConflict(f"Документ в статусе {state['status']} нельзя {'подтвердить' if action == 'approve' else 'отклонить'}")
+
+# Наибольшее количество документов в одном запросе массовой проверки
+MAX_BULK_REVIEW = 500
+
+# Результат массовой проверки документа (кроме успешного перехода, для которого возвращается исходный статус)
+REVIEW_UNCHANGED = 'unchanged'
+REVIEW_NOT_FOUND = 'not_found'
+REVIEW_CONFLICT = 'conflict'
+
+
+def parse_review_ids(data) -> list[int]:
+    """
+    Проверяет список id документов массовой проверки: целые числа, без повторов, не больше MAX_BULK_REVIEW.
+
+    Исключения:
+        ValueError: При пустом или некорректном списке.
+    """
+    ids = data.get('ids')
+    if not isinstance(ids, list) or not ids or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+        raise ValueError("Параметр ids должен быть непустым списком целых чисел")
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > MAX_BULK_REVIEW:
+        raise ValueError(f"За один запрос можно проверить не больше {MAX_BULK_REVIEW} документов")
+    return ids
+
+def review_documents(ids, user, action: str, reason: str | None = None) -> dict:
+    """
+    Подтверждает или отклоняет сразу несколько документов одной транзакцией.
+
+    Документы блокируются одним SELECT ... FOR UPDATE (в порядке id, чтобы параллельные
+    массовые проверки не взаимоблокировались), переходы статуса записываются одним bulk_update,
+    а события журнала баллов - одним apply_score_events, который суммирует изменения по студенту
+    и категории и применяет их одним UPDATE. Правила переходов те же, что у review_document: документ, арендованный
+    другим модератором или находящийся в неподходящем статусе, не меняется.
+
+    Параметры:
+        ids (list[int]): id документов.
+        user (User): Модератор.
+        action (str): 'approve' или 'reject' (ключ REVIEW_TRANSITIONS).
+        reason (str | None): Причина отклонения (общая для всех документов).
+
+    Возвращает:
+        dict: {id документа: результат} в порядке ids, где результат - исходный статус при
+              успешном переходе, REVIEW_UNCHANGED (документ уже в итоговом статусе),
+              REVIEW_NOT_FOUND или REVIEW_CONFLICT.
+    """
+    target, sources = REVIEW_TRANSITIONS[action]
+    now = timezone.now()
+    fields = ('id', 'student_id', 'category', 'score', 'status', 'claimed_by_id', 'claimed_until')
+    outcomes = {}
+    events = []
+    changed = []
+
+    with transaction.atomic():
+        documents = {
+            document.id: document
+            for document in Document.objects.select_for_update().filter(id__in=ids).order_by('id').only(*fields)
+        }
+        for document_id in ids:
+            document = documents.get(document_id)
+            if document is None:
+                outcomes[document_id] = REVIEW_NOT_FOUND
+                continue
+            leased = document.claimed_by_id not in (None, user.id) and document.claimed_until and document.claimed_until >= now
+            if leased or (document.status != target and document.status not in sources):
+                outcomes[document_id] = REVIEW_CONFLICT
+                continue
+            if document.status == target:
+                outcomes[document_id] = REVIEW_UNCHANGED
+                continue
+
+            outcomes[document_id] = document.status
+            if sources[document.status]:
+                events.append(_score_event(
+                    document.id, document.student_id, document.category, sources[document.status] * document.score, user,
+                ))
+            document.status = target
+            document.rejection_reason = reason if target == 'rejected' else None
+            document.verified_by = user
+            document.claimed_by = None
+            document.claimed_until = None
+            changed.append(document)
+
+        if changed:
+            Document.objects.bulk_update(
+                changed, ['status', 'rejection_reason', 'verified_by', 'claimed_by', 'claimed_until'],
+            )
+            apply_score_events(events)
+            documents_changed(document.student_id for document in changed)
+
+    return outcomes
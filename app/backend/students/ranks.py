@@ -0,0 +1,172 @@
+from bisect import bisect_right
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+from .models import ScoreCount, Student
+
+# Показатель рейтинга → поле баллов студента
+METRIC_FIELDS = {
+    'total': 'total_score',
+    'academic': 'academic_score',
+    'research': 'research_score',
+    'sport': 'sport_score',
+    'social': 'social_score',
+    'cultural': 'cultural_score',
+}
+
+# Область рейтинга → поле, по которому делится множество студентов (None - весь университет)
+SCOPE_PARTITIONS = {
+    'university': None,
+    'faculty': 'faculty_id',
+    'course': 'group__course',
+    'group': 'group_id',
+}
+
+# Имя счётчика DataVersion, который увеличивается при любом изменении данных рейтинга
+RATING_DATA = 'rating'
+
+# Ключ строк распределения и сводки по университету
+UNIVERSITY_KEY = 0
+
+
+def _count_keys(row):
+    for scope, field in SCOPE_PARTITIONS.items():
+        key = row[field] if field else UNIVERSITY_KEY
+        if key is not None:
+            yield scope, key
+
+def update_score_counts(removed=(), added=()) -> None:
+    """
+    Переносит в распределение баллов (ScoreCount) изменение баллов, состава или разрезов студентов.
+
+    Строки removed (состояние студентов до изменения) вычитаются, added (после изменения) -
+    прибавляются; строки - словари из students.rollups.student_rows. Вызывается в транзакции
+    изменения, поэтому места сразу соответствуют зафиксированным баллам. Строки распределения
+    обновляются в одном порядке во всех процессах, чтобы одновременные подтверждения
+    не взаимоблокировались.
+
+    Пример:
+        before = student_rows([student.id])
+        ...  # перевод студента в другую группу
+        update_score_counts(removed=before, added=student_rows([student.id]))
+    """
+    changes = defaultdict(int)
+    for rows, sign in ((removed, -1), (added, 1)):
+        for row in rows:
+            for scope, key in _count_keys(row):
+                for metric, field in METRIC_FIELDS.items():
+                    changes[(scope, key, metric, row[field])] += sign
+    changes = {count_key: delta for count_key, delta in sorted(changes.items()) if delta}
+    if not changes:
+        return
+
+    with transaction.atomic():
+        ScoreCount.objects.bulk_create(
+            [
+                ScoreCount(scope=scope, key=key, metric=metric, score=score)
+                for (scope, key, metric, score), delta in changes.items() if delta > 0
+            ],
+            ignore_conflicts=True,
+        )
+        for (scope, key, metric, score), delta in changes.items():
+            ScoreCount.objects.filter(scope=scope, key=key, metric=metric, score=score).update(
+                students_count=F('students_count') + delta
+            )
+
+def rebuild_score_counts() -> int:
+    """
+    Полностью пересобирает распределение баллов агрегирующими запросами (по одному на область и показатель).
+
+    Возвращает:
+        int: Количество строк распределения.
+    """
+    counts = []
+    for scope, partition in SCOPE_PARTITIONS.items():
+        for metric, field in METRIC_FIELDS.items():
+            students = Student.objects.filter(**{f'{partition}__isnull': False}) if partition else Student.objects.all()
+            rows = students.order_by().values(*filter(None, (partition, field))).annotate(students_count=Count('id'))
+            counts.extend(
+                ScoreCount(
+                    scope=scope, key=row[partition] if partition else UNIVERSITY_KEY,
+                    metric=metric, score=row[field], students_count=row['students_count'],
+                )
+                for row in rows
+            )
+
+    with transaction.atomic():
+        ScoreCount.objects.all().delete()
+        ScoreCount.objects.bulk_create(counts)
+    return len(counts)
+
+def partition_scores(scope: str, partition_value) -> dict:
+    """
+    Возвращает различные значения баллов студентов разреза по каждому показателю (по возрастанию).
+
+    Читается одним запросом из распределения баллов (ScoreCount). Различных значений баллов
+    немного (они ограничены диапазоном баллов, а не числом студентов), поэтому набор занимает
+    мало памяти, а место по нему ищется двоичным поиском (dense_rank) - так места
+    выдаются сразу для целой страницы рейтинга или выгрузки.
+
+    Параметры:
+        scope (str): Область - ключ SCOPE_PARTITIONS.
+        partition_value: id факультета или группы, номер курса; для университета - None.
+
+    Возвращает:
+        dict: {показатель: [значение, ...]}.
+    """
+    key = partition_value if SCOPE_PARTITIONS[scope] else UNIVERSITY_KEY
+    rows = ScoreCount.objects.filter(scope=scope, key=key, students_count__gt=0).order_by('score')
+
+    scores = {metric: [] for metric in METRIC_FIELDS}
+    for metric, score in rows.values_list('metric', 'score'):
+        scores[metric].append(score)
+    return scores
+
+def dense_rank(scores: list, value) -> int:
+    """
+    Плотное место значения среди scores (по возрастанию): 1 + количество различных значений больше него.
+    """
+    return len(scores) - bisect_right(scores, value) + 1
+
+def get_student_ranks(student) -> dict:
+    """
+    Возвращает места студента в рейтинге: {показатель: {область: место}}.
+
+    Места читаются одним запросом из распределения баллов (ScoreCount): для каждой области
+    и показателя считается количество значений больше баллов студента. Запрос - диапазоны
+    по уникальному индексу, его стоимость не зависит от числа студентов. Распределение
+    обновляется в транзакции подтверждения документа, перевода или удаления студента,
+    поэтому места сразу соответствуют зафиксированным баллам.
+    Для студента без группы места по курсу и группе равны None.
+
+    Пример:
+        {"total": {"university": 12, "faculty": 3, "course": 5, "group": 1}, "academic": {...}, ...}
+    """
+    partition_values = {
+        'university': UNIVERSITY_KEY,
+        'faculty': student.faculty_id,
+        'course': student.group.course if student.group_id else None,
+        'group': student.group_id,
+    }
+    partitions = Q()
+    for scope, key in partition_values.items():
+        if key is not None:
+            partitions |= Q(scope=scope, key=key)
+    above = Q()
+    for metric, field in METRIC_FIELDS.items():
+        above |= Q(metric=metric, score__gt=getattr(student, field))
+
+    counts = {
+        (row['scope'], row['metric']): row['above']
+        for row in ScoreCount.objects.filter(partitions, above, students_count__gt=0)
+        .order_by().values('scope', 'metric').annotate(above=Count('id'))
+    }
+    return {
+        metric: {
+            scope: counts.get((scope, metric), 0) + 1 if key is not None else None
+            for scope, key in partition_values.items()
+        }
+        for metric in METRIC_FIELDS
+    }
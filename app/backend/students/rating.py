@@ -0,0 +1,346 @@
+import base64
+import hashlib
+import json
+from datetime import datetime, timedelta
+
+from django.core.cache import cache
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db.models import FilteredRelation, IntegerField, Q, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, Upper
+from django.utils import timezone
+
+from main.http import serialize_json
+from main.models import DataVersion
+from university_structure.models import Group
+from .models import Student
+from .ranks import METRIC_FIELDS, RATING_DATA, dense_rank, partition_scores
+from .serializers import StudentRatingSerializer
+
+# Параметр sort → поле, по которому упорядочивается рейтинг
+RATING_SORT_FIELDS = METRIC_FIELDS
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+MAX_SEARCH_LENGTH = 100
+
+# Множитель сходства ФИО с поисковой строкой (0..1) для целочисленного ключа порядка search_rank
+SEARCH_RANK_SCALE = 1_000_000
+
+# Снимки всё равно становятся неактуальными при смене версии, срок жизни лишь ограничивает память
+RATING_SNAPSHOT_TIMEOUT = 60 * 60
+
+
+def encode_cursor(*values) -> str:
+    """
+    Кодирует позицию в рейтинге (значения ключей сортировки и id последнего студента) в строку курсора.
+    """
+    raw = json.dumps(list(values)).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_cursor(cursor: str, size: int = 2) -> tuple[int, ...]:
+    """
+    Декодирует строку курсора обратно в (значения ключей сортировки..., id студента).
+
+    Параметры:
+        size (int): Ожидаемое количество значений в курсоре, включая id.
+
+    Исключения:
+        ValueError: Если курсор повреждён или имеет неверный формат.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        if not isinstance(values, list) or len(values) != size:
+            raise ValueError
+        return tuple(int(value) for value in values)
+    except (ValueError, TypeError, UnicodeError):
+        raise ValueError("Некорректный курсор")
+
+def _int_param(query_params, name):
+    value = query_params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"Параметр {name} должен быть целым числом")
+
+def parse_rating_params(query_params) -> dict:
+    """
+    Проверяет и нормализует параметры запроса рейтинга.
+
+    Параметры запроса:
+        sort (str): 'total' (по умолчанию) или категория: 'academic', 'research', 'sport', 'social', 'cultural'.
+        direction (str): 'desc' (по умолчанию) или 'asc'.
+        faculty (int): id факультета.
+        department (int): id кафедры.
+        course (int): Курс.
+        group (int): id группы.
+        q (str): Поиск по ФИО (в том числе с опечатками), номеру зачётки или названию группы.
+        page_size (int): Размер страницы (по умолчанию 50, не больше 200).
+        cursor (str): Курсор следующей страницы из предыдущего ответа.
+        as_of (str): Дата ГГГГ-ММ-ДД - рейтинг на конец этого дня по журналу баллов.
+
+    Возвращает:
+        dict: Нормализованные параметры.
+
+    Исключения:
+        ValueError: При неизвестном поле сортировки, направлении или некорректных числах/курсоре/дате.
+    """
+    sort = query_params.get('sort') or 'total'
+    if sort not in RATING_SORT_FIELDS:
+        raise ValueError(f"Неизвестное поле сортировки: {sort}")
+
+    direction = query_params.get('direction') or 'desc'
+    if direction not in ('asc', 'desc'):
+        raise ValueError("Параметр direction должен быть 'asc' или 'desc'")
+
+    page_size = _int_param(query_params, 'page_size') or DEFAULT_PAGE_SIZE
+    q = (query_params.get('q') or '').strip()[:MAX_SEARCH_LENGTH] or None
+    cursor = query_params.get('cursor')
+
+    return {
+        'sort': sort,
+        'direction': direction,
+        'faculty': _int_param(query_params, 'faculty'),
+        'department': _int_param(query_params, 'department'),
+        'course': _int_param(query_params, 'course'),
+        'group': _int_param(query_params, 'group'),
+        'q': q,
+        'page_size': max(1, min(page_size, MAX_PAGE_SIZE)),
+        # При поиске позиция включает и сходство с поисковой строкой (см. rating_ordering)
+        'cursor': decode_cursor(cursor, 3 if q else 2) if cursor else None,
+        'as_of': parse_as_of(query_params.get('as_of')),
+    }
+
+def parse_as_of(value) -> datetime | None:
+    """
+    Преобразует дату рейтинга (ГГГГ-ММ-ДД) в момент окончания этого дня в текущем часовом поясе.
+
+    Исключения:
+        ValueError: При некорректной дате.
+    """
+    if value in (None, ''):
+        return None
+    try:
+        day = datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError("Параметр as_of должен быть датой в формате ГГГГ-ММ-ДД")
+    return datetime.combine(day + timedelta(days=1), datetime.min.time(), timezone.get_current_timezone())
+
+def annotate_scores_as_of(students, moment: datetime):
+    """
+    Добавляет к queryset студентов баллы на момент moment (не включая его), посчитанные по журналу баллов.
+
+    Аннотации называются as_of_<показатель> (as_of_total, as_of_sport, ...). Условие created_at < moment
+    стоит в самом соединении с журналом (FilteredRelation), поэтому читаются только события до этого
+    момента - диапазоном индекса score_event_created_idx, в который включены студент, категория
+    и изменение баллов, без обращения к таблице журнала.
+    """
+    students = students.alias(events_before=FilteredRelation(
+        'score_events', condition=Q(score_events__created_at__lt=moment),
+    ))
+    annotations = {
+        f'as_of_{metric}': Coalesce(
+            Sum('events_before__delta', filter=Q(events_before__category=metric) if metric != 'total' else None),
+            Value(0), output_field=IntegerField(),
+        )
+        for metric in RATING_SORT_FIELDS
+    }
+    return students.annotate(**annotations)
+
+def search_filter(q: str) -> Q:
+    """
+    Строит условие поиска студентов по строке q.
+
+    Совпадением считается подстрока ФИО или номера зачётки, похожее слово в ФИО
+    (триграммы pg_trgm, оператор %>, - находит и при опечатках) или подстрока названия группы.
+    Сравнение идёт по UPPER(...), для которых есть GIN-индексы gin_trgm_ops, поэтому
+    поиск не просматривает всю таблицу студентов. Группы подбираются отдельным подзапросом
+    по group_id, а не соединением с таблицей групп: условие по столбцу другой таблицы в OR
+    не даёт планировщику объединить поиск по индексам. Требует аннотаций из rating_queryset.
+    """
+    q_upper = q.upper()
+    return (
+        Q(search_name__contains=q_upper)
+        | Q(search_name__trigram_word_similar=q_upper)
+        | Q(search_record_book__contains=q_upper)
+        | Q(group_id__in=Subquery(Group.objects.filter(name__icontains=q).values('id')))
+    )
+
+def rating_queryset(params: dict):
+    """
+    Возвращает queryset студентов рейтинга с учётом фильтров по факультету, кафедре, курсу и группе
+    и поисковой строки q (см. search_filter).
+
+    При поиске добавляется аннотация search_rank - сходство ФИО с поисковой строкой
+    (TrigramWordSimilarity, умноженное на SEARCH_RANK_SCALE и округлённое до целого,
+    чтобы значение точно переносилось в курсор), см. rating_ordering.
+    """
+    students = Student.objects.select_related('group', 'faculty')
+
+    if params.get('faculty') is not None:
+        students = students.filter(faculty_id=params['faculty'])
+    if params.get('department') is not None:
+        students = students.filter(department_id=params['department'])
+    if params.get('course') is not None:
+        students = students.filter(group__course=params['course'])
+    if params.get('group') is not None:
+        students = students.filter(group_id=params['group'])
+    if params.get('q'):
+        students = students.alias(
+            search_name=Upper('full_name'),
+            search_record_book=Upper('record_book'),
+        ).filter(search_filter(params['q'])).annotate(
+            search_rank=Cast(
+                TrigramWordSimilarity(params['q'].upper(), 'search_name') * SEARCH_RANK_SCALE, IntegerField(),
+            ),
+        )
+
+    return students
+
+def rating_ordering(params: dict, field: str) -> list[tuple[str, bool]]:
+    """
+    Возвращает ключи порядка рейтинга [(поле, по убыванию), ...]; последним ключом всегда идёт id.
+
+    При поиске первыми идут студенты, чьё ФИО ближе всего к поисковой строке (search_rank),
+    среди одинаково похожих - по выбранному полю сортировки.
+    """
+    keys = [(field, params['direction'] == 'desc'), ('id', False)]
+    if params.get('q'):
+        keys.insert(0, ('search_rank', True))
+    return keys
+
+def order_by_keys(keys: list[tuple[str, bool]]) -> list[str]:
+    """
+    Превращает ключи порядка (rating_ordering) в аргументы QuerySet.order_by.
+    """
+    return [f'-{name}' if descending else name for name, descending in keys]
+
+def keyset_filter(keys: list[tuple[str, bool]], values: tuple) -> Q:
+    """
+    Условие «строго после позиции values» для порядка keys (keyset-пагинация).
+
+    Для ключей (a, b, id) это a за значением, либо a равно и b за значением, либо a и b равны и id больше.
+    """
+    condition = None
+    for (name, descending), value in zip(reversed(keys), reversed(values)):
+        beyond = Q(**{f'{name}__lt' if descending else f'{name}__gt': value})
+        condition = beyond if condition is None else beyond | (Q(**{name: value}) & condition)
+    return condition
+
+def rank_scope(params: dict) -> str | None:
+    """
+    Определяет область рейтинга, места в которой соответствуют выбранным фильтрам.
+
+    Без фильтров - университет, только факультет - факультет, только курс - курс,
+    группа - группа. Для прочих сочетаний (например, факультет и курс или кафедра) места
+    не выдаются. Поиск (q) область не меняет: найденные студенты показываются со своими местами.
+    """
+    if params.get('group') is not None:
+        return 'group'
+    if params.get('department') is not None:
+        return None
+    if params.get('faculty') is not None and params.get('course') is None:
+        return 'faculty'
+    if params.get('course') is not None and params.get('faculty') is None:
+        return 'course'
+    if params.get('faculty') is None and params.get('course') is None:
+        return 'university'
+    return None
+
+def rank_partition(params: dict, scope: str):
+    """
+    Возвращает разрез области scope, выбранный фильтрами (id факультета или группы, курс; для университета - None).
+    """
+    return params[scope] if scope != 'university' else None
+
+def rating_page(params: dict) -> dict:
+    """
+    Возвращает одну страницу рейтинга, упорядоченную на стороне БД (keyset-пагинация).
+
+    Страница выбирается условием по ключам порядка (значение поля сортировки, id; при поиске
+    перед ними - сходство с поисковой строкой, см. rating_ordering), а не OFFSET,
+    поэтому стоимость запроса не растёт с номером страницы. При равных баллах студенты
+    упорядочиваются по id. Каждому студенту добавляется место (rank) по выбранному показателю
+    в области, соответствующей фильтрам (см. rank_scope), - по набору баллов разреза (partition_scores).
+
+    С параметром as_of баллы и порядок берутся из журнала баллов на конец указанного дня
+    (см. annotate_scores_as_of), а места не выдаются - они вычисляются только по текущим баллам.
+
+    Возвращает:
+        dict: {"results": [...], "next_cursor": str | None}
+    """
+    field = RATING_SORT_FIELDS[params['sort']]
+    students = rating_queryset(params)
+    if params.get('as_of'):
+        students = annotate_scores_as_of(students, params['as_of'])
+        field = f"as_of_{params['sort']}"
+    keys = rating_ordering(params, field)
+
+    if params.get('cursor'):
+        students = students.filter(keyset_filter(keys, params['cursor']))
+
+    page_size = params['page_size']
+    students = list(students.order_by(*order_by_keys(keys))[:page_size + 1])
+
+    next_cursor = None
+    if len(students) > page_size:
+        students = students[:page_size]
+        last = students[-1]
+        next_cursor = encode_cursor(*(getattr(last, name) for name, _ in keys))
+
+    results = StudentRatingSerializer(students, many=True).data
+    if params.get('as_of'):
+        for student, item in zip(students, results):
+            for metric, score_field in RATING_SORT_FIELDS.items():
+                item[score_field] = getattr(student, f'as_of_{metric}')
+
+    scope = rank_scope(params) if not params.get('as_of') else None
+    if scope:
+        scores = partition_scores(scope, rank_partition(params, scope))[params['sort']]
+        for student, item in zip(students, results):
+            item['rank'] = dense_rank(scores, getattr(student, field))
+    else:
+        for item in results:
+            item['rank'] = None
+
+    return {
+        "results": results,
+        "next_cursor": next_cursor,
+    }
+
+def rating_snapshot(params: dict, version: int | None = None) -> tuple[bytes, bytes]:
+    """
+    Возвращает готовую (сериализованную и сжатую) страницу рейтинга из кэша.
+
+    Снимок хранится под ключом из версии данных рейтинга (DataVersion 'rating') и набора
+    параметров запроса. Пока версия не изменилась, запрос не обращается к таблице студентов
+    и не запускает сериализаторы. Подтверждение документа или правка студента увеличивают
+    версию, и все процессы сразу перестают использовать старые снимки, так как версия
+    читается из общей БД.
+
+    Возвращает:
+        tuple[bytes, bytes]: (json, json в gzip)
+    """
+    return versioned_snapshot('rating', params, lambda: rating_page(params), version)
+
+def versioned_snapshot(name: str, params: dict, builder, version: int | None = None) -> tuple[bytes, bytes]:
+    """
+    Возвращает сериализованный и сжатый результат builder() из кэша для текущей версии данных рейтинга.
+
+    Параметры:
+        name (str): Префикс ключа кэша (название ответа).
+        params (dict): Параметры запроса, от которых зависит результат.
+        builder (Callable[[], Any]): Функция, строящая данные ответа при промахе кэша.
+        version (int | None): Уже прочитанная версия данных рейтинга (например, для ETag).
+    """
+    if version is None:
+        version = DataVersion.get(RATING_DATA)
+    params_key = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    key = f"{name}:{version}:{params_key}"
+
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = serialize_json(builder())
+        cache.set(key, snapshot, RATING_SNAPSHOT_TIMEOUT)
+    return snapshot
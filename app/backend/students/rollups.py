@@ -0,0 +1,140 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from .models import ScoreRollup, Student
+from .ranks import METRIC_FIELDS, UNIVERSITY_KEY, rebuild_score_counts, update_score_counts
+
+# Разрез сводки → поле студента, по которому он относится к строке сводки (None - весь университет)
+ROLLUP_PARTITIONS = {
+    'university': None,
+    'faculty': 'faculty_id',
+    'department': 'department_id',
+    'course': 'group__course',
+    'group': 'group_id',
+}
+
+# Показатель рейтинга → поле суммы в ScoreRollup
+SUM_FIELDS = {metric: f'{metric}_sum' for metric in METRIC_FIELDS}
+
+_ROW_FIELDS = ('id', *filter(None, ROLLUP_PARTITIONS.values()), *METRIC_FIELDS.values())
+
+
+def student_rows(student_ids) -> list[dict]:
+    """
+    Читает одним запросом всё, что нужно для вклада студентов в сводку: разрезы и баллы.
+    """
+    student_ids = set(student_ids)
+    if not student_ids:
+        return []
+    return list(Student.objects.filter(pk__in=student_ids).values(*_ROW_FIELDS))
+
+def _keys(row):
+    for scope, field in ROLLUP_PARTITIONS.items():
+        key = row[field] if field else UNIVERSITY_KEY
+        if key is not None:
+            yield scope, key
+
+def _add_rows(changes, rows, sign: int) -> None:
+    for row in rows:
+        for scope_key in _keys(row):
+            change = changes[scope_key]
+            change['students_count'] += sign
+            for metric, field in METRIC_FIELDS.items():
+                change[SUM_FIELDS[metric]] += sign * row[field]
+
+def apply_rollup_changes(changes: dict) -> None:
+    """
+    Прибавляет изменения к строкам сводки UPDATE-запросами с F(), создавая недостающие строки.
+
+    Параметры:
+        changes (dict): {(разрез, ключ): {поле сводки: дельта}}.
+    """
+    changes = {
+        scope_key: {field: delta for field, delta in fields.items() if delta}
+        for scope_key, fields in changes.items()
+    }
+    # Строки обновляются в одном порядке во всех процессах, чтобы одновременные обновления не взаимоблокировались
+    changes = {scope_key: fields for scope_key, fields in sorted(changes.items()) if fields}
+    if not changes:
+        return
+
+    with transaction.atomic():
+        ScoreRollup.objects.bulk_create(
+            [ScoreRollup(scope=scope, key=key) for scope, key in changes],
+            ignore_conflicts=True,
+        )
+        for (scope, key), fields in changes.items():
+            ScoreRollup.objects.filter(scope=scope, key=key).update(
+                **{field: F(field) + delta for field, delta in fields.items()}
+            )
+
+def update_rollups(removed=(), added=()) -> None:
+    """
+    Переносит в сводку и распределение баллов изменение состава студентов, их разрезов или баллов.
+
+    Вклад строк removed (состояние студентов до изменения) вычитается, вклад added
+    (после изменения) - прибавляется. Строки - словари из student_rows.
+
+    Пример:
+        before = student_rows([student.id])
+        ...  # перевод студента в другую группу
+        update_rollups(removed=before, added=student_rows([student.id]))
+    """
+    changes = defaultdict(lambda: defaultdict(int))
+    _add_rows(changes, removed, -1)
+    _add_rows(changes, added, 1)
+    with transaction.atomic():
+        update_score_counts(removed, added)
+        apply_rollup_changes(changes)
+
+def rebuild_rollups() -> int:
+    """
+    Полностью пересобирает сводку агрегирующими запросами (по одному на разрез),
+    а вместе с ней распределение баллов (rebuild_score_counts).
+
+    Возвращает:
+        int: Количество строк сводки.
+    """
+    aggregates = {
+        'students_count': Count('id'),
+        **{SUM_FIELDS[metric]: Sum(field) for metric, field in METRIC_FIELDS.items()},
+    }
+    rollups = []
+    for scope, field in ROLLUP_PARTITIONS.items():
+        if field:
+            rows = Student.objects.filter(**{f'{field}__isnull': False}).order_by().values(field).annotate(**aggregates)
+        else:
+            rows = [Student.objects.aggregate(**aggregates)]
+        for row in rows:
+            if not row['students_count']:
+                continue
+            rollups.append(ScoreRollup(
+                scope=scope,
+                key=row[field] if field else UNIVERSITY_KEY,
+                **{name: row[name] or 0 for name in aggregates},
+            ))
+
+    with transaction.atomic():
+        ScoreRollup.objects.all().delete()
+        ScoreRollup.objects.bulk_create(rollups)
+        rebuild_score_counts()
+    return len(rollups)
+
+def rollup_stats(scope: str, key) -> dict:
+    """
+    Читает сводку разреза: количество студентов, средний общий балл и суммы по категориям.
+
+    Для отсутствующей строки (например, ключ None или пустой разрез) возвращаются нули.
+    """
+    row = ScoreRollup.objects.filter(scope=scope, key=key).first() if key is not None else None
+    count = row.students_count if row else 0
+    return {
+        "total_students": count,
+        "avg_score": round(row.total_sum / count, 2) if count else 0,
+        "category_totals": {
+            metric: getattr(row, SUM_FIELDS[metric]) if row else 0
+            for metric in METRIC_FIELDS if metric != 'total'
+        },
+    }
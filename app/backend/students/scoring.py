@@ -1,5 +1,10 @@
 from django.conf import settings
+import hashlib
 import json
+import os
+import threading
+
+import numpy as np
 
 config_path = settings.SCORING_CONFIG_PATH
 
@@ -32,12 +37,249 @@ def load_rules() -> dict:
         print("Error: Invalid JSON in scoring config")
         return {}
 
+def _resolve_score(rules: dict, category, sub_type, level, result) -> int:
+    """
+    Обходит дерево правил и возвращает балл по приоритету уровень → результат → default.
+
+    Эталонная реализация поиска, по которой компилируется плоская таблица ScoringRules.
+    Используется также для ключей, которых нет в скомпилированной таблице.
+    """
+    cat_rules = rules.get(category)
+    if not cat_rules:
+        return 0
+
+    sub_rules = cat_rules.get(sub_type)
+    if not sub_rules:
+        return 0
+
+    if level in sub_rules and isinstance(sub_rules[level], dict):
+        return sub_rules[level].get(result, 0)
+
+    if result in sub_rules and isinstance(sub_rules[result], int):
+        return sub_rules[result]
+
+    if 'default' in sub_rules:
+        return sub_rules['default']
+
+    return 0
+
+def compile_rules(rules: dict) -> dict:
+    """
+    Компилирует дерево правил в плоскую таблицу {(category, sub_type, level, result): балл}.
+
+    Для каждой пары категория/подтип перебираются все уровни и результаты из раздела metadata
+    (а также ключи, встречающиеся в самом подтипе), и для каждой комбинации заранее
+    вычисляется балл через _resolve_score. Таким образом, поиск по таблице полностью
+    повторяет семантику level → result → default, но стоит одно обращение к словарю.
+    """
+    metadata = rules.get('metadata', {})
+    base_levels = set(metadata.get('levels', {})) | {'none'}
+    base_results = set(metadata.get('results', {})) | {'none', 'other'}
+
+    table = {}
+    for cat_key, cat_rules in rules.items():
+        if cat_key == 'metadata' or not isinstance(cat_rules, dict):
+            continue
+        for sub_key, sub_rules in cat_rules.items():
+            if sub_key == 'label' or not isinstance(sub_rules, dict):
+                continue
+
+            levels = set(base_levels)
+            results = set(base_results)
+            for key, value in sub_rules.items():
+                if isinstance(value, dict):
+                    levels.add(key)
+                    results.update(value)
+                elif key != 'label':
+                    results.add(key)
+
+            for level in levels:
+                for result in results:
+                    table[(cat_key, sub_key, level, result)] = _resolve_score(rules, cat_key, sub_key, level, result)
+    return table
+
+def compile_dense(rules: dict) -> tuple[tuple[dict, dict, dict, dict], np.ndarray]:
+    """
+    Компилирует дерево правил в плотный 4-мерный массив баллов для векторного поиска.
+
+    Каждая ось (категория, подтип, уровень, результат) кодируется словарём значение → индекс.
+    Последний индекс каждой оси зарезервирован под «неизвестное» значение: для него балл
+    вычисляется так же, как для любого ключа, отсутствующего в конфиге.
+
+    Возвращает:
+        tuple: ((categories, sub_types, levels, results), scores), где первые четыре элемента -
+               словари кодирования осей, а scores - массив формы (n_cat+1, n_sub+1, n_lvl+1, n_res+1).
+    """
+    table = compile_rules(rules)
+    axes = tuple({} for _ in range(4))
+    for key in table:
+        for axis, value in zip(axes, key):
+            axis.setdefault(value, len(axis))
+
+    values = tuple([*axis, None] for axis in axes)
+    scores = np.zeros(tuple(len(v) for v in values), dtype=np.int64)
+    for ci, category in enumerate(values[0]):
+        for si, sub_type in enumerate(values[1]):
+            for li, level in enumerate(values[2]):
+                for ri, result in enumerate(values[3]):
+                    scores[ci, si, li, ri] = _resolve_score(rules, category, sub_type, level, result)
+    return axes, scores
+
+def diff_rules(old_rules: dict, new_rules: dict) -> set[tuple]:
+    """
+    Сравнивает два дерева правил и возвращает ключи, балл по которым изменился.
+
+    Перебираются все ключи (category, sub_type, level, result) обеих скомпилированных таблиц,
+    и для каждого балл вычисляется по старым и новым правилам.
+
+    Возвращает:
+        set[tuple]: Множество ключей (category, sub_type, level, result) с изменившимся баллом.
+    """
+    keys = compile_rules(old_rules).keys() | compile_rules(new_rules).keys()
+    return {
+        key for key in keys
+        if _resolve_score(old_rules, *key) != _resolve_score(new_rules, *key)
+    }
+
+class ScoringRules:
+    """
+    Скомпилированная таблица правил начисления баллов, хранящаяся в памяти процесса.
+
+    Конфигурация читается и компилируется один раз, а затем перечитывается только тогда,
+    когда у файла меняются mtime/размер. Если после перечитывания хэш содержимого не изменился,
+    таблица не перекомпилируется. Хэш содержимого служит версией правил (атрибут version).
+
+    Атрибуты:
+        rules (dict): Разобранный JSON-конфиг (общий для всех потребителей, не изменять).
+        table (dict): Плоская таблица {(category, sub_type, level, result): балл}.
+        version (str | None): sha256 содержимого файла конфигурации.
+        hits (int): Количество поисков, найденных в плоской таблице.
+        misses (int): Количество поисков, разрешённых обходом дерева (неизвестные ключи).
+        reloads (int): Сколько раз таблица была перекомпилирована.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.rules = {}
+        self.table = {}
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self._derived = {}
+        self._stat = None
+        self._lock = threading.Lock()
+
+    def refresh(self) -> None:
+        """
+        Проверяет mtime/размер файла и при необходимости перечитывает и перекомпилирует правила.
+
+        При отсутствии файла или невалидном JSON выводится сообщение об ошибке (как в load_rules),
+        а ранее загруженные правила остаются в силе.
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            if self._stat != 'missing':
+                print(f"Error: Scoring config not found at {self.path}")
+                self._stat = 'missing'
+            return
+
+        stat_key = (stat.st_mtime_ns, stat.st_size)
+        if stat_key == self._stat:
+            return
+
+        with self._lock:
+            if stat_key == self._stat:
+                return
+
+            with open(self.path, 'rb') as f:
+                raw = f.read()
+            self._stat = stat_key
+
+            version = hashlib.sha256(raw).hexdigest()
+            if version == self.version:
+                return
+
+            try:
+                rules = json.loads(raw.decode('utf-8'))
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                print("Error: Invalid JSON in scoring config")
+                return
+
+            self.table = compile_rules(rules)
+            self._derived = {}
+            self.rules = rules
+            self.version = version
+            self.reloads += 1
+
+    def score(self, category, sub_type, level='none', result='none') -> int:
+        """
+        Возвращает балл за достижение: сначала из плоской таблицы, затем обходом дерева правил.
+        """
+        self.refresh()
+        value = self.table.get((category, sub_type, level, result))
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        return _resolve_score(self.rules, category, sub_type, level, result)
+
+    def memoize(self, name: str, builder):
+        """
+        Возвращает значение, производное от текущей версии правил, вычисляя его один раз на версию.
+
+        Используется для всего, что строится из конфига (плотный массив, choices, ответы API):
+        при изменении файла правил все такие значения сбрасываются вместе с таблицей.
+
+        Параметры:
+            name (str): Имя производного значения.
+            builder (Callable[[], Any]): Функция, строящая значение по текущим правилам.
+        """
+        self.refresh()
+        derived = self._derived
+        if name not in derived:
+            derived[name] = builder()
+        return derived[name]
+
+    def dense(self) -> tuple[tuple[dict, dict, dict, dict], np.ndarray]:
+        """
+        Возвращает плотное представление правил (см. compile_dense), собирая его при первом обращении к версии.
+        """
+        return self.memoize('dense', lambda: compile_dense(self.rules))
+
+    def stats(self) -> dict:
+        """
+        Возвращает счётчики использования таблицы (для мониторинга и отладки).
+        """
+        return {
+            "version": self.version,
+            "entries": len(self.table),
+            "hits": self.hits,
+            "misses": self.misses,
+            "reloads": self.reloads,
+        }
+
+scoring_rules = ScoringRules(config_path)
+
+def get_rules() -> dict:
+    """
+    Возвращает разобранную конфигурацию правил из памяти процесса (перечитывая файл только при его изменении).
+
+    В отличие от load_rules, не открывает файл на каждый вызов. Возвращаемый словарь общий
+    для всех потребителей и не должен изменяться.
+    """
+    scoring_rules.refresh()
+    return scoring_rules.rules
+
 def calculate_achievement_score(category, sub_type, level='none', result='none'):
     """
     Вычисляет балл за достижение на основе заданных категории, подтипа, уровня и результата.
 
-    Функция использует внешние правила из JSON-конфигурации (загружается через load_rules),
+    Функция использует скомпилированную таблицу правил (см. ScoringRules),
     чтобы определить количество баллов в зависимости от типа активности студента.
+    Файл конфигурации не перечитывается на каждый вызов - только при его изменении.
     Поиск подходящего значения происходит по заранее определённому приоритету:
 
     1. Полное совпадение: категория → подтип → уровень → результат. (category -> sub_type -> level -> result)
@@ -57,32 +299,62 @@ def calculate_achievement_score(category, sub_type, level='none', result='none')
         calculate_achievement_score('academic', 'grades', result='excellent')  # Успеваемость: "отлично"
         calculate_achievement_score('sport', 'competition', level='university', result='1')  # Спорт, 1 место, вузовский уровень
     """
-    rules: dict = load_rules()
-    
-    cat_rules = rules.get(category)
-    if not cat_rules:
-        return 0
-    
-    sub_rules = cat_rules.get(sub_type)
-    if not sub_rules:
-        return 0
-    
-    if level in sub_rules and isinstance(sub_rules[level], dict):
-        return sub_rules[level].get(result, 0)
-    
-    if result in sub_rules and isinstance(sub_rules[result], int):
-        return sub_rules[result]
-    
-    if 'default' in sub_rules:
-        return sub_rules['default']
+    return scoring_rules.score(category, sub_type, level, result)
 
-    return 0
+def _encode_column(values, vocabulary: dict) -> np.ndarray:
+    """
+    Кодирует столбец строковых значений в индексы оси плотного массива.
+
+    Уникальные значения кодируются один раз (np.unique), значения вне словаря получают
+    индекс «неизвестного» значения (len(vocabulary)).
+    """
+    column = np.asarray(['' if v is None else v for v in values], dtype=object).astype(str)
+    uniques, inverse = np.unique(column, return_inverse=True)
+    unknown = len(vocabulary)
+    codes = np.fromiter((vocabulary.get(u, unknown) for u in uniques), dtype=np.intp, count=len(uniques))
+    return codes[inverse.reshape(-1)]
+
+def score_batch(categories, sub_types, levels, results) -> np.ndarray:
+    """
+    Пакетный аналог calculate_achievement_score: вычисляет баллы сразу для столбцов значений.
+
+    Вместо обхода словарей для каждой строки столбцы кодируются в целочисленные индексы,
+    и баллы выбираются одной операцией индексирования плотного массива правил.
+    Результат совпадает с поэлементным вызовом calculate_achievement_score.
+
+    Параметры:
+        categories (Sequence[str]): Категории достижений.
+        sub_types (Sequence[str]): Подтипы достижений.
+        levels (Sequence[str]): Уровни мероприятий.
+        results (Sequence[str]): Результаты участия.
+        Все столбцы должны быть одной длины.
+
+    Возвращает:
+        np.ndarray: Массив баллов (int64) той же длины, что и входные столбцы.
+
+    Пример:
+        score_batch(['sport', 'academic'], ['competition', 'grades'], ['world', 'none'], ['1', 'excellent'])
+        # → array([8, 2])
+    """
+    (cat_axis, sub_axis, level_axis, result_axis), scores = scoring_rules.dense()
+    if not len(categories):
+        return np.zeros(0, dtype=np.int64)
+
+    return scores[
+        _encode_column(categories, cat_axis),
+        _encode_column(sub_types, sub_axis),
+        _encode_column(levels, level_axis),
+        _encode_column(results, result_axis),
+    ]
 
 def get_choices_from_config(key_path) -> list[tuple] | list:
     """
     Возвращает список значений для использования в полях модели Django с параметром choices.
 
-    Функция извлекает данные из scoring_config.json (загружается через load_rules) и форматирует их в виде списка кортежей.
+    Функция извлекает данные из scoring_config.json и форматирует их в виде списка кортежей.
+    Конфигурация разбирается один раз на процесс (get_rules), а готовые списки кэшируются
+    для текущей версии правил, поэтому повторные вызовы (например, шесть полей модели Document
+    при импорте models.py) не читают файл заново.
 
     Параметры:
         key_path (str): Путь к данным в конфигурации. Поддерживаемые значения:
@@ -104,12 +376,26 @@ def get_choices_from_config(key_path) -> list[tuple] | list:
         - Для 'metadata.*' извлекаются плоские словари из раздела metadata конфигурации.
         - Для 'categories' берётся основной уровень конфигурации (кроме 'metadata').
         - Для 'sub_types' проходится вся структура, извлекаются все подтипы, удаляются дубликаты.
+          Порядок детерминирован (порядок следования в конфиге), чтобы makemigrations не видел изменений.
         - Если метка отсутствует в данных, используется ключ как значение по умолчанию.
 
     Используется для динамического формирования выпадающих списков в формах и моделях из scoring_config.json.
     """
-    rules = load_rules()
-    
+    return list(scoring_rules.memoize(f'choices:{key_path}', lambda: _build_choices(get_rules(), key_path)))
+
+def get_choice_labels(key_path) -> dict:
+    """
+    Возвращает словарь {ключ: метка} для choices из get_choices_from_config (кэшируется на версию правил).
+
+    Заменяет get_<поле>_display() при сериализации большого числа документов: Django строит
+    словарь меток из choices заново при каждом вызове, а здесь он строится один раз.
+    """
+    return scoring_rules.memoize(f'labels:{key_path}', lambda: dict(get_choices_from_config(key_path)))
+
+def _build_choices(rules: dict, key_path) -> list[tuple]:
+    """
+    Строит список choices для get_choices_from_config из уже разобранной конфигурации.
+    """
     if key_path.startswith('metadata.'):
         section = key_path.split('.')[1]
         data = rules.get('metadata', {}).get(section, {})
@@ -125,7 +411,8 @@ def get_choices_from_config(key_path) -> list[tuple] | list:
             for sub_key, sub_data in cat_data.items():
                 if sub_key == 'label': continue
                 sub_types.append((sub_key, sub_data.get('label', sub_key)))
-        return list(set(sub_types))
+        # dict.fromkeys удаляет дубликаты, сохраняя порядок из конфига (в отличие от set)
+        return list(dict.fromkeys(sub_types))
 
     return []
 
@@ -133,7 +420,7 @@ def get_scoring_structure() -> dict:
     """
     Формирует структуру правил начисления баллов для клиентской части приложения.
 
-    Функция загружает правила из JSON-конфигурации (через load_rules) и преобразует их
+    Функция берёт правила из памяти процесса (через get_rules) и преобразует их
     в удобный для фронтенда формат, описывающий категории и подтипы достижений,
     а также указывающий, требуют ли они выбора уровня и результата.
 
@@ -169,7 +456,7 @@ def get_scoring_structure() -> dict:
         - Если у подтипа есть ключ 'default', считается, что результат не требуется (т.е фиксированный балл).
     """
     
-    rules: dict = load_rules()
+    rules: dict = get_rules()
     structure: dict = {}
 
     for cat_key, cat_content in rules.items():
@@ -3,6 +3,7 @@ from university_structure.models import Faculty
 from students.models import Student
 
 from .models import Document
+from .scoring import get_choice_labels
 
 class StudentRatingSerializer(serializers.ModelSerializer):
     """
@@ -35,12 +36,55 @@ class StudentRatingSerializer(serializers.ModelSerializer):
             'cultural_score',
         ]
 
+class DashboardStudentSerializer(StudentRatingSerializer):
+    """
+    Студент в разделе кабинета сотрудника: поля рейтинга, номер зачётки и группа (без документов).
+
+    Queryset нужно подготовить через setup_eager_loading.
+    """
+    group_id = serializers.IntegerField(read_only=True)
+
+    class Meta(StudentRatingSerializer.Meta):
+        fields = StudentRatingSerializer.Meta.fields + ['record_book', 'group_id']
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Загружает студентов вместе с группой и факультетом одним запросом, выбирая только нужные столбцы.
+        """
+        return queryset.select_related('group', 'faculty').only(
+            'id', 'user_id', 'full_name', 'record_book', 'group', 'faculty',
+            'group__name', 'group__course', 'faculty__short_name',
+            'academic_score', 'research_score', 'sport_score', 'social_score', 'cultural_score', 'total_score',
+        )
+
+class ChoiceLabelField(serializers.Field):
+    """
+    Метка значения поля с choices из scoring_config.json (аналог get_<поле>_display()).
+
+    Метки берутся из словаря, закэшированного на версию правил (get_choice_labels).
+    Для неизвестного значения возвращается само значение, как в Django.
+    """
+    def __init__(self, key_path, **kwargs):
+        self.key_path = key_path
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return get_choice_labels(self.key_path).get(value, value)
+
+# Поля документа, которые читает DocumentSerializer (для QuerySet.only() в списках)
+DOCUMENT_SERIALIZER_FIELDS = [
+    'id', 'student_id', 'category', 'sub_type', 'level', 'result', 'achievement', 'rejection_reason',
+    'score', 'status', 'doc_type', 'file_url', 'original_file_name', 'uploaded_at',
+]
+
 class DocumentSerializer(serializers.ModelSerializer):
-    category_display = serializers.CharField(source='get_category_display', read_only=True)
-    sub_type_display = serializers.CharField(source='get_sub_type_display', read_only=True)
-    level_display = serializers.CharField(source='get_level_display', read_only=True)
-    result_display = serializers.CharField(source='get_result_display', read_only=True)
-    doc_type_display = serializers.CharField(source='get_doc_type_display', read_only=True)
+    category_display = ChoiceLabelField('categories', source='category')
+    sub_type_display = ChoiceLabelField('sub_types', source='sub_type')
+    level_display = ChoiceLabelField('metadata.levels', source='level')
+    result_display = ChoiceLabelField('metadata.results', source='result')
+    doc_type_display = ChoiceLabelField('metadata.doc_types', source='doc_type')
 
     class Meta:
         model = Document
@@ -75,4 +119,30 @@ class StudentProfileSerializer(serializers.ModelSerializer):
             'group', 'group_id', 'course', 'faculty',
             'academic_score', 'research_score', 'sport_score', 'social_score', 'cultural_score', 'total_score',
             'documents',
-        ]
\ No newline at end of file
+        ]
+
+class PendingDocumentSerializer(DocumentSerializer):
+    """
+    Документ на проверку в кабинете сотрудника: поля документа и данные студента.
+
+    Queryset нужно подготовить через setup_eager_loading.
+    """
+    student_id = serializers.IntegerField(read_only=True)
+    student_name = serializers.CharField(source='student.full_name', read_only=True)
+    group_id = serializers.SerializerMethodField()
+    record_book = serializers.CharField(source='student.record_book', read_only=True)
+
+    class Meta(DocumentSerializer.Meta):
+        fields = DocumentSerializer.Meta.fields + ['student_id', 'student_name', 'group_id', 'record_book']
+
+    def get_group_id(self, obj):
+        return obj.student.group_id or "—"
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Загружает документы вместе с нужными полями студента одним запросом.
+        """
+        return queryset.select_related('student').only(
+            *DOCUMENT_SERIALIZER_FIELDS, 'student__full_name', 'student__group_id', 'student__record_book',
+        )
@@ -0,0 +1,236 @@
+from collections import defaultdict
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Q, Subquery, Value, When
+
+from .models import Document, ScoreEvent, Student
+from .ranks import METRIC_FIELDS
+from .rollups import student_rows, update_rollups
+from .scoring import score_batch
+from .tasks import data_changed, rating_changed
+
+# Имя счётчика DataVersion, который увеличивается при любом изменении документов студентов
+DOCUMENTS_DATA = 'documents'
+
+
+def score_field(category) -> str | None:
+    """
+    Возвращает имя поля баллов студента для категории (например, 'academic' → 'academic_score').
+
+    Возвращает None, если у модели Student нет такого поля (неизвестная категория).
+    """
+    field_name = f"{category}_score"
+    try:
+        Student._meta.get_field(field_name)
+    except FieldDoesNotExist:
+        return None
+    return field_name
+
+def touch_students(student_ids) -> None:
+    """
+    Увеличивает версию данных студентов (Student.data_version) - их профили получат новый ETag.
+    """
+    student_ids = set(student_ids)
+    if student_ids:
+        Student.objects.filter(pk__in=student_ids).update(data_version=F('data_version') + 1)
+
+def documents_changed(student_ids) -> None:
+    """
+    Отмечает изменение документов студентов: профили студентов и списки документов сотрудников
+    получат новые ETag. Вызывается после загрузки, проверки и пересчёта документов.
+    Версия документов увеличивается фоновой задачей (students.tasks.data_changed), которая
+    ставится в очередь в транзакции вызывающего.
+    """
+    student_ids = set(student_ids)
+    if not student_ids:
+        return
+    touch_students(student_ids)
+    data_changed(DOCUMENTS_DATA)
+
+def sync_document_departments(student_ids) -> int:
+    """
+    Переносит в документы студентов их текущую кафедру (Document.department) после смены кафедры студента.
+
+    Возвращает:
+        int: Количество обновлённых документов.
+    """
+    student_ids = set(student_ids)
+    if not student_ids:
+        return 0
+    department = Subquery(Student.objects.filter(pk=OuterRef('student_id')).values('department_id')[:1])
+    return Document.objects.filter(student_id__in=student_ids).exclude(
+        department_id=F('student__department_id'),
+    ).update(department_id=department)
+
+def apply_score_deltas(deltas: dict) -> int:
+    """
+    Применяет изменения баллов сразу к нескольким студентам одним UPDATE-запросом.
+
+    Для каждого затронутого поля баллов строится выражение
+    `поле = поле + CASE WHEN id = ... THEN дельта ... ELSE 0 END`, поэтому значения
+    увеличиваются на стороне БД (F()), без чтения и перезаписи всей строки студента.
+    Тем же запросом увеличивается версия данных студентов (data_version), а в той же транзакции
+    инкрементально обновляются сводка баллов по разрезам и распределение баллов для мест
+    (students.rollups.update_rollups; строки блокируются в одном порядке во всех процессах)
+    и в фоновую очередь ставятся увеличение версии данных рейтинга, которое сбрасывает снимки
+    рейтинга во всех процессах, и пересборка ведомости (students.tasks.rating_changed).
+    Задачи выполняет команда run_tasks; они фиксируются вместе с баллами и не теряются,
+    если процесс завершится сразу после фиксации.
+    Журнал баллов не пишется - изменения баллов нужно проводить через apply_score_events.
+
+    Параметры:
+        deltas (dict): Словарь {(student_id, category): дельта}. Нулевые дельты и
+                       неизвестные категории пропускаются.
+
+    Возвращает:
+        int: Количество обновлённых строк студентов.
+
+    Пример:
+        apply_score_deltas({(1, 'sport'): 8, (2, 'academic'): -2})
+    """
+    per_field = defaultdict(lambda: defaultdict(int))
+    for (student_id, category), delta in deltas.items():
+        field_name = score_field(category)
+        if field_name and delta:
+            per_field[field_name][student_id] += delta
+
+    student_ids = set()
+    updates = {}
+    for field_name, per_student in per_field.items():
+        whens = [When(pk=student_id, then=Value(delta)) for student_id, delta in per_student.items() if delta]
+        if not whens:
+            continue
+        student_ids.update(per_student)
+        updates[field_name] = F(field_name) + Case(*whens, default=Value(0), output_field=IntegerField())
+
+    if not updates:
+        return 0
+
+    score_changes = defaultdict(dict)
+    for field_name, per_student in per_field.items():
+        category = field_name.removesuffix('_score')
+        for student_id, delta in per_student.items():
+            score_changes[student_id][category] = delta
+    for per_student in score_changes.values():
+        per_student['total'] = sum(per_student.values())
+
+    with transaction.atomic():
+        updated = Student.objects.filter(pk__in=student_ids).update(data_version=F('data_version') + 1, **updates)
+        after = student_rows(student_ids)
+        # Баллы до изменения восстанавливаются из новых: строки студентов заблокированы UPDATE до конца транзакции
+        before = [
+            {**row, **{
+                METRIC_FIELDS[metric]: row[METRIC_FIELDS[metric]] - delta
+                for metric, delta in score_changes[row['id']].items()
+            }}
+            for row in after
+        ]
+        update_rollups(removed=before, added=after)
+        rating_changed()
+    return updated
+
+def apply_score_events(events) -> int:
+    """
+    Записывает события в журнал баллов и применяет их к баллам студентов одной транзакцией.
+
+    Все изменения баллов проходят через эту функцию, поэтому поля Student.*_score всегда
+    совпадают со свёрткой журнала (ScoreEvent). События с нулевым изменением не записываются.
+    Изменения суммируются по студенту и категории и применяются одним apply_score_deltas.
+
+    Параметры:
+        events (Iterable[ScoreEvent]): Несохранённые события.
+
+    Возвращает:
+        int: Количество обновлённых строк студентов.
+
+    Пример:
+        apply_score_events([ScoreEvent(student_id=1, document_id=7, category='sport', delta=8, kind='approved')])
+    """
+    events = [event for event in events if event.delta]
+    deltas = defaultdict(int)
+    for event in events:
+        deltas[(event.student_id, event.category)] += event.delta
+
+    with transaction.atomic():
+        ScoreEvent.objects.bulk_create(events)
+        return apply_score_deltas(deltas)
+
+def rescore_documents(queryset, version: str, chunk_size: int = 5000, dry_run: bool = False):
+    """
+    Пакетно пересчитывает баллы документов из queryset по текущим правилам.
+
+    Документы читаются пачками по первичному ключу (SELECT ... FOR UPDATE в порядке id),
+    баллы считаются векторно (score_batch). В каждой пачке одним bulk_update записываются
+    новые баллы и версия правил, а для подтверждённых документов разница баллов переносится
+    студентам событиями 'rescored' журнала баллов (apply_score_events).
+    Каждая пачка читается и записывается в одной транзакции, поэтому подтверждение или отклонение
+    документа не может вклиниться между чтением его статуса и записью разницы баллов; транзакции
+    отдельные для каждой пачки, чтобы не держать блокировки долго.
+
+    Параметры:
+        queryset (QuerySet[Document]): Документы для пересчёта.
+        version (str): Версия правил, которой помечаются пересчитанные документы.
+        chunk_size (int): Размер пачки.
+        dry_run (bool): Только посчитать изменения, ничего не записывая.
+
+    Возвращает (генератор):
+        tuple[int, int]: После каждой пачки - (обработано документов, изменено баллов) нарастающим итогом.
+    """
+    last_id = 0
+    total = changed = 0
+    fields = ('id', 'student_id', 'category', 'sub_type', 'level', 'result', 'score', 'status', 'score_version')
+
+    while True:
+        with transaction.atomic():
+            chunk = queryset.filter(id__gt=last_id).order_by('id')
+            if not dry_run:
+                # Статус и баллы читаются под блокировкой строк до конца транзакции: проверка документа,
+                # начавшаяся после чтения, дождётся записи пересчёта и возьмёт уже новые баллы
+                chunk = chunk.select_for_update(of=('self',))
+            rows = list(chunk.values_list(*fields)[:chunk_size])
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            total += len(rows)
+
+            ids, student_ids, categories, sub_types, levels, results, old_scores, statuses, versions = zip(*rows)
+            new_scores = score_batch(categories, sub_types, levels, results).tolist()
+
+            to_update = []
+            events = []
+            for i, new_score in enumerate(new_scores):
+                if new_score == old_scores[i] and versions[i] == version:
+                    continue
+                to_update.append(Document(id=ids[i], score=new_score, score_version=version))
+                if new_score != old_scores[i]:
+                    changed += 1
+                    # Баллы подтверждённых документов уже начислены студенту - переносим только разницу
+                    if statuses[i] == 'approved':
+                        events.append(ScoreEvent(
+                            student_id=student_ids[i], document_id=ids[i], category=categories[i],
+                            delta=new_score - old_scores[i], kind='rescored',
+                        ))
+
+            if to_update and not dry_run:
+                Document.objects.bulk_update(to_update, ['score', 'score_version'], batch_size=chunk_size)
+                apply_score_events(events)
+                documents_changed(student_ids[i] for i, new_score in enumerate(new_scores) if new_score != old_scores[i])
+
+        yield total, changed
+
+def changed_documents_filter(changed_keys) -> Q:
+    """
+    Строит фильтр документов по множеству ключей (category, sub_type, level, result).
+
+    Ключи группируются по (category, sub_type, level), чтобы условие было компактным:
+    (category = ... AND sub_type = ... AND level = ... AND result IN (...)) OR ...
+    """
+    grouped = defaultdict(set)
+    for category, sub_type, level, result in changed_keys:
+        grouped[(category, sub_type, level)].add(result)
+
+    condition = Q(pk__in=[])
+    for (category, sub_type, level), results in grouped.items():
+        condition |= Q(category=category, sub_type=sub_type, level=level, result__in=sorted(results))
+    return condition
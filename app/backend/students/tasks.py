@@ -0,0 +1,57 @@
+from main.models import DataVersion
+from main.tasks import enqueue, task
+from .export import SPREADSHEET_FORMATS, cache_export, export_cache_path, stream_scholarship_export
+from .ranks import RATING_DATA
+
+BUILD_SCHOLARSHIP_EXPORT = 'students.build_scholarship_export'
+BUMP_DATA_VERSION = 'students.bump_data_version'
+
+# Через сколько секунд после изменения баллов пересобирается ведомость: серия подтверждений
+# за это время схлопывается в одну задачу (ключ идемпотентности)
+SCHOLARSHIP_EXPORT_DELAY = 30
+
+# Параметры ведомости, которую выгружают чаще всего: весь вуз, место по общему баллу
+DEFAULT_SCHOLARSHIP_PARAMS = {'sort': 'total', 'faculty': None, 'course': None, 'group': None}
+
+
+@task(BUILD_SCHOLARSHIP_EXPORT, max_attempts=3, retry_delay=60)
+def build_scholarship_export():
+    """
+    Заранее формирует стипендиальную ведомость по всему вузу (CSV и XLSX) для текущей версии
+    данных рейтинга, чтобы первое скачивание после подтверждения документов отдавало готовый файл.
+
+    Файлы кэша лежат на общем диске (EXPORT_CACHE_DIR), поэтому их видят все процессы бэкенда.
+    Уже сформированные для этой версии файлы не пересобираются.
+    """
+    for export_format in SPREADSHEET_FORMATS:
+        path = export_cache_path('scholarship', DEFAULT_SCHOLARSHIP_PARAMS, export_format)
+        if path.exists():
+            continue
+        for _ in cache_export(path, stream_scholarship_export(DEFAULT_SCHOLARSHIP_PARAMS, export_format)):
+            pass
+
+@task(BUMP_DATA_VERSION)
+def bump_data_version(name):
+    """
+    Увеличивает счётчик версии данных name (DataVersion): кэши и ETag, построенные по нему,
+    становятся неактуальными во всех процессах. Повторное выполнение лишь ещё раз сбрасывает кэши.
+    """
+    DataVersion.bump(name)
+
+def data_changed(name: str) -> None:
+    """
+    Ставит в очередь увеличение версии данных name.
+
+    Задача ставится в транзакции изменения и появляется в очереди только вместе с ним.
+    Общая строка счётчика обновляется обработчиком очереди, а не до конца транзакции вызывающего,
+    и серия изменений до выполнения задачи схлопывается в одно увеличение (ключ идемпотентности).
+    """
+    enqueue(BUMP_DATA_VERSION, {'name': name}, key=f'{BUMP_DATA_VERSION}:{name}')
+
+def rating_changed() -> None:
+    """
+    Ставит в очередь фоновую работу после изменения баллов студентов: версию данных рейтинга
+    и пересборку стипендиальной ведомости.
+    """
+    data_changed(RATING_DATA)
+    enqueue(BUILD_SCHOLARSHIP_EXPORT, key=BUILD_SCHOLARSHIP_EXPORT, delay=SCHOLARSHIP_EXPORT_DELAY)
@@ -1,3 +1,503 @@
-from django.test import TestCase
+import json
+import os
+import random
+import subprocess
+import sys
+import tracemalloc
+from collections import Counter, defaultdict
+from itertools import product
+from concurrent.futures import ThreadPoolExecutor
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import Sum
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from main.models import DataVersion, Job
+from main.tasks import claim_jobs, run_job
+from university_structure.models import Department, Faculty, Group
+from .dashboard import (
+    dashboard_counts, dashboard_documents_page, dashboard_groups, dashboard_stats, dashboard_students_page,
+    parse_dashboard_params,
+)
+from .export import stream_rating_export
+from .leaderboard import LEADERBOARD_CATEGORIES
+from .ledger import rebuild_scores
+from .models import Document, ScoreCount, ScoreEvent, ScoringConfigVersion, Student
+from .moderation import ReviewConflict, review_document
+from .services import DOCUMENTS_DATA, apply_score_events
+from .tasks import BUILD_SCHOLARSHIP_EXPORT, BUMP_DATA_VERSION
+from .ranks import RATING_DATA, get_student_ranks
+from .rating import parse_rating_params, rating_page
+from .scoring import _resolve_score, compile_rules, get_choices_from_config, get_rules, score_batch, scoring_rules
+from .rollups import UNIVERSITY_KEY, rebuild_rollups, rollup_stats, student_rows, update_rollups
+
+# Наибольшее допустимое время django.setup() в чистом процессе (импорт всех моделей, в том числе students.models)
+IMPORT_TIME_LIMIT = 5.0
+
+# Скрипт, который запускается в отдельном процессе: импорт моделей с нуля, без кэшей текущего процесса
+_IMPORT_PROBE = """
+import json, os, time
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+import django
+started = time.perf_counter()
+django.setup()
+elapsed = time.perf_counter() - started
+from students.models import Document
+from students.scoring import scoring_rules
+print(json.dumps({
+    'elapsed': elapsed,
+    'reloads': scoring_rules.reloads,
+    'sub_types': [value for value, _ in Document._meta.get_field('sub_type').choices],
+}))
+"""
+
+
+def _probe_import(hash_seed: int) -> dict:
+    env = {**os.environ, 'PYTHONHASHSEED': str(hash_seed)}
+    completed = subprocess.run(
+        [sys.executable, '-c', _IMPORT_PROBE],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+class ScoringConfigImportTests(SimpleTestCase):
+    """
+    Стоимость импорта моделей: scoring_config.json разбирается один раз на процесс,
+    а порядок choices не зависит от процесса (иначе makemigrations видит изменения).
+    """
+
+    def test_models_import_parses_config_once_within_time_limit(self):
+        result = _probe_import(hash_seed=0)
+        self.assertEqual(result['reloads'], 1)
+        self.assertLess(result['elapsed'], IMPORT_TIME_LIMIT)
+
+    def test_sub_type_choices_order_is_stable_between_processes(self):
+        first = _probe_import(hash_seed=1)
+        second = _probe_import(hash_seed=2)
+        self.assertEqual(first['sub_types'], second['sub_types'])
+
+
+class ScoringTableEquivalenceTests(SimpleTestCase):
+    """
+    Скомпилированная таблица (compile_rules, ScoringRules.score) и векторный score_batch дают те же баллы,
+    что эталонный обход дерева правил (_resolve_score) по настоящему scoring_config.json, в том числе
+    для подтипов, встречающихся в нескольких категориях, и значений, которых нет в конфиге.
+    """
+    UNKNOWN = 'not_in_config'
+
+    def setUp(self):
+        self.rules = get_rules()
+        metadata = self.rules.get('metadata', {})
+        self.categories = [value for value, _ in get_choices_from_config('categories')] + [self.UNKNOWN]
+        # Подтипы без повторов - так же, как в choices модели Document
+        self.sub_types = list(dict.fromkeys(value for value, _ in get_choices_from_config('sub_types'))) + [self.UNKNOWN]
+        self.levels = [*metadata.get('levels', {}), 'none', self.UNKNOWN, None]
+        self.results = [*metadata.get('results', {}), 'none', 'other', 'default', self.UNKNOWN, None]
+
+    def test_config_has_sub_types_shared_by_categories(self):
+        choices = get_choices_from_config('sub_types')
+        self.assertEqual(choices, list(dict.fromkeys(choices)))
+        categories_by_sub_type = Counter(
+            sub_key for cat_key, cat_rules in self.rules.items() if cat_key != 'metadata'
+            for sub_key in cat_rules if sub_key != 'label'
+        )
+        # Такие подтипы (например, contest) оцениваются по правилам своей категории - их проверяет перебор ниже
+        self.assertTrue(any(count > 1 for count in categories_by_sub_type.values()))
+
+    def test_compiled_table_matches_reference(self):
+        for key, value in compile_rules(self.rules).items():
+            self.assertEqual(value, _resolve_score(self.rules, *key), key)
+
+    def test_lookup_and_batch_match_reference_for_every_combination(self):
+        keys = list(product(self.categories, self.sub_types, self.levels, self.results))
+        expected = [_resolve_score(self.rules, *key) for key in keys]
+
+        self.assertEqual([scoring_rules.score(*key) for key in keys], expected)
+        self.assertEqual(score_batch(*zip(*keys)).tolist(), expected)
+
+
+class ScoringConfigVersionTests(TestCase):
+    """
+    Снимок правил, записанный в откатившейся транзакции, записывается заново при следующем вызове.
+    """
+
+    def setUp(self):
+        ScoringConfigVersion._registered.clear()
+
+    def test_rolled_back_snapshot_is_written_again(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                version = ScoringConfigVersion.register_current()
+                raise RuntimeError
+        self.assertFalse(ScoringConfigVersion.objects.filter(version=version).exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ScoringConfigVersion.register_current()
+        self.assertTrue(ScoringConfigVersion.objects.filter(version=version).exists())
+        self.assertIn(version, ScoringConfigVersion._registered)
+
+
+class StudentRanksTests(TestCase):
+    """
+    Места в рейтинге читаются из распределения баллов, которое обновляется в транзакции
+    подтверждения, перевода или удаления студента.
+    """
+
+    def setUp(self):
+        cache.clear()
+        faculty = Faculty.objects.create(name='Факультет тестов', short_name='ФТ')
+        department = Department.objects.create(name='Кафедра тестов', short_name='КТ', faculty=faculty)
+        self.group_a = Group.objects.create(name='Т-11', department=department, course=1)
+        self.group_b = Group.objects.create(name='Т-21', department=department, course=2)
+        self.students = [
+            Student.objects.create(
+                full_name=f'Студент {i}', phone='-', group=self.group_a, department=department, faculty=faculty,
+            )
+            for i in range(4)
+        ]
+        update_rollups(added=student_rows([student.id for student in self.students]))
+        apply_score_events([
+            ScoreEvent(student=student, category='academic', delta=score, kind='adjusted')
+            for student, score in zip(self.students, [30, 20, 20, 10])
+        ])
+
+    def ranks(self, student):
+        student = Student.objects.select_related('group').get(pk=student.pk)
+        return get_student_ranks(student)['academic']
+
+    def count_rows(self):
+        return sorted(
+            ScoreCount.objects.filter(students_count__gt=0)
+            .values_list('scope', 'key', 'metric', 'score', 'students_count')
+        )
+
+    def test_dense_ranks_share_places_for_equal_scores(self):
+        places = [self.ranks(student)['group'] for student in self.students]
+        self.assertEqual(places, [1, 2, 2, 3])
+
+    def test_approval_moves_rank_in_same_transaction(self):
+        last = self.students[3]
+        apply_score_events([ScoreEvent(student=last, category='academic', delta=25, kind='approved')])
+        self.assertEqual(self.ranks(last), {'university': 1, 'faculty': 1, 'course': 1, 'group': 1})
+        self.assertEqual(self.ranks(self.students[0])['group'], 2)
+
+    def test_ranks_follow_moves_and_deletions(self):
+        top, _, _, last = self.students
+        admin_user = get_user_model().objects.create_superuser(username='admin', password='-')
+        self.client.force_login(admin_user)
+
+        response = self.client.post(reverse('admin:students_student_change', args=[top.pk]), {
+            'full_name': top.full_name, 'phone': '-', 'group': self.group_b.pk,
+            'department': top.department_id, 'faculty': top.faculty_id,
+            'academic_score': 30, 'research_score': 0, 'sport_score': 0, 'social_score': 0, 'cultural_score': 0,
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.ranks(last)['group'], 2)
+        self.assertEqual(self.ranks(top)['group'], 1)
+        self.assertEqual(self.ranks(top)['course'], 1)
+        self.assertEqual(self.ranks(last)['faculty'], 3)
+
+        response = self.client.post(reverse('admin:students_student_delete', args=[top.pk]), {'post': 'yes'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.ranks(last)['university'], 2)
+        self.assertEqual(self.ranks(last)['faculty'], 2)
+
+        incremental = self.count_rows()
+        rebuild_rollups()
+        self.assertEqual(incremental, self.count_rows())
+
+    def test_ranks_are_read_with_one_query(self):
+        student = Student.objects.select_related('group').get(pk=self.students[3].pk)
+        with self.assertNumQueries(1):
+            ranks = get_student_ranks(student)
+        self.assertEqual(ranks['total']['university'], 3)
+
+
+class RatingSearchTests(TestCase):
+    """
+    Поиск в рейтинге: совпадения по ФИО и группе, порядок по сходству ФИО и постраничный обход.
+    """
+
+    def setUp(self):
+        cache.clear()
+        faculty = Faculty.objects.create(name='Факультет тестов', short_name='ФТ')
+        department = Department.objects.create(name='Кафедра тестов', short_name='КТ', faculty=faculty)
+        group = Group.objects.create(name='СМИРНОВ-1', department=department, course=1)
+        other = Group.objects.create(name='Т-11', department=department, course=1)
+        common = {'phone': '-', 'department': department, 'faculty': faculty}
+        self.exact = Student.objects.create(full_name='Смирнов Олег', group=other, total_score=10, **common)
+        self.typo = Student.objects.create(full_name='Смирнова Анна', group=other, total_score=50, **common)
+        self.by_group = Student.objects.create(full_name='Петров Пётр', group=group, total_score=90, **common)
+        Student.objects.create(full_name='Кузнецов Илья', group=other, total_score=70, **common)
+
+    def search(self, **query):
+        params = parse_rating_params({'q': 'смирнов', **query})
+        ids, pages = [], 0
+        while True:
+            page = rating_page(params)
+            ids += [item['id'] for item in page['results']]
+            pages += 1
+            if not page['next_cursor']:
+                return ids, pages
+            params = parse_rating_params({'q': 'смирнов', 'cursor': page['next_cursor'], **query})
+
+    def test_closest_names_come_first_and_groups_match(self):
+        ids, _ = self.search()
+        self.assertEqual(ids[0], self.exact.id)
+        self.assertCountEqual(ids, [self.exact.id, self.typo.id, self.by_group.id])
+
+    def test_cursor_pages_through_search_without_gaps(self):
+        ids, pages = self.search(page_size=1)
+        self.assertEqual(pages, 3)
+        self.assertEqual(ids, self.search()[0])
+
+    def test_cursor_without_search_rank_is_rejected(self):
+        cursor = rating_page(parse_rating_params({'page_size': 1}))['next_cursor']
+        with self.assertRaises(ValueError):
+            parse_rating_params({'q': 'смирнов', 'cursor': cursor})
+
+
+class DashboardQueryCountTests(TestCase):
+    """
+    Разделы кабинета сотрудника выполняют постоянное число запросов, сколько бы ни было
+    студентов, групп и документов в зоне видимости.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.faculty = Faculty.objects.create(name='Факультет тестов', short_name='ФТ')
+        self.department = Department.objects.create(name='Кафедра тестов', short_name='КТ', faculty=self.faculty)
+        self.add_group()
+
+    def add_group(self):
+        number = Group.objects.count() + 1
+        group = Group.objects.create(name=f'Т-{number}1', department=self.department, course=number)
+        for i in range(5):
+            student = Student.objects.create(
+                full_name=f'Студент {number}-{i}', phone='-', record_book=f'{number}{i}', group=group,
+                department=self.department, faculty=self.faculty, academic_score=i,
+            )
+            Document.objects.bulk_create([
+                Document(student=student, category='academic', achievement=f'Достижение {j}', status=status)
+                for j, status in enumerate(['pending', 'pending', 'approved'])
+            ])
+        return group
+
+    def assert_sections_queries(self):
+        students = Student.objects.all()
+        params = parse_dashboard_params({'page_size': 3})
+        # Сводка баллов, лучшие студенты, минимальный балл, документы на проверке
+        with self.assertNumQueries(4):
+            dashboard_stats('university', None, students, params)
+        with self.assertNumQueries(3):
+            dashboard_counts('university', None, students)
+        with self.assertNumQueries(1):
+            page = dashboard_students_page(students, params)
+        with self.assertNumQueries(1):
+            dashboard_students_page(students, parse_dashboard_params({'page_size': 3, 'cursor': page['next_cursor']}))
+        with self.assertNumQueries(1):
+            dashboard_students_page(students, parse_dashboard_params({'q': 'студент'}))
+        with self.assertNumQueries(1):
+            dashboard_documents_page(students, params)
+        with self.assertNumQueries(1):
+            dashboard_groups('university', None)
+
+    def test_query_count_does_not_grow_with_data(self):
+        self.assert_sections_queries()
+        for _ in range(3):
+            self.add_group()
+        self.assert_sections_queries()
+
+
+class ConcurrentReviewTests(TransactionTestCase):
+    """
+    Параллельные подтверждения и отклонения нескольких сотен документов нескольких студентов:
+    каждый переход статуса срабатывает ровно один раз, баллы студентов, журнал баллов,
+    сводка и распределение баллов сходятся.
+
+    TransactionTestCase - проверки из разных потоков идут в своих соединениях и фиксируются по-настоящему.
+    """
+    STUDENTS = 4
+    DOCUMENTS = 400
+    DUPLICATES = 2
+    WORKERS = 8
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create(username='moderator')
+        self.students = [
+            Student.objects.create(full_name=f'Студент модерации {i}', phone='-') for i in range(self.STUDENTS)
+        ]
+        update_rollups(added=student_rows([student.id for student in self.students]))
+        self.documents = Document.objects.bulk_create([
+            Document(
+                student=random.choice(self.students), category=random.choice(LEADERBOARD_CATEGORIES),
+                achievement=f'Документ {i}', score=random.randint(1, 10),
+            )
+            for i in range(self.DOCUMENTS)
+        ])
+
+    def review_concurrently(self, action, documents) -> int:
+        """
+        Проверяет каждый документ DUPLICATES раз параллельно. Возвращает число срабатываний перехода статуса.
+        """
+        ids = [document.id for document in documents] * self.DUPLICATES
+        random.shuffle(ids)
+
+        def review(document_id):
+            try:
+                return review_document(document_id, self.user, action, 'Параллельная проверка') is not None
+            except ReviewConflict:
+                return False
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+            return sum(pool.map(review, ids))
+
+    def assert_scores(self, expected):
+        """
+        Сверяет с expected ({student_id: Counter({категория: баллы})}) баллы, журнал и сводку,
+        а места по инкрементальному распределению баллов - с местами после полной пересборки.
+        """
+        totals = Counter()
+        for student in self.students:
+            student.refresh_from_db()
+            want = {category: expected[student.id][category] for category in LEADERBOARD_CATEGORIES}
+            scores = {category: getattr(student, f'{category}_score') for category in LEADERBOARD_CATEGORIES}
+            self.assertEqual(scores, want)
+
+            ledger = dict(
+                ScoreEvent.objects.filter(student=student).values_list('category').annotate(total=Sum('delta'))
+            )
+            self.assertEqual({category: ledger.get(category, 0) for category in LEADERBOARD_CATEGORIES}, want)
+            totals.update(want)
+
+        self.assertEqual(
+            rollup_stats('university', UNIVERSITY_KEY)['category_totals'],
+            {category: totals[category] for category in LEADERBOARD_CATEGORIES},
+        )
+        ranks = {student.id: get_student_ranks(Student.objects.get(pk=student.pk)) for student in self.students}
+        rebuild_rollups()
+        self.assertEqual(
+            {student.id: get_student_ranks(Student.objects.get(pk=student.pk)) for student in self.students}, ranks,
+        )
+
+    def test_each_review_applies_once(self):
+        expected = defaultdict(Counter)
+        for document in self.documents:
+            expected[document.student_id][document.category] += document.score
+        self.assertEqual(self.review_concurrently('approve', self.documents), self.DOCUMENTS)
+        self.assert_scores(expected)
+
+        rejected = self.documents[::2]
+        for document in rejected:
+            expected[document.student_id][document.category] -= document.score
+        self.assertEqual(self.review_concurrently('reject', rejected), len(rejected))
+        self.assert_scores(expected)
+
+
+class ReviewTasksTests(TestCase):
+    """
+    Работа после проверки документов ставится в очередь вместе с ней: серия проверок - одна
+    задача на каждую версию данных, версии увеличивает обработчик очереди.
+    """
+
+    def setUp(self):
+        self.user = get_user_model().objects.create(username='moderator')
+        student = Student.objects.create(full_name='Студент очереди', phone='-')
+        update_rollups(added=student_rows([student.id]))
+        self.documents = Document.objects.bulk_create([
+            Document(student=student, category='sport', achievement=f'Документ {i}', score=2) for i in range(3)
+        ])
+
+    def test_reviews_enqueue_keyed_version_bumps(self):
+        versions = DataVersion.get_many(RATING_DATA, DOCUMENTS_DATA)
+        for document in self.documents:
+            review_document(document.id, self.user, 'approve')
+
+        self.assertCountEqual(
+            Job.objects.values_list('name', 'payload'),
+            [
+                (BUMP_DATA_VERSION, {'name': RATING_DATA}),
+                (BUMP_DATA_VERSION, {'name': DOCUMENTS_DATA}),
+                (BUILD_SCHOLARSHIP_EXPORT, {}),
+            ],
+        )
+        self.assertEqual(DataVersion.get_many(RATING_DATA, DOCUMENTS_DATA), versions)
+
+        for job in claim_jobs(count=10):
+            run_job(job)
+        bumped = DataVersion.get_many(RATING_DATA, DOCUMENTS_DATA)
+        self.assertTrue(all(bumped[name] == versions[name] + 1 for name in versions))
+        self.assertEqual(list(Job.objects.values_list('name', flat=True)), [BUILD_SCHOLARSHIP_EXPORT])
+
+
+class RebuildScoresTests(TestCase):
+    """
+    Пересборка баллов из журнала исправляет расхождения вместе со сводкой баллов и версией рейтинга.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.student = Student.objects.create(full_name='Студент журнала', phone='-')
+        update_rollups(added=student_rows([self.student.id]))
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_score_events([ScoreEvent(student=self.student, category='sport', delta=8, kind='adjusted')])
+
+    def test_drift_is_fixed_with_rollups(self):
+        Student.objects.filter(pk=self.student.pk).update(sport_score=3, social_score=4)
+        version = DataVersion.get(RATING_DATA)
+
+        drift = rebuild_scores()
+
+        self.assertCountEqual(
+            [(item['category'], item['stored'], item['ledger']) for item in drift],
+            [('sport', 3, 8), ('social', 4, 0)],
+        )
+        self.student.refresh_from_db()
+        self.assertEqual((self.student.sport_score, self.student.social_score), (8, 0))
+        totals = rollup_stats('university', UNIVERSITY_KEY)['category_totals']
+        self.assertEqual((totals['sport'], totals['social']), (8, 0))
+        self.assertGreater(DataVersion.get(RATING_DATA), version)
+        self.assertEqual(rebuild_scores(dry_run=True), [])
+
+
+class RatingExportMemoryTests(TestCase):
+    """
+    Потоковая выгрузка рейтинга: пик памяти не растёт с количеством студентов
+    (замер для больших объёмов - команда bench_rating_export).
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def _add_students(self, count):
+        start = Student.objects.count()
+        Student.objects.bulk_create(
+            [Student(full_name=f'Выгрузка {start + i}', phone='-', academic_score=i % 97) for i in range(count)],
+            batch_size=5000,
+        )
+
+    def _export_peak(self) -> tuple[int, int]:
+        params = parse_rating_params({})
+        tracemalloc.start()
+        lines = sum(chunk.count(b'\n') for chunk in stream_rating_export(params, 'ndjson'))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return lines, peak
+
+    def test_peak_memory_does_not_grow_with_students(self):
+        self._add_students(2000)
+        small_lines, small_peak = self._export_peak()
+        self._add_students(18000)
+        large_lines, large_peak = self._export_peak()
+
+        self.assertEqual((small_lines, large_lines), (2000, 20000))
+        # Вдесятеро больше студентов - пик в пределах одной-двух пачек курсора, а не вдесятеро больше
+        self.assertLess(large_peak, small_peak * 2)
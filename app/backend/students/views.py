@@ -4,10 +4,15 @@ from rest_framework.decorators import api_view
 from rest_framework.authentication import SessionAuthentication
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.decorators import authentication_classes, permission_classes
-from students.serializers import DocumentSerializer, StudentProfileSerializer
+from django.db.models import Prefetch, prefetch_related_objects
 
+from students.serializers import DOCUMENT_SERIALIZER_FIELDS, DocumentSerializer, StudentProfileSerializer
+
+from main.http import precompressed_json_response, serialize_json
 from students.models import Document, Student
-from .scoring import calculate_achievement_score, get_scoring_structure, get_choices_from_config
+from students.ranks import get_student_ranks
+from students.services import documents_changed
+from .scoring import calculate_achievement_score, get_choice_labels, get_scoring_structure, get_choices_from_config, scoring_rules
 
 import json, uuid
 from supabase import create_client, Client
@@ -20,17 +25,24 @@ supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 @authentication_classes([SessionAuthentication])
 @permission_classes([IsAuthenticated])
 def get_student_radar_data(student):
-    """Динамическое формирование данных радара из конфига"""
-    categories = get_choices_from_config('categories')
+    """Динамическое формирование данных радара из конфига (метки закэшированы на версию правил)"""
+    categories = get_choice_labels('categories')
     labels = []
     values = []
     
-    for key, label in categories:
+    for key, label in categories.items():
         labels.append(label)
         values.append(getattr(student, f"{key}_score", 0))
         
     return {"labels": labels, "data": values}
 
+def student_profile_queryset():
+    """
+    Queryset студентов для get_student_full_profile: пользователь, группа и факультет
+    загружаются тем же запросом, что и сам студент.
+    """
+    return Student.objects.select_related('user', 'group', 'faculty')
+
 @authentication_classes([SessionAuthentication])
 @permission_classes([IsAuthenticated])
 def get_student_full_profile(student, request, is_own_profile):
@@ -56,21 +68,42 @@ def get_student_full_profile(student, request, is_own_profile):
                 * Спорт - sport_score
                 * Творческая - cultural_score
                 * Научная - research_score
+            - Поле "ranks" с местами студента в рейтинге (общем и по направлениям)
+              в университете, на факультете, курсе и в группе (см. get_student_ranks).
 
     Особенности:
         - Доступ к функции разрешён только аутентифицированным пользователям (IsAuthenticated).
         - Используется сессионная аутентификация (SessionAuthentication).
+        - Число запросов не зависит от количества документов: студент с пользователем, группой
+          и факультетом загружается одним запросом (student_profile_queryset), документы - ещё одним,
+          места в рейтинге - ещё одним (см. get_student_ranks), роли пользователя берутся из request.user.roles.
     """
+    prefetch_related_objects(
+        [student],
+        Prefetch('student_documents', queryset=Document.objects.only(*DOCUMENT_SERIALIZER_FIELDS)),
+    )
     serializer = StudentProfileSerializer(student, context={'request': request, 'is_own_profile': is_own_profile})
     data = serializer.data
     data["radar_stats"] = get_student_radar_data(student)
+    data["ranks"] = get_student_ranks(student)
     
-    if is_own_profile or request.user.groups.filter(name__in=['Department', 'Dean', 'Rectorate']).exists():
-        data["email"] = student.user.email
+    if is_own_profile or request.user.is_university_staff:
+        data["email"] = student.user.email if student.user else None
         data["phone"] = getattr(student, 'phone', None)
         
     return data
 
+def build_achievement_config() -> dict:
+    """
+    Собирает данные формы добавления достижения из текущих правил (см. get_achievement_config).
+    """
+    return {
+        "structure": get_scoring_structure(),
+        "levels": [{"value": v, "label": l} for v, l in get_choices_from_config('metadata.levels') if v != 'none'],
+        "results": [{"value": v, "label": l} for v, l in get_choices_from_config('metadata.results') if v != 'none'],
+        "doc_types": [{"value": v, "label": l} for v, l in get_choices_from_config('metadata.doc_types')]
+    }
+
 @api_view(['GET'])
 @authentication_classes([SessionAuthentication])
 @permission_classes([IsAuthenticated])
@@ -135,15 +168,16 @@ def get_achievement_config(request) -> Response:
     Примечание:
         Значения 'none' исключаются из списков уровней и результатов,
         т.к они используются как заглушки в модели, но не предназначены для выбора пользователями.
+
+    Кэширование:
+        Ответ собирается и сериализуется (в том числе в gzip) один раз на версию правил
+        и сбрасывается автоматически при изменении scoring_config.json. Ответ отдаётся
+        со строгим ETag (версия правил) и Cache-Control: private, no-cache, поэтому браузер
+        перепроверяет его условным запросом и получает 304 Not Modified, если конфиг не менялся.
     """
 
-    data = {
-        "structure": get_scoring_structure(),
-        "levels": [{"value": v, "label": l} for v, l in get_choices_from_config('metadata.levels') if v != 'none'],
-        "results": [{"value": v, "label": l} for v, l in get_choices_from_config('metadata.results') if v != 'none'],
-        "doc_types": [{"value": v, "label": l} for v, l in get_choices_from_config('metadata.doc_types')]
-    }
-    return Response(data)
+    body, gzip_body = scoring_rules.memoize('achievement_config', lambda: serialize_json(build_achievement_config()))
+    return precompressed_json_response(request, body, gzip_body, etag=scoring_rules.version)
 
 # пока уберу
 @api_view(['POST'])
@@ -185,6 +219,8 @@ def upload_achievement(request):
         - Для каждого файла генерируется уникальное имя на основе UUID для избежания коллизий.
         - При ошибке загрузки любого из файлов возвращается ошибка, и дальнейшая обработка прерывается.
         - CSRF отключён, так как предполагается использование API без сессий.
+        - Дальнейшая работа (версия данных документов для ETag списков сотрудников) ставится
+          в фоновую очередь (documents_changed), ответ её не ждёт.
 
     Пример успешного ответа:
         HTTP 201 Created
@@ -255,4 +291,5 @@ def upload_achievement(request):
         except Exception as e:
             return Response({'error': f'{str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
+        documents_changed([student.id])
         return Response(status=status.HTTP_201_CREATED)
\ No newline at end of file
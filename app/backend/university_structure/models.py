@@ -1,6 +1,9 @@
 from django.db import models
 from django.conf import settings
 
+# Имя счётчика DataVersion, который увеличивается при изменении факультетов, кафедр и групп
+STRUCTURE_DATA = 'structure'
+
 class Faculty(models.Model):
     name = models.CharField("Название факультета", max_length=255, unique=True)
     short_name = models.CharField("Сокращение", max_length=20, unique=True)
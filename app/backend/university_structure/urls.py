@@ -5,4 +5,7 @@ app_name = 'university_structure'
 
 urlpatterns = [
     path('api/v1/document/<int:doc_id>/review/', views.ReviewDocumentAPIView.as_view()),
+    path('api/v1/documents/review/', views.BulkReviewDocumentsAPIView.as_view()),
+    path('api/v1/moderation/claim/', views.ModerationClaimAPIView.as_view()),
+    path('api/v1/moderation/release/', views.ModerationReleaseAPIView.as_view()),
 ]
\ No newline at end of file
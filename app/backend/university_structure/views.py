@@ -7,12 +7,38 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, serializers
 
-from django.shortcuts import get_object_or_404
+from django.http import Http404
 
 from university_structure.models import Faculty, Group
 from students.models import Document, Student
+from students.moderation import (
+    REVIEW_CONFLICT, REVIEW_NOT_FOUND, REVIEW_TRANSITIONS, REVIEW_UNCHANGED, ReviewConflict, claim_documents,
+    parse_claim_params, parse_review_ids, release_documents, review_document, review_documents,
+)
+from students.serializers import PendingDocumentSerializer
 
 
+def review_reason(data, action) -> str | None:
+    """
+    Собирает причину отклонения из параметра reasons (список или строка); для подтверждения - None.
+    """
+    if action != 'reject':
+        return None
+    reasons = data.get('reasons', [])
+    return "; ".join(reasons) if isinstance(reasons, list) else str(reasons)
+
+def review_message(action, previous) -> str:
+    """
+    Текст результата проверки документа по действию и исходному статусу (None - статус не изменился).
+    """
+    if action == 'approve':
+        return "Документ уже подтвержден" if previous is None else "Документ подтвержден, баллы начислены"
+    if previous is None:
+        return "Документ уже отклонен"
+    if previous == 'approved':
+        return "Документ отклонен, начисленные баллы списаны"
+    return "Документ отклонен"
+
 
 class ReviewDocumentAPIView(APIView):
     """
@@ -43,6 +69,7 @@ class ReviewDocumentAPIView(APIView):
                 400: OpenApiTypes.OBJECT,
                 403: OpenApiTypes.OBJECT,
                 404: OpenApiTypes.OBJECT,
+                409: OpenApiTypes.OBJECT,
             },
             examples=[
                 OpenApiExample(
@@ -81,16 +108,20 @@ class ReviewDocumentAPIView(APIView):
                 - 403 Forbidden: Пользователь не является преподавателем.
                 - 400 Bad Request: Передано неверное или неизвестное действие.
                 - 404 Not Found: Документ с таким ID не найден.
+                - 409 Conflict: Документ арендован другим модератором (см. ModerationClaimAPIView)
+                  или его статус не допускает действия.
 
         Логика:
             - Проверяется, что текущий пользователь - преподаватель.
             - Находится документ по doc_id.
-            - При подтверждении:
+            - При подтверждении (из 'pending' или 'rejected'):
                 * Статус меняется на 'approved'.
                 * Баллы из документа добавляются к соответствующему полю студента (учебные, научные и т.д.).
-            - При отклонении:
+            - При отклонении (из 'pending' или 'approved'):
                 * Статус меняется на 'rejected'.
                 * Указанные причины сохраняются в rejection_reason.
+                * Если документ был подтверждён, его баллы списываются.
+            - Переход статуса и изменение баллов выполняются одной транзакцией (см. review_document).
 
         Пример тела запроса для подтверждения:
             {"action": "approve"}
@@ -101,35 +132,187 @@ class ReviewDocumentAPIView(APIView):
         Особенности:
             - Используется сессионная аутентификация и проверка прав доступа.
             - Начисление баллов происходит строго по категории документа.
-            - Повторное подтверждение уже подтверждённого документа игнорируется.
+            - Повторное подтверждение уже подтверждённого документа игнорируется: из одновременных
+              подтверждений одного документа баллы начисляет ровно одно.
+            - После проверки аренда документа снимается.
         """
         
-        if not request.user.groups.filter(name='Department').exists():
+        if not request.user.is_dept_staff:
             return Response({"error": "Нет прав модерации"}, status=status.HTTP_403_FORBIDDEN)
 
-        doc = get_object_or_404(Document, id=doc_id)
         action = request.data.get('action')
-        
-        if action == 'approve':
-            doc.status = 'approved'
-            doc.save()
-            
-            student = doc.student
-            field_name = f"{doc.category}_score"
-            if hasattr(student, field_name):
-                setattr(student, field_name, getattr(student, field_name) + doc.score)
-                student.save()
-            
-            return Response({"message": "Документ подтвержден, баллы начислены"}, status=status.HTTP_200_OK)
-
-        elif action == 'reject':
-            reasons = request.data.get('reasons', [])
-            reason_text = "; ".join(reasons) if isinstance(reasons, list) else str(reasons)
-            
-            doc.status = 'rejected'
-            doc.rejection_reason = reason_text
-            doc.save()
-            
-            return Response({"message": "Документ отклонен"}, status=status.HTTP_200_OK)
-
-        return Response({"error": "Неверное действие"}, status=status.HTTP_400_BAD_REQUEST)
+        if action not in REVIEW_TRANSITIONS:
+            return Response({"error": "Неверное действие"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            previous = review_document(doc_id, request.user, action, review_reason(request.data, action))
+        except Document.DoesNotExist:
+            raise Http404
+        except ReviewConflict as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+
+        return Response({"message": review_message(action, previous)}, status=status.HTTP_200_OK)
+
+
+class BulkReviewDocumentsAPIView(APIView):
+    """
+    API-представление для массовой модерации: подтверждение или отклонение многих документов одним запросом.
+
+    Нужно, например, после олимпиады, когда на проверку приходят сотни одинаковых дипломов.
+    Все документы обрабатываются одной транзакцией (см. review_documents), результат
+    возвращается для каждого документа отдельно.
+    """
+    authentication_classes = [SessionAuthentication]
+    permission_classes = [IsAuthenticated]
+    @extend_schema(
+            summary="Массовая модерация документов",
+            request=inline_serializer(
+                name='BulkReviewDocumentsRequest',
+                fields={
+                    'ids': serializers.ListField(child=serializers.IntegerField(), help_text="id документов (не больше 500)"),
+                    'action': serializers.ChoiceField(choices=['approve', 'reject']),
+                    'reasons': serializers.ListField(
+                        child=serializers.CharField(),
+                        required=False,
+                        help_text="Список причин при отклонении (общий для всех документов)"
+                    ),
+                }
+            ),
+            responses={200: OpenApiTypes.OBJECT, 400: OpenApiTypes.OBJECT, 403: OpenApiTypes.OBJECT},
+            examples=[
+                OpenApiExample(
+                    "Успешный ответ (approve)",
+                    value={
+                        "updated": 1,
+                        "results": [
+                            {"id": 12, "result": "ok", "message": "Документ подтвержден, баллы начислены"},
+                            {"id": 13, "result": "conflict", "message": "Документ проверяет другой модератор или его статус не допускает действия"},
+                        ],
+                    },
+                    response_only=True,
+                )
+            ]
+        )
+    def post(self, request):
+        """
+        Подтверждает или отклоняет документы ids с теми же правилами, что и ReviewDocumentAPIView.
+
+        Результат документа (result):
+            - 'ok': статус изменён (баллы начислены или списаны).
+            - 'unchanged': документ уже в итоговом статусе.
+            - 'not_found': документа нет.
+            - 'conflict': документ арендован другим модератором или его статус не допускает действия.
+
+        Возвращает:
+            Response: {"updated": количество изменённых документов, "results": [{"id", "result", "message"}]}
+        """
+        if not request.user.is_dept_staff:
+            return Response({"error": "Нет прав модерации"}, status=status.HTTP_403_FORBIDDEN)
+
+        action = request.data.get('action')
+        if action not in REVIEW_TRANSITIONS:
+            return Response({"error": "Неверное действие"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            ids = parse_review_ids(request.data)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        outcomes = review_documents(ids, request.user, action, review_reason(request.data, action))
+
+        results = []
+        for document_id, outcome in outcomes.items():
+            if outcome == REVIEW_NOT_FOUND:
+                result, message = 'not_found', "Документ не найден"
+            elif outcome == REVIEW_CONFLICT:
+                result, message = 'conflict', "Документ проверяет другой модератор или его статус не допускает действия"
+            elif outcome == REVIEW_UNCHANGED:
+                result, message = 'unchanged', review_message(action, None)
+            else:
+                result, message = 'ok', review_message(action, outcome)
+            results.append({"id": document_id, "result": result, "message": message})
+
+        return Response({
+            "updated": sum(item["result"] == 'ok' for item in results),
+            "results": results,
+        }, status=status.HTTP_200_OK)
+
+
+class ModerationClaimAPIView(APIView):
+    """
+    API-представление очереди модерации кафедры: выдача документов модератору в аренду.
+
+    Несколько модераторов кафедры могут разбирать очередь одновременно: каждый получает
+    свои документы (SELECT ... FOR UPDATE SKIP LOCKED), и пока срок аренды не истёк,
+    документ не выдаётся другим и не может быть ими проверен.
+    """
+    authentication_classes = [SessionAuthentication]
+    permission_classes = [IsAuthenticated]
+    @extend_schema(
+            summary="Взять документы из очереди модерации",
+            request=inline_serializer(
+                name='ModerationClaimRequest',
+                fields={
+                    'count': serializers.IntegerField(required=False, help_text="Сколько документов взять (по умолчанию 10, максимум 50)"),
+                    'lease_seconds': serializers.IntegerField(required=False, help_text="Срок аренды в секундах (по умолчанию 900, максимум 7200)"),
+                }
+            ),
+            responses={200: OpenApiTypes.OBJECT, 400: OpenApiTypes.OBJECT, 403: OpenApiTypes.OBJECT},
+        )
+    def post(self, request):
+        """
+        Выдаёт модератору до count документов кафедры в статусе 'pending' в порядке загрузки.
+
+        Уже арендованные модератором документы входят в выдачу, и их аренда продлевается,
+        поэтому повторный запрос безопасен.
+
+        Возвращает:
+            Response: {"results": [документы], "claimed_until": "..."}
+        """
+        staff = getattr(request.user, 'staff_profile', None)
+        if not request.user.is_dept_staff or staff is None or staff.department_id is None:
+            return Response({"error": "Нет прав модерации"}, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            params = parse_claim_params(request.data)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        ids, claimed_until = claim_documents(request.user, staff.department_id, params['count'], params['lease_seconds'])
+        documents = PendingDocumentSerializer.setup_eager_loading(
+            Document.objects.filter(id__in=ids)
+        ).order_by('uploaded_at', 'id')
+
+        return Response({
+            "results": PendingDocumentSerializer(documents, many=True).data,
+            "claimed_until": claimed_until if ids else None,
+        }, status=status.HTTP_200_OK)
+
+class ModerationReleaseAPIView(APIView):
+    """
+    API-представление для возврата арендованных документов в очередь модерации.
+    """
+    authentication_classes = [SessionAuthentication]
+    permission_classes = [IsAuthenticated]
+    @extend_schema(
+            summary="Вернуть документы в очередь модерации",
+            request=inline_serializer(
+                name='ModerationReleaseRequest',
+                fields={
+                    'ids': serializers.ListField(child=serializers.IntegerField(), required=False, help_text="id документов; без параметра - все арендованные"),
+                }
+            ),
+            responses={200: OpenApiTypes.OBJECT, 400: OpenApiTypes.OBJECT},
+        )
+    def post(self, request):
+        """
+        Снимает аренду пользователя с документов ids (или со всех его документов).
+
+        Возвращает:
+            Response: {"released": количество}
+        """
+        ids = request.data.get('ids')
+        if ids is not None:
+            if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+                return Response({"error": "Параметр ids должен быть списком целых чисел"}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({"released": release_documents(request.user, ids)}, status=status.HTTP_200_OK)
@@ -1,22 +1,71 @@
 from django import forms
 from django.contrib import admin, messages
-from django.db import transaction
+from django.db import IntegrityError, transaction
+from django.utils import timezone
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import Group as DjangoGroup
 from django.urls import path
 from django.shortcuts import render, redirect
 
-from university_structure.models import Faculty, Department, Group, Staff
-from students.models import Student
+from university_structure.models import Faculty, Department, Group, Staff, STRUCTURE_DATA
+from students.models import ScoreEvent, Student
+from students.ranks import METRIC_FIELDS
+from students.rollups import rebuild_rollups, student_rows, update_rollups
+from students.rating import RATING_DATA
+from students.services import apply_score_events, sync_document_departments, touch_students
+from main.models import DataVersion, Job
 from .models import User
 
 import json
 
+# Показатель → поле баллов студента, которое правится в админке (общий балл вычисляется БД)
+SCORE_FIELDS = {metric: field for metric, field in METRIC_FIELDS.items() if metric != 'total'}
 
 
 class JsonImportForm(forms.Form):
     json_file = forms.FileField(label="Выберите json-файл")
 
+class DataVersionAdminMixin:
+    """
+    Увеличивает версии данных (DataVersion) при изменении объектов в админке.
+
+    Снимки и ETag ответов, собранных из этих данных (рейтинг, список групп и т.п.),
+    после этого перестают использоваться. Набор версий задаётся атрибутом data_versions.
+    """
+    data_versions = (RATING_DATA,)
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        DataVersion.bump(*self.data_versions)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        DataVersion.bump(*self.data_versions)
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        DataVersion.bump(*self.data_versions)
+
+class ScoreRollupAdminMixin:
+    """
+    Пересобирает сводку и распределение баллов (ScoreRollup, ScoreCount) после удаления объектов структуры вуза
+    (вместе с ними каскадно удаляются студенты) и после изменения полей rollup_fields.
+    """
+    rollup_fields = ()
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change and set(form.changed_data) & set(self.rollup_fields):
+            rebuild_rollups()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        rebuild_rollups()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        rebuild_rollups()
+
 @admin.register(User)
 class CustomUserAdmin(UserAdmin):
     list_display = ('username', 'first_name', 'last_name', 'is_staff')
@@ -29,6 +78,11 @@ class CustomUserAdmin(UserAdmin):
         ]
         return custom_urls + urls
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # Email пользователя отображается в профиле студента
+        touch_students(Student.objects.filter(user=obj).values_list('id', flat=True))
+
     def import_json(self, request):
         if request.method == "POST":
             form = JsonImportForm(request.POST, request.FILES)
@@ -151,18 +205,25 @@ class CustomUserAdmin(UserAdmin):
                     }
                 )
 
+            rebuild_rollups()
+            DataVersion.bump(RATING_DATA, STRUCTURE_DATA)
+
 @admin.register(Faculty)
-class FacultyAdmin(admin.ModelAdmin):
+class FacultyAdmin(ScoreRollupAdminMixin, DataVersionAdminMixin, admin.ModelAdmin):
+    data_versions = (RATING_DATA, STRUCTURE_DATA)
     list_display = ('short_name', 'name')
     search_fields = ('short_name', 'name')
 
 @admin.register(Department)
-class DepartmentAdmin(admin.ModelAdmin):
+class DepartmentAdmin(ScoreRollupAdminMixin, DataVersionAdminMixin, admin.ModelAdmin):
+    data_versions = (STRUCTURE_DATA,)
     list_display = ('short_name', 'name', 'faculty')
     list_filter = ('faculty',)
 
 @admin.register(Group)
-class GroupAdmin(admin.ModelAdmin):
+class GroupAdmin(ScoreRollupAdminMixin, DataVersionAdminMixin, admin.ModelAdmin):
+    data_versions = (RATING_DATA, STRUCTURE_DATA)
+    rollup_fields = ('course',)
     list_display = ('name', 'get_faculty', 'get_department', 'course')
     list_filter = ('department__faculty', 'course')
     search_fields = ('name',)
@@ -176,12 +237,52 @@ class GroupAdmin(admin.ModelAdmin):
     get_department.short_description = "Кафедра"
 
 @admin.register(Student)
-class StudentAdmin(admin.ModelAdmin):
+class StudentAdmin(DataVersionAdminMixin, admin.ModelAdmin):
     list_display = ('full_name', 'group', 'academic_score', 'total_score')
     list_filter = ('group__department__faculty', 'group__course') 
     search_fields = ('full_name', 'record_book')
     readonly_fields = ('created_at',)
 
+    def save_model(self, request, obj, form, change):
+        """
+        Сохраняет студента; баллы из формы проводятся через журнал баллов.
+
+        Строка студента записывается с прежними баллами (она заблокирована до конца транзакции,
+        поэтому одновременное подтверждение документа не теряется), а разница с формой
+        применяется событиями 'adjusted' через apply_score_events - вместе со сводкой баллов,
+        версией рейтинга и фоновыми задачами. Перевод в другую группу, кафедру или факультет
+        переносится в сводку и распределение баллов для мест отдельно (update_rollups).
+        """
+        with transaction.atomic():
+            if change:
+                list(Student.objects.select_for_update().filter(pk=obj.pk).values_list('pk', flat=True))
+            before = student_rows([obj.pk]) if change else []
+            current = before[0] if before else {}
+            deltas = {metric: getattr(obj, field) - current.get(field, 0) for metric, field in SCORE_FIELDS.items()}
+            for field in SCORE_FIELDS.values():
+                setattr(obj, field, current.get(field, 0))
+
+            super().save_model(request, obj, form, change)
+            update_rollups(removed=before, added=student_rows([obj.pk]))
+            apply_score_events([
+                ScoreEvent(student_id=obj.pk, category=metric, delta=delta, kind='adjusted', created_by=request.user)
+                for metric, delta in deltas.items() if delta
+            ])
+            if change and 'department' in form.changed_data:
+                sync_document_departments([obj.pk])
+            touch_students([obj.pk])
+        obj.refresh_from_db(fields=[*SCORE_FIELDS.values(), 'total_score'])
+
+    def delete_model(self, request, obj):
+        before = student_rows([obj.pk])
+        super().delete_model(request, obj)
+        update_rollups(removed=before)
+
+    def delete_queryset(self, request, queryset):
+        before = student_rows(queryset.values_list('pk', flat=True))
+        super().delete_queryset(request, queryset)
+        update_rollups(removed=before)
+
 @admin.register(Staff)
 class StaffAdmin(admin.ModelAdmin):
     list_display = ('get_full_name', 'department', 'faculty')
@@ -190,4 +291,28 @@ class StaffAdmin(admin.ModelAdmin):
 
     def get_full_name(self, obj):
         return obj.user.get_full_username()
-    get_full_name.short_description = 'ФИО'
\ No newline at end of file
+    get_full_name.short_description = 'ФИО'
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'key', 'status', 'attempts', 'run_after', 'updated_at')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'key')
+    readonly_fields = ('attempts', 'locked_until', 'last_error', 'created_at', 'updated_at')
+    actions = ['retry_jobs']
+
+    @admin.action(description="Повторить выбранные задачи с ошибкой")
+    def retry_jobs(self, request, queryset):
+        """
+        Возвращает задачи со статусом 'failed' в очередь с обнулённым счётчиком попыток.
+        Задача не возвращается, если такая же с тем же ключом уже ожидает выполнения.
+        """
+        retried = 0
+        for job in queryset.filter(status='failed'):
+            try:
+                with transaction.atomic():
+                    Job.objects.filter(pk=job.pk).update(status='pending', attempts=0, run_after=timezone.now())
+                retried += 1
+            except IntegrityError:
+                pass
+        messages.success(request, f"Возвращено в очередь задач: {retried}")
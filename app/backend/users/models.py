@@ -1,24 +1,46 @@
+from functools import cached_property
+
 from django.db import models
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
 from django.contrib.auth.models import AbstractUser
 
+# Группы сотрудников вуза, которым доступны данные студентов (кафедра, деканат, ректорат)
+STAFF_ROLES = frozenset({'Department', 'Dean', 'Rectorate'})
+
 class User(AbstractUser):
     patronymic = models.CharField("Отчество", max_length=150, blank=True)
 
+    @cached_property
+    def roles(self) -> frozenset:
+        """
+        Названия групп пользователя, загруженные одним запросом.
+
+        Кэшируются на объекте пользователя, то есть на время обработки запроса:
+        все проверки ролей (is_student, is_dean и т.д.) используют этот набор.
+        При изменении групп пользователя кэш сбрасывается (см. reset_user_roles).
+        """
+        return frozenset(self.groups.values_list('name', flat=True))
+
     @property
     def is_student(self):
-        return self.groups.filter(name='Student').exists()
+        return 'Student' in self.roles
 
     @property
     def is_dean(self):
-        return self.groups.filter(name='Dean').exists()
+        return 'Dean' in self.roles
 
     @property
     def is_dept_staff(self):
-        return self.groups.filter(name='Department').exists()
+        return 'Department' in self.roles
 
     @property
     def is_rectorate(self):
-        return self.groups.filter(name='Rectorate').exists()
+        return 'Rectorate' in self.roles
+
+    @property
+    def is_university_staff(self):
+        return not self.roles.isdisjoint(STAFF_ROLES)
 
     class Meta:
         verbose_name = "Пользователь"
@@ -32,3 +54,11 @@ class User(AbstractUser):
         if self.patronymic:
             full_name += f" {self.patronymic}"
         return full_name.strip()
+
+@receiver(m2m_changed, sender=User.groups.through)
+def reset_user_roles(sender, instance, **kwargs):
+    """
+    Сбрасывает закэшированные роли пользователя после изменения его групп (user.groups.add/remove/set).
+    """
+    if isinstance(instance, User):
+        instance.__dict__.pop('roles', None)
@@ -1,6 +1,10 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from main.models import DataVersion
 from students.models import Student
+from students.rating import RATING_DATA
+from students.rollups import student_rows, update_rollups
 
 User = get_user_model()
 
@@ -32,21 +36,26 @@ class StudentRegistrationSerializer(serializers.ModelSerializer):
         email = validated_data.pop('email')
         patronymic = validated_data.pop('patronymic', '')
         
-        user = User.objects.create_user(
-            username=email,
-            first_name=validated_data['first_name'],
-            last_name=validated_data['last_name'],
-            patronymic=patronymic,
-            email=email,
-            password=validated_data['password'],
-            is_student=True,
-            is_teacher=False
-        )
-        Student.objects.create(
-            user=user,
-            group=None,
-            record_book=None,
-            full_name=f"{user.last_name} {user.first_name} {patronymic}".strip()
-        )
+        # Пользователь, студент и его вклад в сводку и распределение баллов записываются вместе;
+        # новый студент меняет места и снимки рейтинга, поэтому после фиксации увеличивается версия рейтинга
+        with transaction.atomic():
+            user = User.objects.create_user(
+                username=email,
+                first_name=validated_data['first_name'],
+                last_name=validated_data['last_name'],
+                patronymic=patronymic,
+                email=email,
+                password=validated_data['password'],
+                is_student=True,
+                is_teacher=False
+            )
+            student = Student.objects.create(
+                user=user,
+                group=None,
+                record_book=None,
+                full_name=f"{user.last_name} {user.first_name} {patronymic}".strip()
+            )
+            update_rollups(added=student_rows([student.id]))
+            transaction.on_commit(lambda: DataVersion.bump(RATING_DATA))
         
         return user
\ No newline at end of file
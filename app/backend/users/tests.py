@@ -1,3 +1,155 @@
-from django.test import TestCase
+import json
+import shutil
+import tempfile
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group as DjangoGroup
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from main.models import DataVersion
+from students.export import export_cache_path
+from students.models import Document, Student
+from students.rating import RATING_DATA
+from students.rollups import UNIVERSITY_KEY, rollup_stats
+from university_structure.models import Department, Faculty, Group
+
+
+class RatingExportAccessTests(TestCase):
+    """
+    Полная выгрузка рейтинга доступна только сотрудникам вуза.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('user:api_student_rating_export')
+        Student.objects.bulk_create([Student(full_name=f'Студент {i}', phone='-', academic_score=i) for i in range(3)])
+
+    def _user(self, role):
+        user = get_user_model().objects.create_user(username=f'user-{role}', password='-')
+        user.groups.add(DjangoGroup.objects.get_or_create(name=role)[0])
+        return user
+
+    def test_anonymous_request_is_rejected(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_student_is_rejected(self):
+        self.client.force_login(self._user('Student'))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_staff_receives_every_student(self):
+        self.client.force_login(self._user('Dean'))
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode('utf-8').splitlines()]
+        self.assertEqual([row['academic_score'] for row in rows], [2, 1, 0])
+
+
+class ScholarshipExportCacheTests(TestCase):
+    """
+    Ведомость отдаётся из файла кэша, а если файл удалён очисткой устаревших версий - формируется заново.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        self.url = reverse('user:api_scholarship_export')
+        Student.objects.create(full_name='Студент ведомости', phone='-', academic_score=5)
+        user = get_user_model().objects.create_user(username='dean', password='-')
+        user.groups.add(DjangoGroup.objects.get_or_create(name='Dean')[0])
+        self.client.force_login(user)
+
+    def _download(self) -> bytes:
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def test_missing_cache_file_is_rebuilt(self):
+        with override_settings(EXPORT_CACHE_DIR=self.cache_dir):
+            first = self._download()
+            path = export_cache_path('scholarship', {'sort': 'total', 'faculty': None, 'course': None, 'group': None}, 'csv')
+            self.assertTrue(path.exists())
+            self.assertEqual(self._download(), first)
+
+            path.unlink()
+            self.assertEqual(self._download(), first)
+
+
+class ProfileQueryCountTests(TestCase):
+    """
+    Профиль студента собирается постоянным числом запросов, сколько бы ни было у него документов.
+    """
+
+    # Сессия, пользователь, его группы (роли), id и версия студента, версия рейтинга для ETag,
+    # студент с группой и факультетом, документы и места в рейтинге (get_student_ranks)
+    PROFILE_QUERIES = 8
+    # При совпадении ETag - только запросы до проверки
+    NOT_MODIFIED_QUERIES = 5
+
+    def setUp(self):
+        cache.clear()
+        faculty = Faculty.objects.create(name='Факультет тестов', short_name='ФТ')
+        department = Department.objects.create(name='Кафедра тестов', short_name='КТ', faculty=faculty)
+        group = Group.objects.create(name='Т-11', department=department, course=1)
+        self.user = self._user('student', 'Student')
+        self.student = Student.objects.create(
+            user=self.user, full_name='Студент профиля', phone='-', group=group,
+            department=department, faculty=faculty, academic_score=5,
+        )
+        self.add_documents(2)
+
+    def _user(self, username, role):
+        user = get_user_model().objects.create_user(username=username, password='-')
+        user.groups.add(DjangoGroup.objects.get_or_create(name=role)[0])
+        return user
+
+    def add_documents(self, count):
+        start = Document.objects.count()
+        Document.objects.bulk_create([
+            Document(student=self.student, category='academic', achievement=f'Достижение {start + i}')
+            for i in range(count)
+        ])
+
+    def assert_profile_queries(self, url, expected):
+        for documents in (2, 12):
+            cache.clear()
+            with self.assertNumQueries(expected):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()['documents']), documents)
+            self.add_documents(10)
+
+    def assert_not_modified_queries(self, url):
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(self.NOT_MODIFIED_QUERIES):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_own_profile(self):
+        self.client.force_login(self.user)
+        self.assert_profile_queries(reverse('user:api_profile'), self.PROFILE_QUERIES)
+        self.assert_not_modified_queries(reverse('user:api_profile'))
+
+    def test_student_profile_viewed_by_staff(self):
+        self.client.force_login(self._user('dean', 'Dean'))
+        url = reverse('user:api_student_profile_by_id', args=[self.student.id])
+        self.assert_profile_queries(url, self.PROFILE_QUERIES)
+        self.assert_not_modified_queries(url)
+
+
+class StudentRegistrationTests(TestCase):
+    """
+    Регистрация студента добавляет его в сводку баллов и после фиксации увеличивает версию рейтинга.
+    """
+
+    def test_registration_updates_rollups_and_rating_version(self):
+        version = DataVersion.get(RATING_DATA)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('user:api_register_student'), {
+                'first_name': 'Иван', 'last_name': 'Иванов', 'email': 'new@example.com', 'password': 'Пароль-123',
+            })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(rollup_stats('university', UNIVERSITY_KEY)['total_students'], 1)
+        self.assertGreater(DataVersion.get(RATING_DATA), version)
@@ -8,8 +8,16 @@ urlpatterns = [
     path('api/v1/login/', views.LoginAPIView.as_view(), name='api_login'),
     path('api/v1/logout/', views.LogoutAPIView.as_view(), name='api_logout'),
     path('api/v1/rating/', views.RatingAPIView.as_view(), name='api_student_rating'),
+    path('api/v1/rating/export/', views.RatingExportAPIView.as_view(), name='api_student_rating_export'),
+    path('api/v1/rating/scholarship/', views.ScholarshipExportAPIView.as_view(), name='api_scholarship_export'),
+    path('api/v1/leaderboard/', views.LeaderboardAPIView.as_view(), name='api_leaderboard'),
+    path('api/v1/analytics/', views.ScoreAnalyticsAPIView.as_view(), name='api_score_analytics'),
     path('api/v1/profile/', views.ProfileAPIView.as_view(), name='api_profile'),
     path('api/v1/profile/<int:student_id>/', views.PublicProfileAPIView.as_view(), name='api_student_profile_by_id'),
+    path('api/v1/staff/stats/', views.StaffStatsAPIView.as_view(), name='api_staff_stats'),
+    path('api/v1/staff/students/', views.StaffStudentsAPIView.as_view(), name='api_staff_students'),
+    path('api/v1/staff/documents/', views.StaffDocumentsAPIView.as_view(), name='api_staff_documents'),
+    path('api/v1/staff/groups/', views.StaffGroupsAPIView.as_view(), name='api_staff_groups'),
     path('api/v1/check-auth/', views.CheckAuthAPIView.as_view(), name='api_check_auth'),
     path('api/v1/groups/', views.GroupListView.as_view(), name='api_groups'),
 ]
\ No newline at end of file
@@ -1,23 +1,42 @@
+from abc import ABC, abstractmethod
+
 from drf_spectacular.utils import extend_schema, OpenApiExample, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
 
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
-from django.db.models import Avg, F, Count
+from django.db.models import F
+from django.http import FileResponse, StreamingHttpResponse
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.authentication import SessionAuthentication
-
-
-from students.views import get_student_full_profile
-from university_structure.models import Faculty, Group
-from students.models import Document, Student
+from rest_framework.throttling import ScopedRateThrottle
+
+
+from students.models import Student
+from students.views import get_student_full_profile, student_profile_queryset
+from students.rating import RATING_DATA, parse_rating_params, rating_snapshot, versioned_snapshot
+from students.scoring import scoring_rules
+from students.services import DOCUMENTS_DATA
+from students.analytics import ANALYTICS_GROUPINGS, parse_analytics_params, score_distribution
+from students.dashboard import (
+    dashboard_counts, dashboard_documents_page, dashboard_groups, dashboard_stats, dashboard_students_page,
+    parse_dashboard_params, scope_rollup, staff_scope,
+)
+from students.rollups import rollup_stats
+from students.leaderboard import LEADERBOARD_CATEGORIES, LEADERBOARD_PARTITIONS, leaderboards, parse_leaderboard_params
+from students.export import (
+    EXPORT_FORMATS, SPREADSHEET_FORMATS,
+    cache_export, export_cache_path, stream_rating_export, stream_scholarship_export,
+)
+from main.http import is_not_modified, make_etag, not_modified_response, precompressed_json_response, set_etag
+from main.models import DataVersion
+from university_structure.models import Faculty, Group, STRUCTURE_DATA
 from .serializers import StudentRegistrationSerializer
-from students.serializers import DocumentSerializer, StudentProfileSerializer, StudentRatingSerializer
 
 User = get_user_model()
 
@@ -151,16 +170,239 @@ class GroupListView(APIView):
     permission_classes = [AllowAny]
     authentication_classes = []
     def get(self, request):
-        groups = Group.objects.all().values('id', 'name', 'course', 'faculty')
-        return Response(list(groups))
+        etag = make_etag('groups', DataVersion.get(STRUCTURE_DATA))
+        if is_not_modified(request, etag):
+            return not_modified_response(request, etag, "public, no-cache")
+
+        groups = Group.objects.all().values('id', 'name', 'course', faculty=F('department__faculty'))
+        return set_etag(Response(list(groups)), etag, "public, no-cache")
 
 class RatingAPIView(APIView):
+    """
+    API-представление публичного рейтинга студентов.
+
+    Сортировка, фильтрация и постраничная выдача выполняются на стороне БД:
+    клиент получает только одну страницу рейтинга и курсор следующей.
+    """
     permission_classes = [AllowAny]
     authentication_classes = []
+    @extend_schema(
+            summary="Рейтинг студентов",
+            parameters=[
+                OpenApiParameter('sort', OpenApiTypes.STR, enum=['total', 'academic', 'research', 'sport', 'social', 'cultural'], description="Поле сортировки (по умолчанию total)"),
+                OpenApiParameter('direction', OpenApiTypes.STR, enum=['desc', 'asc'], description="Направление сортировки (по умолчанию desc)"),
+                OpenApiParameter('faculty', OpenApiTypes.INT, description="id факультета"),
+                OpenApiParameter('department', OpenApiTypes.INT, description="id кафедры"),
+                OpenApiParameter('course', OpenApiTypes.INT, description="Курс"),
+                OpenApiParameter('group', OpenApiTypes.INT, description="id группы"),
+                OpenApiParameter('q', OpenApiTypes.STR, description="Поиск по ФИО (с учётом опечаток), номеру зачётки или группе"),
+                OpenApiParameter('page_size', OpenApiTypes.INT, description="Размер страницы (по умолчанию 50, максимум 200)"),
+                OpenApiParameter('cursor', OpenApiTypes.STR, description="Курсор следующей страницы (next_cursor из предыдущего ответа)"),
+                OpenApiParameter('as_of', OpenApiTypes.DATE, description="Рейтинг на конец указанного дня (ГГГГ-ММ-ДД) по журналу баллов, без мест"),
+            ],
+            responses={200: OpenApiTypes.OBJECT, 400: OpenApiTypes.OBJECT},
+        )
+    def get(self, request):
+        """
+        Возвращает страницу рейтинга: {"results": [...], "next_cursor": "..."}.
+
+        next_cursor равен null на последней странице. При некорректных параметрах возвращается 400.
+        Ответ берётся из снимка рейтинга (см. rating_snapshot), который сбрасывается
+        при подтверждении документов и правках студентов. ETag - версия данных рейтинга,
+        поэтому на повторный запрос с If-None-Match до изменения данных возвращается 304.
+        """
+        try:
+            params = parse_rating_params(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        version = DataVersion.get(RATING_DATA)
+        etag = make_etag('rating', version)
+        if is_not_modified(request, etag):
+            return not_modified_response(request, etag, "public, no-cache")
+
+        body, gzip_body = rating_snapshot(params, version)
+        return precompressed_json_response(request, body, gzip_body, etag=etag, cache_control="public, no-cache")
+
+class LeaderboardAPIView(APIView):
+    """
+    API-представление лидербордов: лучшие студенты в каждой категории достижений.
+
+    Топ по всем категориям вычисляется одним запросом с ROW_NUMBER() в БД,
+    при необходимости - отдельно для каждого факультета или курса.
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    @extend_schema(
+            summary="Лидерборды по категориям",
+            parameters=[
+                OpenApiParameter('top', OpenApiTypes.INT, description="Количество студентов в каждом списке (по умолчанию 10, максимум 100)"),
+                OpenApiParameter('partition', OpenApiTypes.STR, enum=list(LEADERBOARD_PARTITIONS), description="Отдельные списки для каждого факультета или курса"),
+                OpenApiParameter('category', OpenApiTypes.STR, enum=LEADERBOARD_CATEGORIES, description="Только одна категория"),
+            ],
+            responses={200: OpenApiTypes.OBJECT, 400: OpenApiTypes.OBJECT},
+        )
+    def get(self, request):
+        """
+        Возвращает {"partition": ..., "top": K, "results": {категория: [{"key", "label", "students"}]}}.
+
+        Ответ кэшируется до следующего изменения данных рейтинга.
+        """
+        try:
+            params = parse_leaderboard_params(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        body, gzip_body = versioned_snapshot('leaderboard', params, lambda: leaderboards(params))
+        return precompressed_json_response(request, body, gzip_body, cache_control="public, no-cache")
+
+class ScoreAnalyticsAPIView(APIView):
+    """
+    API-представление аналитики баллов для деканатов: гистограммы, медианы и перцентили.
+
+    Распределения считаются агрегатами в БД (percentile_cont, width_bucket) по выбранному
+    разрезу - факультету, кафедре, курсу или группе, - поэтому клиенту не нужно загружать
+    всех студентов. Доступно только сотрудникам (группы 'Department', 'Dean', 'Rectorate').
+    """
+    authentication_classes = [SessionAuthentication]
+    permission_classes = [IsAuthenticated]
+    @extend_schema(
+            summary="Распределение баллов",
+            parameters=[
+                OpenApiParameter('metric', OpenApiTypes.STR, enum=['total', 'academic', 'research', 'sport', 'social', 'cultural'], description="Показатель (по умолчанию total)"),
+                OpenApiParameter('by', OpenApiTypes.STR, enum=list(ANALYTICS_GROUPINGS), description="Разрез (по умолчанию university)"),
+                OpenApiParameter('bins', OpenApiTypes.INT, description="Количество интервалов гистограммы (по умолчанию 10, максимум 50)"),
+                OpenApiParameter('faculty', OpenApiTypes.INT, description="id факультета"),
+                OpenApiParameter('course', OpenApiTypes.INT, description="Курс"),
+                OpenApiParameter('group', OpenApiTypes.INT, description="id группы"),
+            ],
+            responses={200: OpenApiTypes.OBJECT, 400: OpenApiTypes.OBJECT, 403: OpenApiTypes.OBJECT},
+        )
+    def get(self, request):
+        """
+        Возвращает статистику и гистограмму баллов для каждого значения разреза.
+
+        Ответ кэшируется до следующего изменения данных рейтинга.
+        """
+        if not request.user.is_university_staff:
+            return Response({"error": "Нет прав на просмотр аналитики"}, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            params = parse_analytics_params(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        body, gzip_body = versioned_snapshot('analytics', params, lambda: score_distribution(params))
+        return precompressed_json_response(request, body, gzip_body)
+
+class RatingExportAPIView(APIView):
+    """
+    API-представление для выгрузки полного рейтинга (например, для стипендиальной комиссии).
+
+    Ответ отдаётся потоково (StreamingHttpResponse): строки читаются из БД серверным курсором
+    и сразу кодируются, поэтому память процесса не растёт с количеством студентов.
+    Доступно только сотрудникам (группы 'Department', 'Dean', 'Rectorate'), не чаще 60 раз в час.
+    """
+    authentication_classes = [SessionAuthentication]
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = 'export'
+    @extend_schema(
+            summary="Выгрузка рейтинга студентов",
+            parameters=[
+                OpenApiParameter('output', OpenApiTypes.STR, enum=list(EXPORT_FORMATS), description="Формат: ndjson (по умолчанию) или json-массив"),
+                OpenApiParameter('sort', OpenApiTypes.STR, enum=['total', 'academic', 'research', 'sport', 'social', 'cultural'], description="Поле сортировки (по умолчанию total)"),
+                OpenApiParameter('direction', OpenApiTypes.STR, enum=['desc', 'asc'], description="Направление сортировки (по умолчанию desc)"),
+                OpenApiParameter('faculty', OpenApiTypes.INT, description="id факультета"),
+                OpenApiParameter('department', OpenApiTypes.INT, description="id кафедры"),
+                OpenApiParameter('course', OpenApiTypes.INT, description="Курс"),
+                OpenApiParameter('group', OpenApiTypes.INT, description="id группы"),
+                OpenApiParameter('q', OpenApiTypes.STR, description="Поиск по ФИО (с учётом опечаток), номеру зачётки или группе"),
+            ],
+            responses={200: OpenApiTypes.BINARY, 400: OpenApiTypes.OBJECT, 403: OpenApiTypes.OBJECT, 429: OpenApiTypes.OBJECT},
+        )
+    def get(self, request):
+        """
+        Возвращает весь рейтинг с учётом фильтров и сортировки, без пагинации.
+
+        Каждая строка содержит те же поля, что и страница рейтинга, включая место (rank).
+        При некорректных параметрах возвращается 400, не сотрудникам - 403.
+        """
+        if not request.user.is_university_staff:
+            return Response({"error": "Нет прав на выгрузку рейтинга"}, status=status.HTTP_403_FORBIDDEN)
+
+        export_format = request.query_params.get('output') or 'ndjson'
+        if export_format not in EXPORT_FORMATS:
+            return Response({"error": f"Неизвестный формат выгрузки: {export_format}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            params = parse_rating_params(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(
+            stream_rating_export(params, export_format),
+            content_type=EXPORT_FORMATS[export_format],
+        )
+        response['Content-Disposition'] = f'attachment; filename="rating.{export_format}"'
+        response['Cache-Control'] = 'no-store'
+        return response
+
+class ScholarshipExportAPIView(APIView):
+    """
+    API-представление для выгрузки стипендиальной ведомости в CSV или XLSX.
+
+    Ведомость - рейтинг по каждому факультету и курсу с баллами по всем категориям и количеством
+    подтверждённых документов. Файл формируется потоково одним SQL-запросом и одновременно
+    сохраняется на диск: повторные скачивания до изменения данных рейтинга отдают готовый файл.
+    Доступно только сотрудникам (группы 'Department', 'Dean', 'Rectorate'), не чаще 60 раз в час.
+    """
+    authentication_classes = [SessionAuthentication]
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = 'export'
+    @extend_schema(
+            summary="Стипендиальная ведомость (CSV/XLSX)",
+            parameters=[
+                OpenApiParameter('output', OpenApiTypes.STR, enum=list(SPREADSHEET_FORMATS), description="Формат: csv (по умолчанию) или xlsx"),
+                OpenApiParameter('sort', OpenApiTypes.STR, enum=['total', 'academic', 'research', 'sport', 'social', 'cultural'], description="Показатель, по которому определяется место (по умолчанию total)"),
+                OpenApiParameter('faculty', OpenApiTypes.INT, description="id факультета"),
+                OpenApiParameter('course', OpenApiTypes.INT, description="Курс"),
+                OpenApiParameter('group', OpenApiTypes.INT, description="id группы"),
+            ],
+            responses={200: OpenApiTypes.BINARY, 400: OpenApiTypes.OBJECT, 403: OpenApiTypes.OBJECT, 429: OpenApiTypes.OBJECT},
+        )
     def get(self, request):
-        students = Student.objects.select_related('group', 'faculty').all()
-        serializer = StudentRatingSerializer(students, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        if not request.user.is_university_staff:
+            return Response({"error": "Нет прав на выгрузку ведомости"}, status=status.HTTP_403_FORBIDDEN)
+
+        export_format = request.query_params.get('output') or 'csv'
+        if export_format not in SPREADSHEET_FORMATS:
+            return Response({"error": f"Неизвестный формат выгрузки: {export_format}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            params = parse_rating_params(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Курсор, размер страницы и направление на ведомость не влияют - не делим по ним кэш
+        params = {key: params[key] for key in ('sort', 'faculty', 'course', 'group')}
+        filename = f"scholarship.{export_format}"
+        path = export_cache_path('scholarship', params, export_format)
+
+        # Файл открывается без предварительной проверки exists(): между проверкой и открытием
+        # его может удалить очистка устаревших версий - тогда ведомость формируется заново
+        try:
+            response = FileResponse(open(path, 'rb'), as_attachment=True, filename=filename,
+                                    content_type=SPREADSHEET_FORMATS[export_format])
+        except FileNotFoundError:
+            response = StreamingHttpResponse(
+                cache_export(path, stream_scholarship_export(params, export_format)),
+                content_type=SPREADSHEET_FORMATS[export_format],
+            )
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response['Cache-Control'] = 'private, no-store'
+        return response
 
 class ProfileAPIView(APIView):
     """
@@ -170,8 +412,8 @@ class ProfileAPIView(APIView):
     
     В зависимости от роли пользователя возвращает соответствующий набор информации:
         - Для студента: личные данные, баллы, документы, статистику активности.
-        - Для сотрудника (кафедра, проректор, декан): статистику по подведомственным студентам, 
-        список ожидающих модерации документов и списки студентов с ограниченным объёмом данных.
+        - Для сотрудника (кафедра, проректор, декан): статистику по подведомственным студентам
+        и счётчики разделов кабинета (сами разделы загружаются отдельными запросами).
     """
     authentication_classes = [SessionAuthentication]
     permission_classes = [IsAuthenticated]
@@ -263,85 +505,12 @@ class ProfileAPIView(APIView):
                             "total_students": 11,
                             "avg_score": 0
                         },
-                        "students_list": [
-                            {
-                                "id": 1,
-                                "user_id": 5,
-                                "full_name": "Иванов Иван Иванович",
-                                "phone": "+7(999)444-55-66",
-                                "record_book": "23-01-5",
-                                "group": "ИВТ-301",
-                                "group_id": "1",
-                                "course": 3,
-                                "faculty": "ИЭИ",
-                                "academic_score": 0,
-                                "research_score": 0,
-                                "sport_score": 0,
-                                "social_score": 0,
-                                "cultural_score": 0,
-                                "total_score": 0,
-                                "documents": [
-                                    {
-                                        "id": 1,
-                                        "category": "academic",
-                                        "category_display": "Учебная",
-                                        "sub_type": "olympiad",
-                                        "sub_type_display": "Олимпиада / Конкурс",
-                                        "level": "university",
-                                        "level_display": "Вузовский",
-                                        "result": "1",
-                                        "result_display": "1 место / Победитель",
-                                        "achievement": "Победитель олимпиады по математике",
-                                        "rejection_reason": None,
-                                        "score": 3,
-                                        "status": "pending",
-                                        "doc_type": "certificate_of_participation",
-                                        "doc_type_display": "Свидетельство об участии",
-                                        "file_url": "https://wzmtxnmpqenmirlgdouy.supabase.co/storage/v1/object/public/achievement/23-01-5/4d4a5262-cdf2-472f-9b32-955150f4f179.pdf",
-                                        "original_file_name": "diplom2026.pdf",
-                                        "uploaded_at": "2026-02-18T15:37:42.544718Z"
-                                    }
-                                ]
-                            }],
-                            "pending_documents": [
-                                {
-                                    "id": 1,
-                                    "category": "academic",
-                                    "category_display": "Учебная",
-                                    "sub_type": "olympiad",
-                                    "sub_type_display": "Олимпиада / Конкурс",
-                                    "level": "university",
-                                    "level_display": "Вузовский",
-                                    "result": "1",
-                                    "result_display": "1 место / Победитель",
-                                    "achievement": "Победитель олимпиады по математике",
-                                    "rejection_reason": None,
-                                    "score": 3,
-                                    "status": "pending",
-                                    "doc_type": "certificate_of_participation",
-                                    "doc_type_display": "Свидетельство об участии",
-                                    "file_url": "https://wzmtxnmpqenmirlgdouy.supabase.co/storage/v1/object/public/achievement/23-01-5/4d4a5262-cdf2-472f-9b32-955150f4f179.pdf",
-                                    "original_file_name": "diplom2026.pdf",
-                                    "uploaded_at": "2026-02-18T15:37:42.544718Z",
-                                    "student_id": 1,
-                                    "student_name": "Иванов Иван Иванович",
-                                    "group_id": 1,
-                                    "record_book": "23-01-5"
-                                }
-                            ],
-                            "managed_groups": [
-                                {
-                                    "id": 1,
-                                    "name": "ИВТ-301",
-                                    "course": 3
-                                },
-                                {
-                                    "id": 2,
-                                    "name": "ПИ-201",
-                                    "course": 2
-                                }
-                            ]
-                        },
+                        "counts": {
+                            "students": 11,
+                            "pending_documents": 4,
+                            "groups": 2
+                        }
+                    },
                     response_only=True,
                 ),
             ]
@@ -353,7 +522,7 @@ class ProfileAPIView(APIView):
 
         Формирует детализированный ответ в зависимости от роли:
         - Студент: возвращает свои данные, баллы, документы и radar-статистику.
-        - Сотрудник: возвращает статистику, список студентов и ожидающих документов
+        - Сотрудник: возвращает статистику и счётчики студентов, ожидающих документов и групп
           в рамках своей зоны доступа (вуз, факультет, кафедра).
 
         Параметры:
@@ -363,12 +532,16 @@ class ProfileAPIView(APIView):
             Response: JSON-ответ с полями, зависящими от типа пользователя:
                 - Общие поля: id, full_name, email, роли, is_own_profile.
                 - Для студента: record_book, group, баллы, documents, radar_stats, type='student'.
-                - Для сотрудника: faculty, scope, department, stats, students_list, pending_documents,
-                  managed_groups, type='staff'.
+                - Для сотрудника: faculty, scope, department, stats, counts (студенты, документы
+                  на проверке, группы), type='staff'.
 
         Особенности:
             - Для сотрудников применяется фильтрация студентов по иерархии: ректорат → деканат → кафедра.
-            - Список студентов ограничен 200 записями для производительности.
+            - Списки студентов, документов и групп сотрудника отдаются отдельными разделами
+              (StaffStudentsAPIView, StaffDocumentsAPIView и др.) с пагинацией.
+            - ETag строится из версий данных (студента или документов, рейтинга и структуры вуза),
+              поэтому повторный запрос с If-None-Match получает 304 без загрузки и сериализации
+              профиля: до проверки читаются только id и версия данных студента.
         """
 
 
@@ -378,79 +551,54 @@ class ProfileAPIView(APIView):
             "id": user.id,
             "full_name": user.get_full_username(),
             "email": user.email,
-            "roles": list(user.groups.values_list('name', flat=True)),
+            "roles": sorted(user.roles),
             "is_own_profile": True
         }
 
+        # Для проверки ETag достаточно id и версии данных студента, полный профиль загружается только при промахе
+        student = Student.objects.filter(user=user).values('id', 'data_version').first() if user.is_student else None
+        staff = getattr(user, 'staff_profile', None) if not user.is_student else None
+        if student:
+            versions = (student['id'], student['data_version'], DataVersion.get(RATING_DATA))
+        elif staff:
+            versions = (staff.faculty_id, staff.department_id, DataVersion.get_many(RATING_DATA, DOCUMENTS_DATA, STRUCTURE_DATA))
+        else:
+            versions = ()
+        etag = make_etag('profile', response_data, scoring_rules.version, *versions)
+        if is_not_modified(request, etag):
+            return not_modified_response(request, etag)
+
         # Студент
         if user.is_student:
-            student = getattr(user, 'student_profile', None)
             if student:
-                # Используем твою функцию формирования данных
+                student = student_profile_queryset().get(pk=student['id'])
                 student_data = get_student_full_profile(student, request, is_own_profile=True)
                 response_data.update(student_data)
                 response_data["type"] = "student"
 
         # Сотрудник (Проректор / Декан / Кафедра)
-        elif hasattr(user, 'staff_profile'):
-            staff = user.staff_profile
+        elif staff:
             response_data["type"] = "staff"
             response_data["faculty"] = staff.faculty.name if staff.faculty else "Не указан"
             
-            # Определяем зону видимости (scope)
-            students_queryset = Student.objects.all()
-            
-            if user.is_rectorate:
-                response_data["scope"] = "university"
-            elif user.is_dean:
-                response_data["scope"] = "faculty"
-                students_queryset = students_queryset.filter(faculty=staff.faculty)
-            elif user.is_dept_staff:
-                response_data["scope"] = "department"
-                students_queryset = students_queryset.filter(department=staff.department)
+            scope, students_queryset = staff_scope(user, staff)
+            if scope:
+                response_data["scope"] = scope
+            if scope == "department":
                 response_data["department"] = staff.department.name if staff.department else "Не указана"
-            
-            students_list_data = StudentProfileSerializer(students_queryset.select_related('group', 'faculty')[:200], many=True, context={'request': request}).data
-
-            stats_data = students_queryset.aggregate(
-                total_students=Count('id'),
-                avg_score=Avg(
-                    F('academic_score') + F('research_score') + 
-                    F('sport_score') + F('social_score') + F('cultural_score')
-                )
-            )
-            
-            stats = {
-                "total_students": stats_data['total_students'] or 0,
-                "avg_score": round(stats_data['avg_score'] or 0, 2)
-            }
-            
-            # Список документов на проверку
-            pending_docs = Document.objects.filter(
-                student__in=students_queryset,
-                status='pending'
-            ).select_related('student', 'student__group')
-
-            # Формируем список документов с данными студента
-            pending_docs_data = []
-            for doc in pending_docs:
-                doc_data = DocumentSerializer(doc).data
-                doc_data.update({
-                    'student_id': doc.student.id,
-                    'student_name': doc.student.full_name,
-                    'group_id': doc.student.group.id if doc.student.group else "—",
-                    'record_book': doc.student.record_book
-                })
-                pending_docs_data.append(doc_data)
 
+            # Разделы кабинета (студенты, документы, группы, статистика) загружаются отдельными
+            # запросами с пагинацией, здесь - только заголовки и счётчики из сводки баллов
+            stats = rollup_stats(*scope_rollup(scope, staff))
             response_data.update({
-                "stats": stats,
-                "students_list": students_list_data,
-                "pending_documents": pending_docs_data,
-                "managed_groups": list(Group.objects.filter(department=staff.department).values('id', 'name', 'course')) if staff.department else []
+                "stats": {
+                    "total_students": stats['total_students'],
+                    "avg_score": stats['avg_score']
+                },
+                "counts": dashboard_counts(scope, staff, students_queryset),
             })
 
-        return Response(response_data)
+        return set_etag(Response(response_data), etag)
 
 class PublicProfileAPIView(APIView):
     """
@@ -492,14 +640,140 @@ class PublicProfileAPIView(APIView):
             - Права доступа управляются через группы Django
         """        
 
-        is_staff = request.user.groups.filter(name__in=['Department', 'Dean', 'Rectorate']).exists()
+        is_staff = request.user.is_university_staff
         
-        target_student = get_object_or_404(Student, id=student_id)
+        # Для проверки прав и ETag достаточно id, владельца и версии данных студента
+        target = get_object_or_404(Student.objects.values('id', 'user_id', 'data_version'), id=student_id)
         
-        is_own_profile = (request.user.id == target_student.user.id)
+        is_own_profile = (request.user.id == target['user_id'])
 
         if not is_own_profile and not is_staff:
             return Response({"detail": "У вас нет прав для просмотра этого профиля."}, status=status.HTTP_403_FORBIDDEN)
 
+        etag = make_etag(
+            'public-profile', target['id'], target['data_version'],
+            DataVersion.get(RATING_DATA), scoring_rules.version, is_own_profile, is_staff,
+        )
+        if is_not_modified(request, etag):
+            return not_modified_response(request, etag)
+
+        target_student = student_profile_queryset().get(pk=target['id'])
         response_data = get_student_full_profile(target_student, request, is_own_profile)
-        return Response(response_data)
\ No newline at end of file
+        return set_etag(Response(response_data), etag)
+
+# Параметры разделов кабинета сотрудника для схемы API
+_DASHBOARD_FILTERS = [
+    OpenApiParameter('group', OpenApiTypes.INT, description="id группы"),
+]
+_DASHBOARD_PAGING = [
+    OpenApiParameter('page_size', OpenApiTypes.INT, description="Размер страницы (по умолчанию 50, максимум 200)"),
+    OpenApiParameter('cursor', OpenApiTypes.STR, description="Курсор следующей страницы (next_cursor из предыдущего ответа)"),
+]
+
+class StaffDashboardAPIView(ABC, APIView):
+    """
+    Абстрактное базовое представление раздела кабинета сотрудника.
+
+    Раздел строится по студентам зоны видимости сотрудника (см. staff_scope) и параметрам
+    parse_dashboard_params. Подклассы задают имя раздела (section) и реализуют build.
+    Доступно только сотрудникам (группы 'Department', 'Dean', 'Rectorate').
+    """
+    authentication_classes = [SessionAuthentication]
+    permission_classes = [IsAuthenticated]
+    section = None
+
+    @abstractmethod
+    def build(self, params, scope, staff, students):
+        """
+        Возвращает данные раздела для ответа.
+        """
+
+    def get(self, request):
+        """
+        Возвращает данные раздела. При некорректных параметрах - 400, для не-сотрудников - 403.
+
+        ETag строится из версий данных рейтинга, документов и структуры вуза и параметров
+        запроса, поэтому повторный запрос с If-None-Match до изменения данных получает 304.
+        """
+        staff = getattr(request.user, 'staff_profile', None)
+        if staff is None or not request.user.is_university_staff:
+            return Response({"error": "Нет прав на просмотр кабинета сотрудника"}, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            params = parse_dashboard_params(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        etag = make_etag(
+            'dashboard', self.section, request.user.id, staff.faculty_id, staff.department_id,
+            sorted(request.query_params.items()), scoring_rules.version,
+            DataVersion.get_many(RATING_DATA, DOCUMENTS_DATA, STRUCTURE_DATA),
+        )
+        if is_not_modified(request, etag):
+            return not_modified_response(request, etag)
+
+        scope, students = staff_scope(request.user, staff)
+        return set_etag(Response(self.build(params, scope, staff, students)), etag)
+
+@extend_schema(
+    summary="Кабинет сотрудника: статистика",
+    parameters=_DASHBOARD_FILTERS,
+    responses={200: OpenApiTypes.OBJECT, 400: OpenApiTypes.OBJECT, 403: OpenApiTypes.OBJECT},
+)
+class StaffStatsAPIView(StaffDashboardAPIView):
+    """
+    Статистика по студентам зоны видимости: количество, средний/минимальный/максимальный балл,
+    суммы по категориям, лучшие студенты и число документов на проверке.
+    """
+    section = 'stats'
+
+    def build(self, params, scope, staff, students):
+        return dashboard_stats(scope, staff, students, params)
+
+@extend_schema(
+    summary="Кабинет сотрудника: студенты",
+    parameters=_DASHBOARD_FILTERS + [
+        OpenApiParameter('q', OpenApiTypes.STR, description="Поиск по ФИО, номеру зачётки или группе"),
+    ] + _DASHBOARD_PAGING,
+    responses={200: OpenApiTypes.OBJECT, 400: OpenApiTypes.OBJECT, 403: OpenApiTypes.OBJECT},
+)
+class StaffStudentsAPIView(StaffDashboardAPIView):
+    """
+    Студенты зоны видимости по убыванию общего балла: {"results": [...], "next_cursor": "..."}.
+    """
+    section = 'students'
+
+    def build(self, params, scope, staff, students):
+        return dashboard_students_page(students, params)
+
+@extend_schema(
+    summary="Кабинет сотрудника: документы",
+    parameters=_DASHBOARD_FILTERS + [
+        OpenApiParameter('category', OpenApiTypes.STR, description="Категория документа"),
+        OpenApiParameter('status', OpenApiTypes.STR, description="Статус документа (по умолчанию pending, all - любой)"),
+        OpenApiParameter('date_from', OpenApiTypes.DATE, description="Загружены не раньше даты"),
+        OpenApiParameter('date_to', OpenApiTypes.DATE, description="Загружены не позже даты"),
+    ] + _DASHBOARD_PAGING,
+    responses={200: OpenApiTypes.OBJECT, 400: OpenApiTypes.OBJECT, 403: OpenApiTypes.OBJECT},
+)
+class StaffDocumentsAPIView(StaffDashboardAPIView):
+    """
+    Документы студентов зоны видимости, сначала новые: {"results": [...], "next_cursor": "..."}.
+    """
+    section = 'documents'
+
+    def build(self, params, scope, staff, students):
+        return dashboard_documents_page(students, params)
+
+@extend_schema(
+    summary="Кабинет сотрудника: группы",
+    responses={200: OpenApiTypes.OBJECT, 403: OpenApiTypes.OBJECT},
+)
+class StaffGroupsAPIView(StaffDashboardAPIView):
+    """
+    Группы зоны видимости с количеством студентов и документов на проверке: {"results": [...]}.
+    """
+    section = 'groups'
+
+    def build(self, params, scope, staff, students):
+        return {"results": dashboard_groups(scope, staff)}
@@ -3,9 +3,13 @@ import { useState, useEffect } from 'react';
 import Link from 'next/link';
 import api from '@/lib/axios';
 
+const PAGE_SIZE = 50;
+
 export default function StudentRating() {
   const [activeTab, setActiveTab] = useState('common');
   const [students, setStudents] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loading, setLoading] = useState(false);
 
   const scoreMap = {
     common: 'total_score',
@@ -16,18 +20,38 @@ export default function StudentRating() {
     culture: 'cultural_score',
   };
 
+  // Сортировка и разбиение на страницы выполняются на сервере
+  const sortMap = {
+    common: 'total',
+    study: 'academic',
+    social: 'social',
+    sport: 'sport',
+    science: 'research',
+    culture: 'cultural',
+  };
+
+  const loadPage = (tab, cursor = null) => {
+    setLoading(true);
+    const params = { sort: sortMap[tab], page_size: PAGE_SIZE };
+    if (cursor) params.cursor = cursor;
+
+    return api.get(`/user/api/v1/rating/`, { params })
+      .then((res) => {
+        setStudents((prev) => (cursor ? [...prev, ...res.data.results] : res.data.results));
+        setNextCursor(res.data.next_cursor);
+      })
+      .catch((err) => console.error(err))
+      .finally(() => setLoading(false));
+  };
+
   useEffect(() => {
-    api.get(`/user/api/v1/rating/`) 
-      .then((res) => setStudents(res.data))
-      .catch((err) => console.error(err));
-  }, []);
+    loadPage(activeTab);
+  }, [activeTab]);
 
   const currentField = scoreMap[activeTab];
   
-  const ratingData = [...students]
-    .sort((a, b) => (b[currentField] || 0) - (a[currentField] || 0))
-    .map((student, index) => ({
-      rank: index + 1,
+  const ratingData = students.map((student, index) => ({
+      rank: student.rank ?? index + 1,
       user_id: student.user_id,
       name: student.full_name,
       score: student[currentField],
@@ -97,6 +121,17 @@ export default function StudentRating() {
                 ))}
               </tbody>
             </table>
+            {nextCursor && (
+              <div style={{ textAlign: 'center', padding: '15px' }}>
+                <button
+                  className="tab-button"
+                  disabled={loading}
+                  onClick={() => loadPage(activeTab, nextCursor)}
+                >
+                  {loading ? 'Загрузка...' : 'Показать ещё'}
+                </button>
+              </div>
+            )}
           </div>
         </div>
       </section>
@@ -24,9 +24,24 @@ const getSemesterRanges = () => {
   ];
 };
 
+const PAGE_SIZE = 50;
+
+// Дата в формате ГГГГ-ММ-ДД (по местному времени) для фильтров API
+const toApiDate = (date) => {
+  const pad = (n) => String(n).padStart(2, '0');
+  return `${date.getFullYear()}-${pad(date.getMonth() + 1)}-${pad(date.getDate())}`;
+};
+
+const categoryLabels = {
+  academic: "Учебная",
+  research: "Научная",
+  sport: "Спорт",
+  social: "Общественная",
+  cultural: "Культурно-творческая",
+};
+
 export default function TeacherProfile({profile, isOwner}) {
   const [activeTab, setActiveTab] = useState(`my-group`);
-  const [localProfile, setLocalProfile] = useState(profile);
   const [rejectReasons, setRejectReasons] = useState([]);
 
   const [modalState, setModalState] = useState({
@@ -36,13 +51,93 @@ export default function TeacherProfile({profile, isOwner}) {
     targetStudentId: null 
   });
 
-  const initialGroupId = (profile.curated_groups && profile.curated_groups.length > 0) ? profile.curated_groups[0].id : 'all';
-  const [selectedGroupId, setSelectedGroupId] = useState(initialGroupId);
+  const [selectedGroupId, setSelectedGroupId] = useState('all');
   const [searchTerm, setSearchTerm] = useState('');
   
   const semesterOptions = getSemesterRanges();
   const [selectedSemester, setSelectedSemester] = useState(semesterOptions[0].label);
 
+  // Разделы кабинета загружаются отдельными запросами, каждый - когда он нужен
+  const [groupsList, setGroupsList] = useState([]);
+  const [students, setStudents] = useState({ results: [], next_cursor: null, loading: false });
+  const [docs, setDocs] = useState({ results: [], next_cursor: null, loading: false });
+  const [stats, setStats] = useState(null);
+  const [pendingCount, setPendingCount] = useState(profile.counts?.pending_documents ?? 0);
+
+  const groupParams = () => (selectedGroupId != 'all' ? { group: selectedGroupId } : {});
+
+  const docsParams = () => {
+    const params = { ...groupParams(), status: 'pending', page_size: PAGE_SIZE };
+    const currentRange = semesterOptions.find(opt => opt.label == selectedSemester);
+    if (currentRange && currentRange.start) {
+      params.date_from = toApiDate(currentRange.start);
+      params.date_to = toApiDate(currentRange.end);
+    }
+    return params;
+  };
+
+  const loadStudents = (cursor = null) => {
+    setStudents(prev => ({ ...prev, loading: true }));
+    const params = { ...groupParams(), page_size: PAGE_SIZE };
+    if (searchTerm.trim() != '') params.q = searchTerm.trim();
+    if (cursor) params.cursor = cursor;
+
+    return api.get(`/user/api/v1/staff/students/`, { params })
+      .then(res => setStudents(prev => ({
+        results: cursor ? [...prev.results, ...res.data.results] : res.data.results,
+        next_cursor: res.data.next_cursor,
+        loading: false,
+      })))
+      .catch(err => {
+        console.error(err);
+        setStudents(prev => ({ ...prev, loading: false }));
+      });
+  };
+
+  const loadDocs = (cursor = null) => {
+    setDocs(prev => ({ ...prev, loading: true }));
+    const params = docsParams();
+    if (cursor) params.cursor = cursor;
+
+    return api.get(`/user/api/v1/staff/documents/`, { params })
+      .then(res => setDocs(prev => ({
+        results: cursor ? [...prev.results, ...res.data.results] : res.data.results,
+        next_cursor: res.data.next_cursor,
+        loading: false,
+      })))
+      .catch(err => {
+        console.error(err);
+        setDocs(prev => ({ ...prev, loading: false }));
+      });
+  };
+
+  useEffect(() => {
+    api.get(`/user/api/v1/staff/groups/`)
+      .then(res => {
+        setGroupsList(res.data.results);
+        if (res.data.results.length > 0) setSelectedGroupId(String(res.data.results[0].id));
+      })
+      .catch(err => console.error(err));
+  }, []);
+
+  useEffect(() => {
+    if (activeTab != `my-group`) return;
+    // Поиск отправляется на сервер после паузы в наборе
+    const timer = setTimeout(() => loadStudents(), 300);
+    return () => clearTimeout(timer);
+  }, [activeTab, selectedGroupId, searchTerm]);
+
+  useEffect(() => {
+    if (activeTab == `pending-requests`) loadDocs();
+  }, [activeTab, selectedGroupId, selectedSemester]);
+
+  useEffect(() => {
+    if (activeTab != `statistics`) return;
+    api.get(`/user/api/v1/staff/stats/`, { params: groupParams() })
+      .then(res => setStats(res.data))
+      .catch(err => console.error(err));
+  }, [activeTab, selectedGroupId]);
+
   const openModal = (type, doc) => setModalState({ 
       type, 
       targetId: doc.id, 
@@ -54,74 +149,33 @@ export default function TeacherProfile({profile, isOwner}) {
       setModalState({ type: null, targetId: null, targetScore: 0, targetStudentId: null });
       setRejectReasons([]); 
   };
-  
-  const filteredStudents = useMemo(() => {
-    let students = localProfile.students_list || [];
-    if (selectedGroupId != 'all') {
-      students = students.filter(s => s.group_id == Number(selectedGroupId));
-    }
-    if (searchTerm.trim() != '') {
-      const lowerTerm = searchTerm.toLowerCase();
-      students = students.filter(s => 
-        s.full_name.toLowerCase().includes(lowerTerm) || 
-        (s.record_book && s.record_book.toLowerCase().includes(lowerTerm))
-      );
-    }
-    return students;
-  }, [localProfile.students_list, selectedGroupId, searchTerm]);
-
 
-  const filteredDocs = useMemo(() => {
-    let docs = localProfile.pending_documents || [];
-    if (selectedGroupId != 'all') {
-      docs = docs.filter(d => d.group_id == Number(selectedGroupId));
-    }
-    const currentRange = semesterOptions.find(opt => opt.label == selectedSemester);
-    if (currentRange && currentRange.start) {
-        docs = docs.filter(d => {
-            const docDate = new Date(d.uploaded_at); 
-            return docDate >= currentRange.start && docDate <= currentRange.end;
-        });
-    }
-    return docs;
-  }, [localProfile.pending_documents, selectedGroupId, selectedSemester]);
+  const filteredStudents = students.results;
+  const filteredDocs = docs.results;
 
   const dynamicStats = useMemo(() => {
-    const students = filteredStudents;
-    const count = students.length;
-    
-    if (count == 0) return {
+    if (!stats) return {
       total_students: 0, avg_score: 0, max_score: 0, min_score: 0,
       active_requests: 0, top5: [], categories: {}
     };
 
-    const scores = students.map(s => s.total_score);
-    const totalSum = scores.reduce((acc, val) => acc + val, 0);
-    
-    // Распределение по категориям (суммируем баллы из студентов)
-    const catStats = {
-      "Учебная": students.reduce((acc, s) => acc + (s.academic_score || 0), 0),
-      "Научная": students.reduce((acc, s) => acc + (s.research_score || 0), 0),
-      "Спорт": students.reduce((acc, s) => acc + (s.sport_score || 0), 0),
-      "Общественная": students.reduce((acc, s) => acc + (s.social_score || 0), 0),
-      "Культурно-творческая": students.reduce((acc, s) => acc + (s.cultural_score || 0), 0),
-    };
-
-    // Топ 5
-    const top5 = [...students]
-      .sort((a, b) => b.total_score - a.total_score)
-      .slice(0, 5);
-
     return {
-      total_students: count,
-      avg_score: Math.round(totalSum / count),
-      max_score: Math.max(...scores),
-      min_score: Math.min(...scores),
-      active_requests: filteredDocs.length,
-      top5: top5,
-      categories: catStats
+      total_students: stats.total_students,
+      avg_score: Math.round(stats.avg_score),
+      max_score: stats.max_score,
+      min_score: stats.min_score,
+      active_requests: stats.pending_documents,
+      top5: stats.top,
+      categories: Object.fromEntries(
+        Object.entries(stats.category_totals).map(([key, value]) => [categoryLabels[key] || key, value])
+      ),
     };
-  }, [filteredStudents, filteredDocs]);
+  }, [stats]);
+
+  const removeDoc = (docId) => {
+    setDocs(prev => ({ ...prev, results: prev.results.filter(doc => doc.id != docId) }));
+    setPendingCount(prev => Math.max(prev - 1, 0));
+  };
 
   const handleApprove = async () => {
     if (!modalState.targetId) return;
@@ -131,25 +185,15 @@ export default function TeacherProfile({profile, isOwner}) {
         action: 'approve'
       });
 
-      setLocalProfile(prev => {
-          const newPending = prev.pending_documents.filter(doc => doc.id != modalState.targetId);
-          
-          const newStudentsList = prev.students_list.map(student => {
-              if (student.id == modalState.targetStudentId) {
-                  return {
-                      ...student,
-                      total_score: student.total_score + modalState.targetScore
-                  };
-              }
-              return student;
-          });
-
-          return {
-              ...prev,
-              pending_documents: newPending,
-              students_list: newStudentsList
-          };
-      });
+      removeDoc(modalState.targetId);
+      setStudents(prev => ({
+        ...prev,
+        results: prev.results.map(student => (
+          student.id == modalState.targetStudentId
+            ? { ...student, total_score: student.total_score + modalState.targetScore }
+            : student
+        )),
+      }));
 
       closeModal();
     } catch (error) {
@@ -173,10 +217,7 @@ export default function TeacherProfile({profile, isOwner}) {
         reasons: rejectReasons
       });
 
-      setLocalProfile(prev => ({
-        ...prev,
-        pending_documents: prev.pending_documents.filter(doc => doc.id !== modalState.targetId)
-      }));
+      removeDoc(modalState.targetId);
 
       closeModal();
     } catch (error) {
@@ -191,8 +232,7 @@ export default function TeacherProfile({profile, isOwner}) {
     );
   };
 
-  const curatedGroups = profile.curated_groups && profile.curated_groups.length > 0 ? profile.curated_groups.map(g => g.name).join(', ') : "Нет курируемых групп";
-  const groupsList = profile.curated_groups || [];
+  const curatedGroups = groupsList.length > 0 ? groupsList.map(g => g.name).join(', ') : "Нет курируемых групп";
   const currentGroupName = groupsList.find(g => g.id == selectedGroupId)?.name || "Все группы";
   // Ну да, хардкод, потом пофиксим
   const reasonsRejectArr = [
@@ -229,7 +269,7 @@ export default function TeacherProfile({profile, isOwner}) {
                   {groupsList.map(g => (
                       <option className='profile-value' key={g.id} value={g.id}>{g.name}</option>
                   ))}
-                  {groupsList.length == 0 && <option value="all">Нет групп</option>}
+                  <option value="all">{groupsList.length == 0 ? "Нет групп" : "Все группы"}</option>
               </select>
                 <div className="profile-item"><span className="profile-label">Номер телефона</span><span className="profile-value">{profile.phone || "Не указан номер телефона"}</span></div>
               </div>
@@ -242,7 +282,7 @@ export default function TeacherProfile({profile, isOwner}) {
             </a>
             <a className={`nav-tab ${activeTab == `pending-requests` ? `active`:``}`} onClick={() => setActiveTab(`pending-requests`)}>
                 Заявки на подтверждение
-                {filteredDocs.length > 0 && <span className="badge-count" style={{marginLeft:'5px', background:'#E11D48', color:'white', borderRadius:'10px', padding:'2px 6px', fontSize:'11px'}}>{filteredDocs.length}</span>}
+                {pendingCount > 0 && <span className="badge-count" style={{marginLeft:'5px', background:'#E11D48', color:'white', borderRadius:'10px', padding:'2px 6px', fontSize:'11px'}}>{pendingCount}</span>}
             </a>
             <a className={`nav-tab ${activeTab == `statistics` ? `active`:``}`} onClick={() => setActiveTab(`statistics`)}>
                 Статистика
@@ -255,7 +295,7 @@ export default function TeacherProfile({profile, isOwner}) {
           <div className="tab-content active">
             <div className="students-section">
               <div className="students-header-row">
-                <h2 className="section-title">Список студентов группы {currentGroupName} (студентов:{filteredStudents.length})</h2>
+                <h2 className="section-title">Список студентов группы {currentGroupName} (студентов: {selectedGroupId == 'all' ? (profile.counts?.students ?? filteredStudents.length) : (groupsList.find(g => g.id == selectedGroupId)?.students_count ?? filteredStudents.length)})</h2>
                 {/* <label style={{fontSize:'12px', color:'#666', display:'block', marginBottom:'4px'}}>Семестр: </label> */}
                 <div className="filter-item">
                     <select 
@@ -299,11 +339,18 @@ export default function TeacherProfile({profile, isOwner}) {
                         </td>
                       </tr>
                     )) : (
-                      <tr><td colSpan={4} style={{textAlign: 'center', padding: '20px'}}>Студенты не найдены</td></tr>
+                      <tr><td colSpan={4} style={{textAlign: 'center', padding: '20px'}}>{students.loading ? "Загрузка..." : "Студенты не найдены"}</td></tr>
                     )}
                   </tbody>
                 </table>
               </div>
+              {students.next_cursor && (
+                <div style={{textAlign: 'center', marginTop: '15px'}}>
+                  <button className="btn-approve" onClick={() => loadStudents(students.next_cursor)} disabled={students.loading}>
+                    {students.loading ? "Загрузка..." : "Показать ещё"}
+                  </button>
+                </div>
+              )}
             </div>
           </div>
           )}
@@ -358,12 +405,19 @@ export default function TeacherProfile({profile, isOwner}) {
                       </tr>
                       )) : (
                       <tr><td colSpan={8}>
-                          Нет заявок за период "{selectedSemester}" в группе "{currentGroupName}"
+                          {docs.loading ? "Загрузка..." : `Нет заявок за период "${selectedSemester}" в группе "${currentGroupName}"`}
                       </td></tr>
                       )}
                   </tbody>
                   </table>
                 </div>
+                {docs.next_cursor && (
+                  <div style={{textAlign: 'center', marginTop: '15px'}}>
+                    <button className="btn-approve" onClick={() => loadDocs(docs.next_cursor)} disabled={docs.loading}>
+                      {docs.loading ? "Загрузка..." : "Показать ещё"}
+                    </button>
+                  </div>
+                )}
               </div>
           </div>
         )}